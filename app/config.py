@@ -11,6 +11,23 @@ class Settings(BaseSettings):
     DATABASE_URL: str = Field(default="sqlite:////var/data/alerttrail.sqlite3")
     REPORTS_DIR: str = Field(default="/var/data/reports")
 
+    # Análisis de logs: pool de procesos (0 = sin procesos, corre en un thread)
+    ANALYSIS_WORKERS: int = Field(default=2)
+    ANALYSIS_MAX_PENDING: int = Field(default=8)  # trabajos en curso + en cola; el resto recibe 503
+    ANALYSIS_SHARD_MIN_BYTES: int = Field(default=256 * 1024 * 1024)  # desde acá se reparte en todos los workers
+    # cache de resultados por SHA-256 del upload (0 en disco = sólo memoria)
+    ANALYSIS_CACHE_MEM_BYTES: int = Field(default=64 * 1024 * 1024)
+    ANALYSIS_CACHE_DISK_BYTES: int = Field(default=512 * 1024 * 1024)
+    # raíz permitida para analizar archivos del servidor (admin); sin valor = deshabilitado
+    ANALYSIS_LOCAL_ROOT: str | None = None
+    # mode=preview: bytes muestreados (archivos más chicos se analizan completos)
+    ANALYSIS_PREVIEW_BYTES: int = Field(default=8 * 1024 * 1024)
+    # reglas para la vista normalizada de paths (uuid, num, hash, query); vacío = paths tal cual
+    ANALYSIS_PATH_RULES: str = Field(default="uuid,num,hash,query")
+    # /analysis/batch: tope de archivos y de bytes (ya extraídos de tar/zip) por lote
+    ANALYSIS_BATCH_MAX_FILES: int = Field(default=200)
+    ANALYSIS_BATCH_MAX_BYTES: int = Field(default=8 * 1024 * 1024 * 1024)
+
     # Admin seed
     ADMIN_EMAIL: str | None = None
     ADMIN_PASS: str | None = None
@@ -139,7 +139,7 @@ def truthy(v):
 # =========================
 ROUTER_MODULES = [
     "stats", "payments", "alerts", "rules", "reports",
-    "admin", "admin_metrics", "analysis", "auth", "billing",
+    "admin", "admin_metrics", "analysis", "analysis_sessions", "analysis_history", "auth", "billing",
     "mail", "profile", "push",
 ]
 for name in ROUTER_MODULES:
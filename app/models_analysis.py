@@ -0,0 +1,79 @@
+# app/models_analysis.py
+from datetime import datetime
+from sqlalchemy import (BigInteger, Boolean, Column, DateTime, ForeignKey, Index, Integer, LargeBinary, String,
+                        Text, UniqueConstraint)
+from sqlalchemy.orm import declared_attr
+from .database import Base
+
+class AnalysisSession(Base):
+    """Sesión de ingesta incremental (/analysis/sessions)."""
+    __tablename__ = "analysis_sessions"
+    id = Column(Integer, primary_key=True)
+    token = Column(String(64), unique=True, index=True, nullable=False)  # id público de la sesión
+    user_id = Column(Integer, ForeignKey("users.id"), index=True, nullable=False)
+    name = Column(String, default="", nullable=False)
+    approx = Column(Boolean, default=False, nullable=False)
+    offset = Column(BigInteger, default=0, nullable=False)  # bytes del stream ya procesados
+    chunks = Column(Integer, default=0, nullable=False)
+    carry = Column(LargeBinary, default=b"", nullable=False)  # línea incompleta pendiente
+    state = Column(LargeBinary, nullable=True)  # estado del analizador (JSON + zlib)
+    summary = Column(Text, nullable=True)  # último resumen (JSON), para leer sin recalcular
+    closed = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class AnalysisRun(Base):
+    """Resumen persistido de cada análisis (upload o sesión cerrada)."""
+    __tablename__ = "analysis_runs"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    source = Column(String(16), default="upload", nullable=False)  # upload | session
+    name = Column(String, default="", nullable=False)
+    sha256 = Column(String(64), index=True, nullable=True)  # contenido del upload (evita contar dos veces)
+    approx = Column(Boolean, default=False, nullable=False)
+    total = Column(BigInteger, default=0, nullable=False)
+    first_minute = Column(DateTime, nullable=True)  # rango cubierto, hora del log
+    last_minute = Column(DateTime, nullable=True)
+    summary = Column(Text, nullable=False)  # JSON
+    # running: análisis completo en segundo plano (después de una vista previa)
+    status = Column(String(16), default="done", nullable=False)  # running | done | failed
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (
+        Index("ix_analysis_runs_user_created", "user_id", "created_at"),
+        # un run por archivo y modo: dos uploads simultáneos del mismo archivo no suman dos veces
+        UniqueConstraint("user_id", "sha256", "approx", name="uq_analysis_runs_user_sha256_approx"),
+    )
+
+
+class _RollupColumns:
+    """Columnas comunes de los rollups; `bucket` es el inicio del minuto/hora/día (hora del log)."""
+    id = Column(Integer, primary_key=True)
+    bucket = Column(DateTime, nullable=False)
+    requests = Column(BigInteger, default=0, nullable=False)
+    errors_4xx = Column(BigInteger, default=0, nullable=False)
+    errors_5xx = Column(BigInteger, default=0, nullable=False)
+    sqli_hits = Column(BigInteger, default=0, nullable=False)
+    probe_hits = Column(BigInteger, default=0, nullable=False)
+
+    @declared_attr
+    def user_id(cls):
+        return Column(Integer, ForeignKey("users.id"), nullable=False)
+
+    @declared_attr
+    def __table_args__(cls):
+        # el unique (user_id, bucket) es también el índice de las consultas por rango
+        return (UniqueConstraint("user_id", "bucket", name=f"uq_{cls.__tablename__}_user_bucket"),)
+
+
+class RollupMinute(_RollupColumns, Base):
+    __tablename__ = "analysis_rollup_minute"
+
+
+class RollupHour(_RollupColumns, Base):
+    __tablename__ = "analysis_rollup_hour"
+
+
+class RollupDay(_RollupColumns, Base):
+    __tablename__ = "analysis_rollup_day"
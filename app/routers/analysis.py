@@ -1,10 +1,35 @@
 # app/routers/analysis.py
-from fastapi import APIRouter, Request, UploadFile, File, Form, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse, Response
-from typing import Dict, Any, List, Tuple
-import io, re
-from collections import Counter, defaultdict
-from datetime import datetime
+from fastapi import APIRouter, Request, UploadFile, File, Form, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Set, Tuple
+import asyncio, hashlib, html, json, os, tempfile
+from itertools import zip_longest
+
+from app.services import analysis_pool
+from app.config import get_settings
+from app.database import SessionLocal, get_db
+from app.services.analysis_batch import BatchInputs, BatchTooLarge, file_entry, summarize_batch
+from app.services.analysis_preview import preview_file
+from app.services.analysis_store import fail_run, find_run, is_stale, record_run, start_run
+from app.services.decompress import CorruptArchive
+from app.services.local_logs import LocalPathError, resolve_local_path
+from app.services.result_cache import cache_key, get_cache
+# nombres que este módulo exportaba antes de mover el analizador a services
+from app.services.log_analyzer import (  # noqa: F401  (re-export)
+    COMBINED_RE,
+    SQLI_PATTERNS,
+    SENSITIVE_FILES,
+    _parse_time,
+    analyze_log,
+)
+
+try:
+    from app.services.pdf_service import render_summary_pdf
+except Exception:
+    render_summary_pdf = None  # sin reportlab: sólo HTML
 
 # si tenés auth por cookie, mantenemos la dependencia (no falla si la quitaste)
 try:
@@ -15,112 +40,167 @@ except Exception:
 
 router = APIRouter(prefix="/analysis", tags=["Analysis"])
 
-COMBINED_RE = re.compile(
-    r'^(?P<ip>\S+)\s+\S+\s+\S+\s+\[(?P<time>[^\]]+)\]\s+'
-    r'"(?P<method>[A-Z]+)\s+(?P<path>[^"\s]+)(?:\s+HTTP/[0-9.]+)?"\s+'
-    r'(?P<status>\d{3})\s+(?P<size>\S+)\s+"(?P<ref>[^"]*)"\s+"(?P<ua>[^"]*)"'
-)
+# el upload se copia por bloques a un temporal y el pool lo lee desde disco:
+# la memoria no depende del tamaño del archivo
+UPLOAD_CHUNK = 1024 * 1024
 
-SQLI_PATTERNS = [
-    r"(?i)\bunion\b.+\bselect\b",
-    r"(?i)(\bor\b|\band\b)\s+1=1",
-    r"(?i)\binformation_schema\b",
-    r"(?i)sqlmap",
-]
-SENSITIVE_FILES = ["/.env", "/wp-login.php", "/phpmyadmin", "/config.php", ".bak", ".zip", ".tar"]
+async def _spool_upload(file: UploadFile) -> Tuple[str, str]:
+    """Copia el upload a un temporal y devuelve (path, sha256 hex) calculado en la misma pasada."""
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(prefix="alerttrail_", suffix=".log")
+    with os.fdopen(fd, "wb") as out:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK)
+            if not chunk:
+                break
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
 
-def _parse_time(s: str) -> datetime | None:
-    # e.g. 17/Sep/2025:05:25:00 +0000
+def _discard(path: str) -> None:
     try:
-        return datetime.strptime(s, "%d/%b/%Y:%H:%M:%S %z")
-    except Exception:
-        return None
+        os.unlink(path)
+    except OSError:
+        pass
 
-def analyze_log(text: str) -> Dict[str, Any]:
-    lines = text.splitlines()
-    total = 0
-    by_status = Counter()
-    by_path = Counter()
-    by_ip = Counter()
-    sqli = []
-    probes = []
-    errors_5xx = 0
-    rate_429 = 0
-    unauthorized_401 = Counter()
-    admin_forbidden_403 = Counter()
-    timeline = defaultdict(int)
-
-    for raw in lines:
-        m = COMBINED_RE.match(raw.strip())
-        if not m:
-            continue
-        total += 1
-        ip = m.group("ip")
-        path = m.group("path")
-        status = int(m.group("status"))
-        ua = m.group("ua") or "-"
-        dt = _parse_time(m.group("time"))
-        if dt:
-            key = dt.strftime("%Y-%m-%d %H:%M")
-            timeline[key] += 1
-
-        by_status[status] += 1
-        by_path[path] += 1
-        by_ip[ip] += 1
-
-        if status >= 500:
-            errors_5xx += 1
-        if status == 429:
-            rate_429 += 1
-        if status == 401 and path.endswith("/api/login"):
-            unauthorized_401[ip] += 1
-        if status == 403 and path.startswith("/admin"):
-            admin_forbidden_403[ip] += 1
-
-        for patt in SQLI_PATTERNS:
-            if re.search(patt, raw):
-                sqli.append(raw)
-                break
+# vistas del top de paths: tal cual o normalizados (ids, UUIDs, hashes y query como placeholders)
+PATH_VIEWS = ("raw", "normalized")
 
-        for sf in SENSITIVE_FILES:
-            if sf in path:
-                probes.append(raw)
-                break
+def _check_view(paths: str) -> str:
+    if paths not in PATH_VIEWS:
+        raise HTTPException(status_code=400, detail=f"paths debe ser uno de: {', '.join(PATH_VIEWS)}")
+    return paths
+
+def _view_kind(kind: str, paths: str) -> str:
+    # entrada de cache por vista: "html" / "normalized.html"
+    return kind if paths == "raw" else f"{paths}.{kind}"
 
-    # buckets por clase
-    classes = Counter()
-    for s, c in by_status.items():
-        k = f"{s//100}xx"
-        classes[k] += c
-
-    top_paths = by_path.most_common(10)
-    top_ips = by_ip.most_common(10)
-
-    return {
-        "total": total,
-        "classes": dict(classes),
-        "by_status": dict(by_status.most_common()),
-        "top_paths": top_paths,
-        "top_ips": top_ips,
-        "errors_5xx": errors_5xx,
-        "rate_429": rate_429,
-        "unauth_401": unauthorized_401.most_common(),
-        "admin_403": admin_forbidden_403.most_common(),
-        "sqli_hits": sqli[:20],
-        "probe_hits": probes[:20],
-        "timeline": dict(sorted(timeline.items())),
-    }
-
-def _render_html(summary: Dict[str, Any]) -> str:
+def _render_html(summary: Dict[str, Any], paths: str = "raw") -> str:
     def row(k, v): return f"<tr><td>{k}</td><td style='text-align:right'>{v}</td></tr>"
     classes = "".join(row(k, v) for k, v in summary["classes"].items())
     status = "".join(row(k, v) for k, v in summary["by_status"].items())
-    top_paths = "".join(f"<tr><td>{p}</td><td style='text-align:right'>{c}</td></tr>" for p, c in summary["top_paths"])
-    top_ips = "".join(f"<tr><td>{ip}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["top_ips"])
+    # resúmenes guardados antes de la normalización sólo traen la vista cruda
+    normalized = paths == "normalized" and "top_paths_normalized" in summary
+    paths_title = "Top paths (normalizados)" if normalized else "Top paths"
+    top_paths = "".join(
+        f"<tr><td>{html.escape(p)}</td><td style='text-align:right'>{c}</td></tr>"
+        for p, c in summary["top_paths_normalized" if normalized else "top_paths"]
+    )
+    top_ips = "".join(f"<tr><td>{html.escape(str(ip))}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["top_ips"])
+    subnets = summary.get("top_subnets") or {}
+    top_subnets = "".join(
+        f"<tr><td>{net}</td><td style='text-align:right'>{c}</td></tr>"
+        for name in ("ipv4_24", "ipv4_16", "ipv6_48") for net, c in subnets.get(name, [])[:5]
+    )
     sqli = "".join(f"<li><code>{line}</code></li>" for line in summary["sqli_hits"])
     probes = "".join(f"<li><code>{line}</code></li>" for line in summary["probe_hits"])
-    unauth = "".join(f"<tr><td>{ip}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["unauth_401"])
-    admin403 = "".join(f"<tr><td>{ip}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["admin_403"])
+    # los templates llevan máscaras como <NUM> y los ejemplos el request tal cual: se escapan
+    templates = "".join(
+        f"<tr><td><code>{html.escape(t['template'])}</code>"
+        + "".join(f"<br><small class='mono'>{html.escape(ex)}</small>" for ex in t["examples"][:2])
+        + f"</td><td style='text-align:right'>{t['count']}</td></tr>"
+        for t in (summary.get("templates") or {}).get("top", [])
+    )
+    unauth = "".join(f"<tr><td>{html.escape(str(ip))}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["unauth_401"])
+    admin403 = "".join(f"<tr><td>{html.escape(str(ip))}</td><td style='text-align:right'>{c}</td></tr>" for ip, c in summary["admin_403"])
+    approx = summary.get("approx")
+    approx_card = ""
+    if approx:
+        approx_card = f"""<div class="card"><h2>Modo aproximado</h2>
+    <div class="mono">IPs distintas ≈ <b>{approx["distinct_ips"]}</b> &nbsp; • &nbsp; paths distintos ≈ <b>{approx["distinct_paths"]}</b>
+    (±{approx["distinct_rel_error"]*100:.1f}%)</div>
+    <div class="mono">Conteos de top paths/IPs: sobreestimados como mucho en {approx["max_count_error"]}</div>
+    <div class="mono">Líneas sospechosas: muestra de {approx["sqli_seen"]} SQLi y {approx["probe_seen"]} probes</div>
+  </div>"""
+    auth = summary.get("auth")
+    auth_card = ""
+    if auth:
+        st = auth["summary"]
+        # los hallazgos XSS traen el payload tal cual: se escapa
+        findings = "".join(
+            f"<li><b>{f['type']}</b> <code>{html.escape(f['line'])}</code></li>" for f in auth["findings"]
+        )
+        auth_card = f"""<div class="card"><h2>SSH / auth</h2>
+    <div class="mono">SSH fallidos: <b>{st.get("ssh_failed", 0)}</b> &nbsp; • &nbsp; aceptados: <b>{st.get("ssh_accepted", 0)}</b>
+    &nbsp; • &nbsp; IPs con fuerza bruta: <b>{st.get("bruteforce_ips", 0)}</b> &nbsp; • &nbsp; riesgo: <b>{st.get("risk", "low")}</b></div>
+    <ul>{findings or "<li>—</li>"}</ul>
+  </div>"""
+    preview = summary.get("preview")
+    preview_card = ""
+    if preview:
+        labels = {"total": "Requests", "classes.4xx": "4xx", "classes.5xx": "5xx", "rate_429": "429",
+                  "sqli_total": "SQLi", "probe_total": "Probes", "auth.ssh_failed": "SSH fallidos"}
+        est_rows = "".join(
+            f"<tr><td>{label}</td><td style='text-align:right'>≈ {e['value']}</td>"
+            f"<td style='text-align:right'>{e['low']} – {e['high']}</td></tr>"
+            for name, label in labels.items() if (e := preview["estimates"].get(name))
+        )
+        unit = "del archivo" if preview["method"] == "bytes" else "de las líneas"
+        link = preview.get("result_url")
+        preview_card = f"""<div class="card"><h2>Vista previa (muestra)</h2>
+    <div class="mono">Muestra: {preview["fraction"]*100:.2f}% {unit} en {preview["strata"]} tramos.
+    Los conteos son estimaciones, con intervalo de confianza del {preview["confidence"]*100:.0f}%.</div>
+    <table><tr><th></th><th style='text-align:right'>Estimado</th><th style='text-align:right'>IC 95%</th></tr>{est_rows}</table>
+    {f'<p>El análisis completo sigue en segundo plano: <a href="{link}">ver resultado</a></p>' if link else ""}
+  </div>"""
+    sessions = summary.get("sessions")
+    sessions_card = ""
+    if sessions:
+        hist = "".join(
+            f"<tr><td>{label}</td><td style='text-align:right'>{n}</td>"
+            f"<td>{dlabel}</td><td style='text-align:right'>{dn}</td></tr>"
+            for (label, n), (dlabel, dn) in zip_longest(
+                sessions["requests_hist"].items(), sessions["duration_hist"].items(), fillvalue=("", "")
+            )
+        )
+        crawlers = "".join(
+            f"<tr><td>{html.escape(c['ip'])}</td><td><code>{html.escape(c['ua'])}</code></td>"
+            f"<td style='text-align:right'>{c['requests']}</td><td style='text-align:right'>{c['rate_per_min']}</td></tr>"
+            for c in sessions["top_crawlers"]
+        )
+        sessions_card = f"""<div class="card"><h2>Sesiones (IP + UA, corte a {sessions["gap_seconds"] // 60} min)</h2>
+    <div class="mono">Sesiones: <b>{sessions["sessions"]}</b> &nbsp; • &nbsp; requests por sesión: <b>{sessions["avg_requests"]}</b>
+    &nbsp; • &nbsp; duración media: <b>{sessions["avg_duration_s"]} s</b>
+    &nbsp; • &nbsp; crawlers (≥ {sessions["crawl_rate_per_min"]:.0f} req/min): <b>{sessions["crawlers"]}</b></div>
+    <table><tr><th>Requests</th><th></th><th>Duración</th><th></th></tr>{hist}</table>
+    <h3>Sesiones más rápidas</h3>
+    <table><tr><th>IP</th><th>UA</th><th style='text-align:right'>Requests</th><th style='text-align:right'>req/min</th></tr>{crawlers or "<tr><td colspan=4>—</td></tr>"}</table>
+  </div>"""
+    agents = summary.get("user_agents")
+    agents_card = ""
+    if agents:
+        agent_classes = "".join(
+            f"<tr><td>{k}</td><td style='text-align:right'>{c}</td></tr>" for k, c in agents["classes"].items()
+        )
+        scanners = "".join(f"<tr><td>{name}</td><td style='text-align:right'>{c}</td></tr>" for name, c in agents["top_scanners"])
+        bots = "".join(f"<tr><td>{name}</td><td style='text-align:right'>{c}</td></tr>" for name, c in agents["top_bots"])
+        agents_card = f"""<div class="card"><h2>User agents</h2>
+    <div class="mono">Tráfico automatizado (bots, scanners, herramientas): <b>{agents["bot_share"]*100:.1f}%</b></div>
+    <table>{agent_classes}</table>
+    <h3>Top scanners y herramientas</h3>
+    <table>{scanners or "<tr><td colspan=2>—</td></tr>"}</table>
+    <h3>Top bots</h3>
+    <table>{bots or "<tr><td colspan=2>—</td></tr>"}</table>
+  </div>"""
+    files = summary.get("files")
+    files_card = ""
+    if files:
+        file_rows = "".join(
+            f"<tr><td><code>{html.escape(f['name'])}</code></td><td colspan=6>error: {html.escape(f['error'])}</td></tr>"
+            if "error" in f else
+            f"<tr><td><code>{html.escape(f['name'])}</code><br><small class='mono'>{f['first'] or '—'} → {f['last'] or '—'}</small></td>"
+            f"<td style='text-align:right'>{f['total']}</td>"
+            f"<td style='text-align:right'>{f['classes'].get('4xx', 0)}</td><td style='text-align:right'>{f['errors_5xx']}</td>"
+            f"<td style='text-align:right'>{f['sqli_total']}</td><td style='text-align:right'>{f['probe_total']}</td>"
+            f"<td style='text-align:right'>{f['ssh_failed']}</td></tr>"
+            for f in files
+        )
+        files_card = f"""<div class="card"><h2>Archivos del lote ({len(files)})</h2>
+    <table><tr><th>Archivo</th><th style='text-align:right'>Requests</th><th style='text-align:right'>4xx</th>
+    <th style='text-align:right'>5xx</th><th style='text-align:right'>SQLi</th><th style='text-align:right'>Probes</th>
+    <th style='text-align:right'>SSH fallidos</th></tr>{file_rows}</table>
+  </div>"""
+    formats = summary.get("formats") or {}
 
     return f"""<!doctype html>
 <html lang="es"><meta charset="utf-8">
@@ -140,12 +220,20 @@ code{{white-space:pre-wrap}}
   <h1>AlertTrail <span class="badge">Análisis</span></h1>
   <div class="card">
     <div class="mono">Total de requests: <b>{summary["total"]}</b></div>
+    <div class="mono">Formato: <b>{summary.get("format", "combined")}</b> &nbsp; • &nbsp; líneas syslog: {formats.get("syslog", 0)} &nbsp; • &nbsp; no reconocidas: {formats.get("other", 0)}</div>
   </div>
+  {preview_card}
+  {files_card}
+  {approx_card}
+  {auth_card}
 
   <div class="card"><h2>Clases</h2><table>{classes}</table></div>
   <div class="card"><h2>Estados</h2><table>{status}</table></div>
-  <div class="card"><h2>Top paths</h2><table>{top_paths}</table></div>
+  <div class="card"><h2>{paths_title}</h2><table>{top_paths}</table></div>
   <div class="card"><h2>Top IPs</h2><table>{top_ips}</table></div>
+  <div class="card"><h2>Top subredes (/24, /16, /48)</h2><table>{top_subnets or "<tr><td colspan=2>—</td></tr>"}</table></div>
+  {sessions_card}
+  {agents_card}
 
   <div class="card"><h2>Intentos de login fallidos (401) por IP</h2>
     <table>{unauth or "<tr><td colspan=2>—</td></tr>"}</table>
@@ -161,6 +249,7 @@ code{{white-space:pre-wrap}}
 
   <div class="card"><h2>Posibles SQLi</h2><ul>{sqli or "<li>—</li>"}</ul></div>
   <div class="card"><h2>Probes de archivos sensibles</h2><ul>{probes or "<li>—</li>"}</ul></div>
+  <div class="card"><h2>Patrones de ataque</h2><table>{templates or "<tr><td colspan=2>—</td></tr>"}</table></div>
 </div>
 </html>"""
 
@@ -191,10 +280,18 @@ async def generate_page(request: Request, current=Depends(get_current_user_cooki
       <h1>Analizar logs y generar reporte</h1>
       <div class="card">
         <form method="post" action="/analysis/generate" enctype="multipart/form-data">
-          <label>Archivo de log (Nginx/Apache combined):
+          <label>Archivo de log (Nginx/Apache combined, sshd/auth o mezcla; también .gz/.bz2/.xz):
             <input type="file" name="file" required>
           </label>
           <label><input type="checkbox" name="as_pdf" value="1"> Descargar como PDF</label>
+          <label><input type="checkbox" name="approx" value="1"> Modo aproximado (memoria fija, para logs enormes)</label>
+          <label><input type="checkbox" name="mode" value="preview"> Vista previa rápida por muestreo (el análisis completo sigue en segundo plano)</label>
+          <label>Top de paths:
+            <select name="paths">
+              <option value="raw">tal cual</option>
+              <option value="normalized">normalizados (/users/{id}, ?q={v})</option>
+            </select>
+          </label>
           <button class="btn" type="submit">Procesar</button>
         </form>
         <p style="opacity:.8;margin-top:10px">¿Necesitás un archivo de prueba? Podés usar el que te compartí en el chat.</p>
@@ -202,70 +299,316 @@ async def generate_page(request: Request, current=Depends(get_current_user_cooki
     </div>"""
     return HTMLResponse(html)
 
+# análisis completos que siguen después de una vista previa; el estado vive en
+# el run (analysis_store.start_run), acá sólo se retienen las tareas de este proceso
+_BACKGROUND: Set["asyncio.Task"] = set()
+
+def _fail_in_background(user_id: int, digest: str, approx: bool, error: str) -> None:
+    db = SessionLocal()
+    try:
+        fail_run(db, user_id, digest, approx, error)
+    finally:
+        db.close()
+
+async def _finish_in_background(path: str, key: str, digest: str, approx: bool, user_id: int, name: str) -> None:
+    """Análisis completo después de la vista previa: queda en la cache y en el historial."""
+    try:
+        summary = await analysis_pool.analyze_path(path, approx=approx, wait=True)
+        await run_in_threadpool(get_cache().put_summary, key, summary)
+        db = SessionLocal()
+        try:
+            await run_in_threadpool(record_run, db, user_id, summary, "upload", name, digest, approx)
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"[analysis] Falló el análisis completo en segundo plano: {e}")
+        try:
+            await run_in_threadpool(_fail_in_background, user_id, digest, approx, str(e) or e.__class__.__name__)
+        except Exception as db_error:
+            print(f"[analysis] No pude marcar el análisis como fallido: {db_error}")
+    finally:
+        _discard(path)
+
+async def _preview(path: str, key: str, digest: str, approx: bool, user_id: int, name: str,
+                   db: Session, paths: str = "raw") -> HTMLResponse:
+    """Responde con la vista previa y deja el análisis completo corriendo (el temporal pasa a la tarea)."""
+    try:
+        try:
+            summary = await analysis_pool.run_in_pool(preview_file, path, approx, get_settings().ANALYSIS_PREVIEW_BYTES)
+        except analysis_pool.PoolBusy:
+            raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                                headers={"Retry-After": "5"})
+        except CorruptArchive as e:
+            raise HTTPException(status_code=400, detail=f"No se pudo descomprimir el archivo: {e}")
+        # si ya está corriendo (en este u otro worker) o terminado, no se lanza de nuevo
+        if await run_in_threadpool(start_run, db, user_id, "upload", name, digest, approx):
+            task = asyncio.create_task(_finish_in_background(path, key, digest, approx, user_id, name))
+            _BACKGROUND.add(task)
+            task.add_done_callback(_BACKGROUND.discard)
+            path = None  # el temporal ahora es de la tarea
+    finally:
+        if path is not None:
+            _discard(path)
+    query = "&".join(q for q in ("approx=1" if approx else "", "paths=normalized" if paths == "normalized" else "") if q)
+    summary["preview"]["result_url"] = f"/analysis/result/{digest}" + (f"?{query}" if query else "")
+    return HTMLResponse(_render_html(summary, paths), headers={"X-Cache": "miss", "X-Analysis-Mode": "preview"})
+
 @router.post("/generate")
 async def generate_post(
     file: UploadFile = File(...),
     as_pdf: bool = Form(False),
+    approx: bool = Form(False),
+    mode: str = Form("full"),
+    paths: str = Form("raw"),
+    db: Session = Depends(get_db),
     current=Depends(get_current_user_cookie),
 ):
     if current is None:
         return RedirectResponse("/login")
-    content = (await file.read()).decode("utf-8", errors="ignore")
-    summary = analyze_log(content)
+    _check_view(paths)
 
-    if as_pdf:
-        # PDF minimalista con reportlab si está instalado
+    cache = get_cache()
+    path, digest = await _spool_upload(file)
+    key = cache_key(digest, approx)
+    # vista previa sólo si vale la pena: sin resultado en cache y más grande que la muestra
+    # la cache lee y escribe disco: siempre fuera del event loop
+    summary = await run_in_threadpool(cache.get_summary, key)
+    if (mode == "preview" and summary is None
+            and os.path.getsize(path) > get_settings().ANALYSIS_PREVIEW_BYTES):
+        return await _preview(path, key, digest, approx, current.id, file.filename or "", db, paths)
+    try:
+        hit = summary is not None
+        if not hit:
+            summary = await analysis_pool.analyze_path(path, approx=approx)
+            await run_in_threadpool(cache.put_summary, key, summary)
+    except analysis_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                            headers={"Retry-After": "5"})
+    except CorruptArchive as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo descomprimir el archivo: {e}")
+    finally:
+        _discard(path)
+
+    # historial + rollups del dashboard; si la base falla, el reporte sale igual
+    try:
+        await run_in_threadpool(record_run, db, current.id, summary, "upload", file.filename or "", digest, approx)
+    except Exception as e:
+        db.rollback()
+        print(f"[analysis] No pude guardar el análisis: {e}")
+
+    if as_pdf and render_summary_pdf is not None:
+        pdf = await run_in_threadpool(cache.get, key, _view_kind("pdf", paths))
+        pdf_hit = pdf is not None
         try:
-            from reportlab.lib.pagesizes import A4
-            from reportlab.pdfgen import canvas
-            from reportlab.lib.units import cm
-            buf = io.BytesIO()
-            c = canvas.Canvas(buf, pagesize=A4)
-            w, h = A4
-            y = h - 2*cm
-            def line(txt, dy=14):
-                nonlocal y
-                c.drawString(2*cm, y, txt[:110])
-                y -= dy
-                if y < 2*cm:
-                    c.showPage(); y = h - 2*cm
-            c.setFont("Helvetica-Bold", 14); line("AlertTrail — Resumen de análisis")
-            c.setFont("Helvetica", 10)
-            line(f"Total requests: {summary['total']}")
-            for k in ("2xx","3xx","4xx","5xx"):
-                if k in summary["classes"]: line(f"{k}: {summary['classes'][k]}")
-            line(f"Errores 5xx: {summary['errors_5xx']}   •   429: {summary['rate_429']}")
-            line("Top paths:")
-            for p,cnt in summary["top_paths"][:8]:
-                line(f"  - {p}  :: {cnt}")
-            line("Top IPs:")
-            for ip,cnt in summary["top_ips"][:8]:
-                line(f"  - {ip}  :: {cnt}")
-            if summary["unauth_401"]:
-                line("401 por IP:")
-                for ip,cnt in summary["unauth_401"][:8]:
-                    line(f"  - {ip}  :: {cnt}")
-            if summary["admin_403"]:
-                line("403 /admin por IP:")
-                for ip,cnt in summary["admin_403"][:8]:
-                    line(f"  - {ip}  :: {cnt}")
-            if summary["sqli_hits"]:
-                line("Posibles SQLi:"); 
-                for s in summary["sqli_hits"][:5]: line(f"  - {s}")
-            if summary["probe_hits"]:
-                line("Probes sensibles:"); 
-                for s in summary["probe_hits"][:5]: line(f"  - {s}")
-            c.showPage(); c.save()
-            pdf = buf.getvalue()
-            headers = {"Content-Disposition": 'attachment; filename="alerttrail_report.pdf"'}
+            if pdf is None:
+                pdf = await analysis_pool.run_in_pool(render_summary_pdf, summary, paths)
+                await run_in_threadpool(cache.put, key, _view_kind("pdf", paths), pdf)
+            headers = {
+                "Content-Disposition": 'attachment; filename="alerttrail_report.pdf"',
+                "X-Cache": "hit" if pdf_hit else "miss",
+            }
             return Response(pdf, headers=headers, media_type="application/pdf")
         except Exception:
-            # si no hay reportlab, caemos a HTML
+            # si no hay reportlab (o el pool está lleno), caemos a HTML
             pass
 
-    html = _render_html(summary)
+    page = await run_in_threadpool(cache.get, key, _view_kind("html", paths))
+    if page is None:
+        page = _render_html(summary, paths).encode("utf-8")
+        await run_in_threadpool(cache.put, key, _view_kind("html", paths), page)
+    return HTMLResponse(page, headers={"X-Cache": "hit" if hit else "miss"})
+
+@router.get("/result/{digest}")
+async def result_get(
+    digest: str,
+    approx: bool = False,
+    format: str = "html",
+    paths: str = "raw",
+    db: Session = Depends(get_db),
+    current=Depends(get_current_user_cookie),
+):
+    """Resultado completo de un upload (p.ej. el que sigue después de una vista previa)."""
+    if current is None:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    _check_view(paths)
+    # sólo quien subió el archivo ve el resultado (el run del historial lo prueba)
+    run = find_run(db, current.id, digest, approx)
+    if run is None:
+        raise HTTPException(status_code=404, detail="Resultado no encontrado")
+    if is_stale(run):
+        return JSONResponse({"status": "failed", "detail": "El análisis se interrumpió; volvé a subir el archivo"},
+                            status_code=500)
+    if run.status == "running":
+        return JSONResponse({"status": "running"}, status_code=202, headers={"Retry-After": "5"})
+    if run.status == "failed":
+        return JSONResponse({"status": "failed", "detail": run.error}, status_code=500)
+    summary = await run_in_threadpool(get_cache().get_summary, cache_key(digest, approx)) or json.loads(run.summary)
+    if format == "json":
+        return {"status": "done", "summary": summary}
+    return HTMLResponse(_render_html(summary, paths))
+
+@router.get("/batch", response_class=HTMLResponse)
+async def batch_page(request: Request, current=Depends(get_current_user_cookie)):
+    if current is None:
+        return RedirectResponse("/login")
+    html = """<!doctype html><meta charset="utf-8">
+    <title>Analizar varios logs</title>
+    <style>
+      body{font-family:system-ui;background:#0b1620;color:#eaf2f7;margin:0}
+      .wrap{max-width:800px;margin:0 auto;padding:24px}
+      .card{background:rgba(255,255,255,.05);border:1px solid rgba(255,255,255,.1);border-radius:16px;padding:16px}
+      .btn{background:#0ea5e9;color:#03131c;padding:10px 14px;border:0;border-radius:10px;font-weight:700;cursor:pointer}
+      input[type=file]{padding:10px;background:#0e1c27;border:1px solid rgba(255,255,255,.2);border-radius:10px;color:#eaf2f7;width:100%}
+      label{display:block;margin:10px 0}
+    </style>
+    <div class="wrap">
+      <h1>Analizar varios logs juntos</h1>
+      <div class="card">
+        <form method="post" action="/analysis/batch" enctype="multipart/form-data">
+          <label>Logs rotados (access.log, access.log.1, access.log.2.gz...) o un .tar/.tar.gz/.zip con todos:
+            <input type="file" name="files" multiple required>
+          </label>
+          <label>Formato:
+            <select name="format">
+              <option value="html">HTML</option>
+              <option value="pdf">PDF</option>
+              <option value="json">JSON</option>
+            </select>
+          </label>
+          <label><input type="checkbox" name="approx" value="1"> Modo aproximado (memoria fija, para logs enormes)</label>
+          <label>Top de paths:
+            <select name="paths">
+              <option value="raw">tal cual</option>
+              <option value="normalized">normalizados (/users/{id}, ?q={v})</option>
+            </select>
+          </label>
+          <button class="btn" type="submit">Procesar</button>
+        </form>
+      </div>
+    </div>"""
     return HTMLResponse(html)
 
+BATCH_FORMATS = ("html", "pdf", "json")
+
+@router.post("/batch")
+async def batch_post(
+    files: List[UploadFile] = File(...),
+    approx: bool = Form(False),
+    format: str = Form("html"),
+    paths: str = Form("raw"),
+    db: Session = Depends(get_db),
+    current=Depends(get_current_user_cookie),
+):
+    """
+    Varios logs (o un tar/zip) en un solo resumen, con el desglose por archivo
+    en "files". Los archivos se analizan en paralelo en el pool y cada uno
+    queda en el historial con su sha256 (re-subirlo en otro lote no duplica
+    los rollups).
+    """
+    if current is None:
+        return RedirectResponse("/login")
+    _check_view(paths)
+    if format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format debe ser uno de: {', '.join(BATCH_FORMATS)}")
+    settings = get_settings()
+    if len(files) > settings.ANALYSIS_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"El lote tiene más de {settings.ANALYSIS_BATCH_MAX_FILES} archivos")
+
+    inputs = BatchInputs(settings.ANALYSIS_BATCH_MAX_FILES, settings.ANALYSIS_BATCH_MAX_BYTES)
+    try:
+        for i, file in enumerate(files, 1):
+            path, digest = await _spool_upload(file)
+            inputs.add(file.filename or f"archivo_{i}", path, digest)
+        results = await analysis_pool.analyze_many(inputs, approx=approx)
+    except analysis_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                            headers={"Retry-After": "5"})
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except CorruptArchive as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo abrir el archivo: {e}")
+    finally:
+        for path in inputs.temps:
+            _discard(path)
+
+    ok, parts, errors = [], [], {}
+    for i, (name, digest, part) in enumerate(results):
+        if isinstance(part, CorruptArchive):
+            # un .gz dañado no tira abajo el lote: queda marcado en su fila
+            errors[i] = {"name": name, "sha256": digest, "error": str(part) or part.__class__.__name__}
+            continue
+        if isinstance(part, Exception):
+            raise part
+        ok.append((i, name, digest))
+        parts.append(part)
+    if not parts:
+        raise HTTPException(status_code=400, detail={"error": "Ningún archivo del lote se pudo analizar",
+                                                     "files": list(errors.values())})
+    # resúmenes por archivo + merge en el pool: con muchos archivos no bloquea el event loop
+    try:
+        file_summaries, summary = await analysis_pool.run_in_pool(summarize_batch, parts, wait=True)
+    except analysis_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                            headers={"Retry-After": "5"})
+    runs = [(name, digest, fs) for (_i, name, digest), fs in zip(ok, file_summaries)]
+    rows = {i: file_entry(name, digest, fs) for (i, name, digest), fs in zip(ok, file_summaries)}
+    rows.update(errors)
+    summary["files"] = [rows[i] for i in sorted(rows)]
+
+    for name, digest, file_summary in runs:
+        try:
+            await run_in_threadpool(record_run, db, current.id, file_summary, "batch", name, digest, approx)
+        except Exception as e:
+            db.rollback()
+            print(f"[analysis] No pude guardar el análisis de {name}: {e}")
+
+    if format == "json":
+        return JSONResponse(summary)
+    if format == "pdf" and render_summary_pdf is not None:
+        try:
+            pdf = await analysis_pool.run_in_pool(render_summary_pdf, summary, paths)
+            return Response(pdf, media_type="application/pdf",
+                            headers={"Content-Disposition": 'attachment; filename="alerttrail_batch.pdf"'})
+        except Exception:
+            pass  # como en /generate: sin reportlab o con el pool lleno sale HTML
+    return HTMLResponse(_render_html(summary, paths))
+
+@router.on_event("shutdown")
+def _shutdown_pool():
+    analysis_pool.shutdown()
+
+# ---------------------------------------------------------------------------
+# Archivos locales del servidor (sólo admin, dentro de ANALYSIS_LOCAL_ROOT)
+# ---------------------------------------------------------------------------
+def _is_admin(u) -> bool:
+    role = (getattr(u, "role", "") or "").lower()
+    return bool(getattr(u, "is_admin", False) or getattr(u, "is_superuser", False) or role == "admin")
+
+class LocalAnalysisIn(BaseModel):
+    path: str = Field(..., description="Relativo a ANALYSIS_LOCAL_ROOT (o absoluto dentro de esa raíz)")
+    offset: int = Field(0, ge=0, description="Byte desde el que retomar (se alinea al próximo inicio de línea)")
+    max_bytes: Optional[int] = Field(None, gt=0, description="Tope de bytes a procesar en esta llamada")
+    approx: bool = False
+
+@router.post("/local")
+async def local_post(body: LocalAnalysisIn, current=Depends(get_current_user_cookie)):
+    if current is None:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    if not _is_admin(current):
+        raise HTTPException(status_code=403, detail="Solo administradores")
+    try:
+        path = resolve_local_path(body.path, get_settings().ANALYSIS_LOCAL_ROOT)
+        result = await analysis_pool.analyze_local(path, body.offset, body.max_bytes, approx=body.approx)
+    except LocalPathError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except analysis_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                            headers={"Retry-After": "5"})
+    except CorruptArchive as e:
+        raise HTTPException(status_code=400, detail=f"No se pudo descomprimir el archivo: {e}")
+    result["path"] = body.path
+    return result
+
 # Alias para el path antiguo (evita 404, pero el WAF podría bloquearlo)
 @router.get("/generate-pdf")
 async def old_generate_alias():
@@ -0,0 +1,72 @@
+# app/routers/analysis_history.py
+"""
+Historial de análisis y series para dashboards.
+
+    GET /analysis/runs                      -> últimos análisis guardados
+    GET /analysis/runs/{id}                 -> un análisis con su resumen completo
+    GET /analysis/rollups?start=&end=&granularity=minute|hour|day|auto
+
+Las series se leen de las tablas de rollup (ver app/services/analysis_store.py),
+nunca de los logs: el costo depende de la cantidad de buckets, no del volumen
+analizado.
+"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models_analysis import AnalysisRun
+from app.services.analysis_store import list_runs, query_rollups, run_out
+
+try:
+    from app.security import get_current_user_cookie
+except Exception:
+    def get_current_user_cookie():
+        return None
+
+router = APIRouter(prefix="/analysis", tags=["Analysis"])
+
+
+def _require_user(user):
+    if user is None:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    return user
+
+
+@router.get("/runs")
+def runs_list(
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current=Depends(get_current_user_cookie),
+):
+    user = _require_user(current)
+    return {"runs": list_runs(db, user.id, limit)}
+
+
+@router.get("/runs/{run_id}")
+def runs_get(run_id: int, db: Session = Depends(get_db), current=Depends(get_current_user_cookie)):
+    user = _require_user(current)
+    run = db.query(AnalysisRun).filter(AnalysisRun.id == run_id).first()
+    if not run or run.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Análisis no encontrado")
+    return run_out(run, with_summary=True)
+
+
+@router.get("/rollups")
+def rollups(
+    start: Optional[datetime] = Query(None, description="Inicio (hora del log); default: end - 30 días"),
+    end: Optional[datetime] = Query(None, description="Fin exclusivo; default: ahora"),
+    granularity: str = Query("auto", pattern="^(auto|minute|hour|day)$"),
+    db: Session = Depends(get_db),
+    current=Depends(get_current_user_cookie),
+):
+    user = _require_user(current)
+    # la hora del log no trae zona: se compara contra datetimes naive
+    end = (end or datetime.utcnow()).replace(tzinfo=None)
+    start = (start or end - timedelta(days=30)).replace(tzinfo=None)
+    try:
+        return query_rollups(db, user.id, start, end, granularity)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,189 @@
+# app/routers/analysis_sessions.py
+"""
+Sesiones de ingesta incremental para seguir logs en vivo.
+
+    POST   /analysis/sessions                        -> {"id", "offset": 0}
+    POST   /analysis/sessions/{id}/chunks?offset=N   (body: bytes crudos del log)
+    GET    /analysis/sessions/{id}                   -> resumen actualizado
+    POST   /analysis/sessions/{id}/close             -> procesa la última línea sin "\\n" y guarda el
+                                                        resultado en el historial (/analysis/runs)
+    DELETE /analysis/sessions/{id}
+
+`offset` es la posición del chunk dentro del stream del cliente. Un chunk ya
+procesado (reintento) se ignora, uno que se solapa se procesa sólo desde lo
+nuevo y uno que deja un hueco recibe 409 con el offset esperado: cada byte se
+procesa exactamente una vez.
+"""
+import json
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.database import get_db
+from app.models_analysis import AnalysisSession
+from app.services import analysis_pool
+from app.services.analysis_sessions import ingest_chunk
+from app.services.analysis_store import record_run
+
+try:
+    from app.security import get_current_user_cookie
+except Exception:
+    def get_current_user_cookie():
+        return None
+
+router = APIRouter(prefix="/analysis/sessions", tags=["Analysis"])
+
+# tope por POST; el cliente parte lo que tenga en varios chunks
+MAX_CHUNK_BYTES = 16 * 1024 * 1024
+
+
+class SessionIn(BaseModel):
+    name: str = ""
+    approx: bool = False
+
+
+def _out(s: AnalysisSession, **extra) -> dict:
+    return {
+        "id": s.token,
+        "name": s.name,
+        "approx": s.approx,
+        "offset": s.offset,
+        "chunks": s.chunks,
+        "pending_bytes": len(s.carry or b""),
+        "closed": s.closed,
+        "updated_at": s.updated_at.isoformat() if s.updated_at else None,
+        **extra,
+    }
+
+
+def _get_owned(db: Session, token: str, user) -> AnalysisSession:
+    if user is None:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    s = db.query(AnalysisSession).filter(AnalysisSession.token == token).first()
+    if not s or s.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Sesión no encontrada")
+    return s
+
+
+async def _read_body(request: Request) -> bytes:
+    body = bytearray()
+    async for part in request.stream():
+        body += part
+        if len(body) > MAX_CHUNK_BYTES:
+            raise HTTPException(status_code=413, detail=f"Chunk mayor a {MAX_CHUNK_BYTES} bytes")
+    return bytes(body)
+
+
+def _save(db: Session, s: AnalysisSession, expected: int, values: dict,
+          summary: Optional[dict] = None) -> bool:
+    """
+    Update condicional del estado: dos POST concurrentes del mismo offset no se
+    suman dos veces. Con `summary` (cierre) el run del historial se guarda en
+    la misma transacción: o queda cerrada y guardada, o ninguna de las dos y
+    el cierre se puede reintentar.
+    """
+    for attempt in range(2):
+        try:
+            updated = (
+                db.query(AnalysisSession)
+                .filter(AnalysisSession.id == s.id, AnalysisSession.offset == expected,
+                        AnalysisSession.closed.is_(False))
+                .update(values, synchronize_session=False)
+            )
+            if updated and summary is not None:
+                # la sesión cerrada entra al historial y a los rollups como un análisis más
+                record_run(db, s.user_id, summary, "session", s.name, approx=s.approx, commit=False)
+            db.commit()
+            break
+        except IntegrityError:
+            # otro análisis del usuario creó un bucket de rollup a la vez: se reintenta entero
+            db.rollback()
+            if attempt:
+                raise
+    db.refresh(s)
+    return bool(updated)
+
+
+async def _apply(db: Session, s: AnalysisSession, data: bytes, final: bool = False) -> None:
+    """Procesa `data` en el pool y guarda el estado sólo si nadie avanzó la sesión mientras tanto."""
+    expected = s.offset
+    try:
+        state, carry, summary = await analysis_pool.run_in_pool(
+            ingest_chunk, s.state, s.carry or b"", data, s.approx, final
+        )
+    except analysis_pool.PoolBusy:
+        raise HTTPException(status_code=503, detail="Analizador ocupado, reintentá en unos segundos",
+                            headers={"Retry-After": "5"})
+    values = {
+        AnalysisSession.state: state,
+        AnalysisSession.carry: carry,
+        AnalysisSession.summary: json.dumps(summary, ensure_ascii=False),
+        AnalysisSession.offset: expected + len(data),
+        AnalysisSession.chunks: AnalysisSession.chunks + 1,
+        AnalysisSession.updated_at: datetime.utcnow(),
+    }
+    if final:
+        values[AnalysisSession.closed] = True
+    if not await run_in_threadpool(_save, db, s, expected, values, summary if final else None):
+        raise HTTPException(status_code=409, detail={"error": "conflict", "expected_offset": s.offset})
+
+
+@router.post("")
+def create_session(body: SessionIn, db: Session = Depends(get_db), current=Depends(get_current_user_cookie)):
+    if current is None:
+        raise HTTPException(status_code=401, detail="No autenticado")
+    s = AnalysisSession(token=secrets.token_urlsafe(16), user_id=current.id, name=body.name[:200],
+                        approx=body.approx, carry=b"")
+    db.add(s)
+    db.commit()
+    db.refresh(s)
+    return _out(s)
+
+
+@router.post("/{token}/chunks")
+async def append_chunk(
+    token: str,
+    request: Request,
+    offset: Optional[int] = Query(None, ge=0, description="Posición del chunk en el stream (default: el offset actual)"),
+    db: Session = Depends(get_db),
+    current=Depends(get_current_user_cookie),
+):
+    s = _get_owned(db, token, current)
+    if s.closed:
+        raise HTTPException(status_code=409, detail={"error": "closed", "expected_offset": s.offset})
+    data = await _read_body(request)
+    start = s.offset if offset is None else offset
+    if start > s.offset:
+        raise HTTPException(status_code=409, detail={"error": "gap", "expected_offset": s.offset})
+    if start + len(data) <= s.offset:
+        return _out(s, duplicate=True)  # reintento de algo ya procesado
+    await _apply(db, s, data[s.offset - start:])
+    return _out(s)
+
+
+@router.get("/{token}")
+def get_session(token: str, db: Session = Depends(get_db), current=Depends(get_current_user_cookie)):
+    s = _get_owned(db, token, current)
+    return _out(s, summary=json.loads(s.summary) if s.summary else None)
+
+
+@router.post("/{token}/close")
+async def close_session(token: str, db: Session = Depends(get_db), current=Depends(get_current_user_cookie)):
+    s = _get_owned(db, token, current)
+    if not s.closed:
+        await _apply(db, s, b"", final=True)
+    return _out(s, summary=json.loads(s.summary) if s.summary else None)
+
+
+@router.delete("/{token}")
+def delete_session(token: str, db: Session = Depends(get_db), current=Depends(get_current_user_cookie)):
+    s = _get_owned(db, token, current)
+    db.delete(s)
+    db.commit()
+    return {"ok": True}
@@ -1,21 +1,25 @@
 # app/routers/mail.py
 import os
+import time
 import imaplib
 import email
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from email.header import decode_header, make_header
 from datetime import datetime, timedelta
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
 
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, UniqueConstraint
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from cryptography.fernet import Fernet, InvalidToken
 
-from app.database import Base, engine, get_db
+from app.database import Base, SessionLocal, engine, get_db
 from app.security import get_current_user_cookie
 
 # ---- PRO guard (mail sólo PRO/BIZ) ----
@@ -109,6 +113,8 @@ class MailAccount(Base):
 
 class MailAlert(Base):
     __tablename__ = "mail_alerts"
+    # un correo genera una sola alerta aunque dos escaneos lo vean a la vez
+    __table_args__ = (UniqueConstraint("user_id", "msg_uid", name="uq_mail_alert_user_msg"),)
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True)
     msg_uid = Column(String, index=True)
@@ -124,6 +130,34 @@ try:
 except Exception as e:
     print(f"[mail] aviso creando tablas: {e}")
 
+def _save_alert(db: Session, user_id: int, msg_uid: str, subject: str, sender: str, reasons: List[str]) -> bool:
+    """Guarda la alerta si es nueva. False si ya existía (también si otro escaneo la insertó recién)."""
+    exists = db.query(MailAlert.id).filter(
+        MailAlert.user_id == user_id,
+        MailAlert.msg_uid == msg_uid
+    ).first()
+    if exists:
+        return False
+    db.add(MailAlert(
+        user_id=user_id, msg_uid=msg_uid,
+        subject=subject, sender=sender,
+        reason="; ".join(reasons),
+    ))
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()  # la ganó otro escaneo entre la consulta y el insert
+        return False
+    return True
+
+def _close_imap(M: imaplib.IMAP4) -> None:
+    # logout() cierra el socket aunque el LOGOUT falle; el tope corto evita colgarse en una conexión muerta
+    try:
+        M.sock.settimeout(2.0)
+        M.logout()
+    except Exception as e:
+        print(f"[mail] aviso cerrando IMAP: {e}")
+
 # ---- Heurísticas de riesgo ----
 SUS_ATTACH_EXTS = {".exe", ".js", ".scr", ".bat", ".cmd", ".vbs", ".html", ".htm", ".zip", ".rar"}
 SUS_SUBJECT_WORDS = {"suspend","suspendida","password","contraseña","verify","verificar","urgente","factura","pago","bloqueada","blocked"}
@@ -164,7 +198,7 @@ def _risky(msg: email.message.Message) -> Tuple[bool, List[str]]:
         pass
     return (len(reasons) > 0, reasons)
 
-def _imap_login(acct: MailAccount) -> imaplib.IMAP4:
+def _imap_login(acct: MailAccount, timeout: Optional[float] = None) -> imaplib.IMAP4:
     import json
     f = _get_fernet()
     try:
@@ -175,7 +209,8 @@ def _imap_login(acct: MailAccount) -> imaplib.IMAP4:
     server = acct.imap_server or acct.imap_host or "imap.gmail.com"
     port = acct.imap_port or 993
 
-    M = imaplib.IMAP4_SSL(server, port) if acct.use_ssl else imaplib.IMAP4(server, port)
+    # timeout: tope por operación de socket (None = el default global)
+    M = imaplib.IMAP4_SSL(server, port, timeout=timeout) if acct.use_ssl else imaplib.IMAP4(server, port, timeout=timeout)
     M.login(data["username"], data["password"])
     return M
 
@@ -300,6 +335,7 @@ def manual_scan(request: Request, db: Session = Depends(get_db)):
         return RedirectResponse(url="/mail/connect", status_code=302)
 
     findings: List[Tuple[str, str, List[str]]] = []
+    M = None
     try:
         M = _imap_login(acct)
         M.select("INBOX")
@@ -321,21 +357,13 @@ def manual_scan(request: Request, db: Session = Depends(get_db)):
                 findings.append((subject, sender, reasons))
 
                 uid_str = uid.decode() if isinstance(uid, bytes) else str(uid)
-                exists = db.query(MailAlert).filter(
-                    MailAlert.user_id == user.id,
-                    MailAlert.msg_uid == uid_str
-                ).first()
-                if not exists:
-                    db.add(MailAlert(
-                        user_id=user.id, msg_uid=uid_str,
-                        subject=subject, sender=sender,
-                        reason="; ".join(reasons),
-                    ))
-                    db.commit()
+                if _save_alert(db, user.id, uid_str, subject, sender, reasons):
                     _notify_alert(user_id=user.id, subject=subject, sender=sender, reasons=reasons)
-        M.logout()
     except Exception as e:
         return HTMLResponse(f"<h2>Error escaneando: {e}</h2>", status_code=500)
+    finally:
+        if M is not None:
+            _close_imap(M)
 
     # ---------- UI ----------
     def _chip_list(rs: List[str]) -> str:
@@ -474,18 +502,48 @@ def mark_all_read(request: Request, db: Session = Depends(get_db)):
 # ---- Helpers para cron / API ----
 MAIL_CRON_SECRET = os.getenv("MAIL_CRON_SECRET", "")
 
-def _scan_account(db: Session, acct: MailAccount) -> dict:
-    scans = alerts = errors = 0
+# /mail/poll escanea varias casillas a la vez: tope global de conexiones IMAP,
+# tope por servidor (Gmail & co. cortan muchas sesiones simultáneas de una IP)
+# y tiempo máximo por casilla. Cada worker usa su propia sesión de DB: con una
+# base que no es SQLite, MAIL_POLL_WORKERS tiene que entrar en el pool del engine.
+MAIL_POLL_WORKERS = max(1, int(os.getenv("MAIL_POLL_WORKERS", "8")))
+MAIL_POLL_PER_HOST = max(1, int(os.getenv("MAIL_POLL_PER_HOST", "4")))
+MAIL_POLL_ACCOUNT_TIMEOUT = float(os.getenv("MAIL_POLL_ACCOUNT_TIMEOUT", "40"))
+
+class _ScanTimeout(Exception):
+    pass
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(0.1, deadline - time.monotonic())
+
+def _arm_timeout(M: imaplib.IMAP4, deadline: Optional[float]) -> None:
+    # antes de cada operación IMAP: el socket espera a lo sumo lo que le queda a la casilla
+    if deadline is not None:
+        M.sock.settimeout(_remaining(deadline))
+
+def _scan_account(db: Session, acct: MailAccount, deadline: Optional[float] = None) -> dict:
+    """
+    Escanea los últimos correos de `acct`. Con `deadline` (time.monotonic())
+    corta entre mensajes al vencer y cada operación IMAP tiene como tope lo
+    que queda de tiempo. La conexión se cierra siempre, también con error.
+    """
+    scans = alerts = errors = timeouts = 0
+    M = None
     try:
-        M = _imap_login(acct)
+        M = _imap_login(acct, timeout=_remaining(deadline))
+        _arm_timeout(M, deadline)
         M.select("INBOX")
         since = (datetime.utcnow() - timedelta(days=30)).strftime("%d-%b-%Y")
+        _arm_timeout(M, deadline)
         status, data = M.search(None, f'(SINCE {since})')
         if status != "OK":
             raise RuntimeError("No pude listar correos")
 
         uids = data[0].split()[-30:]
         for uid in reversed(uids):
+            if deadline is not None and time.monotonic() > deadline:
+                raise _ScanTimeout(f"{scans} correos en {MAIL_POLL_ACCOUNT_TIMEOUT:g} s")
+            _arm_timeout(M, deadline)
             st, msg_data = M.fetch(uid, "(RFC822)")
             if st != "OK" or not msg_data:
                 continue
@@ -496,33 +554,78 @@ def _scan_account(db: Session, acct: MailAccount) -> dict:
                 subject = _decode_hdr(msg.get("Subject", ""))
                 sender = _decode_hdr(msg.get("From", ""))
                 uid_str = uid.decode() if isinstance(uid, bytes) else str(uid)
-                exists = db.query(MailAlert).filter(
-                    MailAlert.user_id == acct.user_id,
-                    MailAlert.msg_uid == uid_str
-                ).first()
-                if not exists:
-                    db.add(MailAlert(
-                        user_id=acct.user_id, msg_uid=uid_str,
-                        subject=subject, sender=sender,
-                        reason="; ".join(reasons),
-                    ))
-                    db.commit()
+                if _save_alert(db, acct.user_id, uid_str, subject, sender, reasons):
                     _notify_alert(user_id=acct.user_id, subject=subject, sender=sender, reasons=reasons)
                 alerts += 1
-        M.logout()
+    except (_ScanTimeout, TimeoutError) as e:
+        # lo ya escaneado queda guardado; la próxima corrida sigue desde los más nuevos
+        timeouts += 1
+        print(f"[mail][_scan_account] tiempo agotado en {acct.email}: {e}")
     except Exception as e:
         errors += 1
         print(f"[mail][_scan_account] error: {e}")
-    return {"scans": scans, "alerts": alerts, "errors": errors}
+    finally:
+        if M is not None:
+            _close_imap(M)
+    return {"scans": scans, "alerts": alerts, "errors": errors, "timeouts": timeouts}
+
+def _scan_account_id(acct_id: int) -> dict:
+    """Worker del poll: sesión de DB propia (las sesiones no se comparten entre threads)."""
+    deadline = time.monotonic() + MAIL_POLL_ACCOUNT_TIMEOUT
+    db = SessionLocal()
+    try:
+        acct = db.get(MailAccount, acct_id)
+        if acct is None:  # se desvinculó mientras esperaba turno
+            return {"scans": 0, "alerts": 0, "errors": 0, "timeouts": 0}
+        return _scan_account(db, acct, deadline)
+    finally:
+        db.close()
 
 def _run_scan_all_accounts(db: Session) -> dict:
-    total = {"scans": 0, "alerts": 0, "errors": 0}
-    accounts = db.query(MailAccount).all()
-    for acct in accounts:
-        r = _scan_account(db, acct)
-        total["scans"] += r["scans"]
-        total["alerts"] += r["alerts"]
-        total["errors"] += r["errors"]
+    """
+    Escanea todas las casillas en paralelo. Una casilla entra al pool sólo si
+    hay lugar en el tope global y en el de su servidor IMAP, tomando los
+    servidores por turno: una cola larga de Gmail no ocupa workers esperando
+    y las demás casillas no esperan detrás de ella. El poll tarda lo que la
+    casilla más lenta (acotada por MAIL_POLL_ACCOUNT_TIMEOUT), no la suma.
+    """
+    total = {"accounts": 0, "scans": 0, "alerts": 0, "errors": 0, "timeouts": 0}
+    pending: Dict[str, deque] = defaultdict(deque)
+    for acct_id, server, host in db.query(MailAccount.id, MailAccount.imap_server, MailAccount.imap_host).order_by(MailAccount.id):
+        pending[(server or host or "imap.gmail.com").lower()].append(acct_id)
+        total["accounts"] += 1
+    # que la sesión del request no quede con una transacción abierta mientras escriben los workers
+    db.rollback()
+
+    active: Dict[str, int] = defaultdict(int)
+    running: Dict[object, str] = {}
+    with ThreadPoolExecutor(max_workers=MAIL_POLL_WORKERS, thread_name_prefix="mail-poll") as pool:
+        while pending or running:
+            # repartir por turno entre servidores con lugar
+            progressed = True
+            while progressed and len(running) < MAIL_POLL_WORKERS:
+                progressed = False
+                for host in list(pending):
+                    if len(running) >= MAIL_POLL_WORKERS:
+                        break
+                    if active[host] >= MAIL_POLL_PER_HOST:
+                        continue
+                    queue = pending[host]
+                    running[pool.submit(_scan_account_id, queue.popleft())] = host
+                    active[host] += 1
+                    progressed = True
+                    if not queue:
+                        del pending[host]
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for fut in done:
+                active[running.pop(fut)] -= 1
+                try:
+                    r = fut.result()
+                except Exception as e:
+                    r = {"errors": 1}
+                    print(f"[mail][poll] error: {e}")
+                for k in ("scans", "alerts", "errors", "timeouts"):
+                    total[k] += r.get(k, 0)
     return total
 
 # ---- Endpoint cron seguro ----
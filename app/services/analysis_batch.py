@@ -0,0 +1,184 @@
+# app/services/analysis_batch.py
+"""
+Análisis por lote: varios logs (p.ej. `access.log`, `access.log.1`,
+`access.log.2.gz`) o un tar/zip con todos, en un solo resumen.
+
+Los tar se leen en modo stream (miembro por miembro, también .tar.gz/.bz2/.xz)
+y los zip por su índice; cada archivo regular se copia a un temporal con su
+sha256 calculado en la misma pasada y pasa al pool apenas está listo (ver
+`analysis_pool.analyze_many`), así la extracción del siguiente se solapa con
+el análisis de los anteriores. Los miembros comprimidos (.gz/.bz2/.xz) se
+descomprimen al analizarlos, como un upload suelto.
+
+Los estados parciales se mergean en orden de tiempo (primera hora vista en
+cada archivo), no en el orden del upload: con logs rotados las sesiones que
+cruzan de un archivo al siguiente se unen como en una sola pasada (si los
+archivos no se pisan en el tiempo; los conteos no dependen del orden).
+"""
+import hashlib
+import lzma
+import os
+import tarfile
+import tempfile
+import zipfile
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.decompress import CorruptArchive
+from app.services.log_analyzer import UnifiedAnalyzer, merge_analyzers
+
+COPY_CHUNK = 1024 * 1024
+
+# metadata de otros sistemas que viene dentro de los zip/tar
+_JUNK_PREFIXES = ("__MACOSX/",)
+_JUNK_NAMES = (".DS_Store", "Thumbs.db")
+
+
+class BatchTooLarge(ValueError):
+    """El lote pasa ANALYSIS_BATCH_MAX_FILES o ANALYSIS_BATCH_MAX_BYTES."""
+
+
+def detect_archive(path: str) -> Optional[str]:
+    """"zip" | "tar" si el archivo es un contenedor (el tar puede venir comprimido), si no None."""
+    if zipfile.is_zipfile(path):
+        return "zip"
+    try:
+        if tarfile.is_tarfile(path):
+            return "tar"
+    except (OSError, EOFError, lzma.LZMAError, zlib.error):
+        pass  # un .gz/.xz truncado: lo reporta el análisis del archivo
+    return None
+
+
+def _is_junk(name: str) -> bool:
+    return name.startswith(_JUNK_PREFIXES) or os.path.basename(name) in _JUNK_NAMES
+
+
+class BatchInputs:
+    """
+    Recorre los uploads de un lote y expande los tar/zip. Cada temporal que
+    crea queda en `temps` para que el caller los borre al terminar.
+    """
+
+    def __init__(self, max_files: int, max_bytes: int):
+        # (nombre, temporal, sha256) de cada upload tal como se spooleó
+        self.uploads: List[Tuple[str, str, str]] = []
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.temps: List[str] = []
+        self.files = 0
+        self.bytes = 0
+
+    def add(self, name: str, path: str, digest: str) -> None:
+        self.uploads.append((name, path, digest))
+        self.temps.append(path)
+
+    def __iter__(self) -> Iterator[Tuple[str, str, str]]:
+        """(nombre, temporal, sha256) de cada log del lote, en orden de llegada."""
+        for name, path, digest in self.uploads:
+            kind = detect_archive(path)
+            if kind is None:
+                self._count(name, os.path.getsize(path))
+                yield name, path, digest
+            elif kind == "zip":
+                yield from self._zip_members(name, path)
+            else:
+                yield from self._tar_members(name, path)
+
+    def _count(self, name: str, size: int) -> None:
+        self.files += 1
+        self.bytes += size
+        if self.files > self.max_files:
+            raise BatchTooLarge(f"El lote tiene más de {self.max_files} archivos")
+        if self.bytes > self.max_bytes:
+            raise BatchTooLarge(f"El lote pasa los {self.max_bytes} bytes (en {name})")
+
+    def _extract(self, name: str, src) -> Tuple[str, str]:
+        digest = hashlib.sha256()
+        fd, path = tempfile.mkstemp(prefix="alerttrail_", suffix=".log")
+        self.temps.append(path)
+        size = 0
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = src.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                # el tope se controla mientras se copia: un miembro enorme no llega a disco entero
+                if self.bytes + size > self.max_bytes:
+                    raise BatchTooLarge(f"El lote pasa los {self.max_bytes} bytes (en {name})")
+                digest.update(chunk)
+                out.write(chunk)
+        self._count(name, size)
+        return path, digest.hexdigest()
+
+    def _zip_members(self, archive: str, path: str) -> Iterator[Tuple[str, str, str]]:
+        try:
+            with zipfile.ZipFile(path) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or _is_junk(info.filename):
+                        continue
+                    name = f"{archive}:{info.filename}"
+                    with zf.open(info) as src:
+                        tmp, digest = self._extract(name, src)
+                    yield name, tmp, digest
+        except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError) as e:
+            raise CorruptArchive(f"zip inválido: {e}") from None
+        except RuntimeError as e:  # miembros cifrados
+            raise CorruptArchive(f"zip no soportado: {e}") from None
+
+    def _tar_members(self, archive: str, path: str) -> Iterator[Tuple[str, str, str]]:
+        try:
+            # "r|*": stream, sin índice ni seeks; sirve igual para .tar.gz/.bz2/.xz
+            with tarfile.open(path, mode="r|*") as tf:
+                for info in tf:
+                    if not info.isfile() or _is_junk(info.name):
+                        continue  # directorios, links, dispositivos
+                    name = f"{archive}:{info.name}"
+                    src = tf.extractfile(info)
+                    tmp, digest = self._extract(name, src)
+                    yield name, tmp, digest
+        except (tarfile.TarError, zlib.error, EOFError, lzma.LZMAError, OSError) as e:
+            raise CorruptArchive(f"tar inválido: {e}") from None
+
+
+def file_entry(name: str, digest: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Fila del desglose por archivo a partir del resumen de ese archivo."""
+    minutes = list(summary["timeline"])
+    auth = (summary.get("auth") or {}).get("summary") or {}
+    return {
+        "name": name,
+        "sha256": digest,
+        "format": summary["format"],
+        "total": summary["total"],
+        "classes": summary["classes"],
+        "errors_5xx": summary["errors_5xx"],
+        "rate_429": summary["rate_429"],
+        "sqli_total": summary["sqli_total"],
+        "probe_total": summary["probe_total"],
+        "ssh_failed": auth.get("ssh_failed", 0),
+        "bot_share": summary["user_agents"]["bot_share"],
+        "first": minutes[0] if minutes else None,
+        "last": minutes[-1] if minutes else None,
+        "top_ips": summary["top_ips"][:3],
+    }
+
+
+def _log_start(part: UnifiedAnalyzer) -> Optional[int]:
+    return part.http.sessions.start
+
+
+def merge_in_time_order(parts: List[UnifiedAnalyzer]) -> UnifiedAnalyzer:
+    """Mergea por la primera hora de cada archivo (los que no tienen hora, al final y en orden)."""
+    order = sorted(range(len(parts)), key=lambda i: (_log_start(parts[i]) is None, _log_start(parts[i]) or 0, i))
+    return merge_analyzers(parts[i] for i in order)
+
+
+def summarize_batch(parts: List[UnifiedAnalyzer]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    (resumen de cada archivo, resumen del lote). Top-level para correr en el
+    pool; los resúmenes por archivo salen antes del merge, que acumula sobre
+    el primer estado.
+    """
+    summaries = [part.summary() for part in parts]
+    return summaries, merge_in_time_order(parts).summary()
@@ -0,0 +1,208 @@
+# app/services/analysis_pool.py
+"""
+Pool de procesos para el trabajo CPU-bound de /analysis (parseo de logs y PDF).
+
+El event loop sólo espera el resultado, así /health, login, etc. siguen
+respondiendo mientras se procesa un upload grande. La cola está acotada por
+ANALYSIS_MAX_PENDING: si se llena, `run_in_pool` levanta `PoolBusy` en vez de
+encolar sin límite. Los archivos de más de ANALYSIS_SHARD_MIN_BYTES se parten
+en tramos (uno por worker) y los resultados parciales se mergean; el merge y
+el resumen también corren en el pool, no en el event loop. Un lote de
+archivos (`analyze_many`) reparte los archivos entre los workers. Si un
+worker muere (OOM, segfault) el pool queda roto: se descarta, la llamada
+levanta `PoolBroken` y la siguiente arma un pool nuevo.
+"""
+import asyncio
+import contextlib
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.config import get_settings
+from app.services.local_logs import analyze_mapped_range, plan_range, split_range
+from app.services.log_analyzer import analyze_file_range, merge_analyzers, merge_and_summarize, shard_ranges
+
+_executor: Optional[Executor] = None
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class PoolBusy(Exception):
+    """Hay ANALYSIS_MAX_PENDING trabajos en curso; el caller debería responder 503."""
+
+
+class PoolBroken(PoolBusy):
+    """Murió un worker a mitad del trabajo; el pool se rearma en la próxima llamada (también 503)."""
+
+
+def _get_executor() -> Optional[Executor]:
+    global _executor
+    workers = get_settings().ANALYSIS_WORKERS
+    if workers <= 0:
+        return None  # run_in_executor(None, ...) -> thread pool por defecto
+    if _executor is None:
+        # spawn: no heredamos threads/conexiones del proceso de uvicorn
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def _discard_executor(executor: Optional[Executor]) -> None:
+    # sólo si sigue siendo el actual: otra llamada puede haber armado uno nuevo
+    global _executor
+    if executor is None:
+        return
+    executor.shutdown(wait=False, cancel_futures=True)
+    if _executor is executor:
+        _executor = None
+
+
+@contextlib.contextmanager
+def _recover(executor: Optional[Executor]):
+    try:
+        yield
+    except BrokenProcessPool as e:
+        print(f"[analysis] Se cayó un worker del pool, se rearma: {e}")
+        _discard_executor(executor)
+        raise PoolBroken() from e
+
+
+def _get_slots() -> asyncio.Semaphore:
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, get_settings().ANALYSIS_MAX_PENDING))
+    return _slots
+
+
+@contextlib.asynccontextmanager
+async def _job_slot(wait: bool = False):
+    # wait=True: trabajos en segundo plano, esperan su turno en vez de PoolBusy
+    slots = _get_slots()
+    if slots.locked() and not wait:
+        raise PoolBusy()
+    async with slots:
+        yield
+
+
+async def run_in_pool(fn: Callable[..., Any], *args: Any, wait: bool = False) -> Any:
+    """
+    Ejecuta `fn(*args)` en el pool. `fn` tiene que ser una función top-level
+    (picklable). Con `wait` espera un lugar libre en vez de levantar PoolBusy.
+    """
+    async with _job_slot(wait):
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        with _recover(executor):
+            return await loop.run_in_executor(executor, fn, *args)
+
+
+def _shard_count(path: str) -> int:
+    return _shards_for_bytes(os.path.getsize(path))
+
+
+def _shards_for_bytes(nbytes: int) -> int:
+    settings = get_settings()
+    if settings.ANALYSIS_WORKERS <= 1:
+        return 1
+    if nbytes < settings.ANALYSIS_SHARD_MIN_BYTES:
+        return 1
+    return settings.ANALYSIS_WORKERS
+
+
+async def analyze_path(path: str, approx: bool = False, wait: bool = False) -> Dict[str, Any]:
+    """
+    Analiza un archivo del disco en el pool. Un upload ocupa un solo lugar de
+    la cola aunque se reparta en varios tramos. Con `wait` espera un lugar
+    libre en vez de levantar PoolBusy.
+    """
+    async with _job_slot(wait):
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        # shard_ranges hace seeks y lecturas: en un thread, no en el event loop
+        ranges = await loop.run_in_executor(None, shard_ranges, path, _shard_count(path))
+        with _recover(executor):
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(executor, analyze_file_range, path, start, end, approx)
+                for start, end in ranges
+            ))
+            return await loop.run_in_executor(executor, merge_and_summarize, parts)
+
+
+async def _analyze_shards(loop, executor: Optional[Executor], path: str, approx: bool) -> Any:
+    ranges = await loop.run_in_executor(None, shard_ranges, path, _shard_count(path))
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(executor, analyze_file_range, path, start, end, approx)
+        for start, end in ranges
+    ))
+    if len(parts) == 1:
+        return parts[0]
+    return await loop.run_in_executor(executor, merge_analyzers, parts)
+
+
+async def analyze_many(files: Iterable[Tuple[str, str, str]], approx: bool = False
+                       ) -> List[Tuple[str, str, Any]]:
+    """
+    Analiza varios archivos a la vez; todo el lote ocupa un solo lugar de la
+    cola. `files` da (nombre, path, sha256) y se recorre en un thread (puede
+    estar extrayendo un tar/zip): cada archivo entra al pool apenas sale, así
+    la extracción se solapa con el análisis. Devuelve (nombre, sha256,
+    UnifiedAnalyzer o la excepción de ese archivo) en el orden de `files`; un
+    error al recorrer `files` o un worker caído corta el lote.
+    """
+    async with _job_slot():
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        it = iter(files)
+        jobs: List[Tuple[str, str, "asyncio.Future"]] = []
+        try:
+            while True:
+                item = await loop.run_in_executor(None, next, it, None)
+                if item is None:
+                    break
+                name, path, digest = item
+                jobs.append((name, digest, asyncio.ensure_future(_analyze_shards(loop, executor, path, approx))))
+        finally:
+            # con error de extracción igual se espera lo ya encolado (los temporales siguen en uso)
+            results = await asyncio.gather(*(job for _n, _d, job in jobs), return_exceptions=True)
+        broken = next((res for res in results if isinstance(res, BrokenProcessPool)), None)
+        if broken is not None:
+            with _recover(executor):
+                raise broken
+        return [(name, digest, res) for (name, digest, _job), res in zip(jobs, results)]
+
+
+async def analyze_local(path: str, offset: int = 0, max_bytes: Optional[int] = None,
+                        approx: bool = False) -> Dict[str, Any]:
+    """
+    Analiza un archivo local (ya validado con `resolve_local_path`) desde
+    `offset`, vía mmap. Devuelve el resumen y `next_offset` para retomar.
+    """
+    async with _job_slot():
+        loop = asyncio.get_running_loop()
+        executor = _get_executor()
+        start, end, size = await loop.run_in_executor(None, plan_range, path, offset, max_bytes)
+        shards = _shards_for_bytes(end - start)
+        ranges = await loop.run_in_executor(None, split_range, path, start, end, shards)
+        with _recover(executor):
+            parts = await asyncio.gather(*(
+                loop.run_in_executor(executor, analyze_mapped_range, path, a, b, approx)
+                for a, b in ranges
+            ))
+            summary = await loop.run_in_executor(executor, merge_and_summarize, parts)
+        return {
+            "summary": summary,
+            "start": start,
+            "next_offset": end,
+            "size": size,
+            "eof": end >= size,
+        }
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,236 @@
+# app/services/analysis_preview.py
+"""
+Vista previa de uploads enormes por muestreo (mode=preview en /analysis/generate).
+
+- Archivos planos: muestreo estratificado por offset. El archivo se parte en
+  `strata` tramos iguales y de cada uno se lee una ventana de líneas completas
+  en una posición pseudoaleatoria (semilla = tamaño del archivo, así la misma
+  vista previa sale igual). Se leen ~`sample_bytes` en total, sin importar el
+  tamaño del archivo.
+- Comprimidos (no se puede saltar a un offset): muestreo sistemático, una de
+  cada `stride` líneas, en estratos de `stride * STREAM_LINES_PER_STRATUM`
+  líneas. Se descomprime todo pero se parsea sólo la muestra.
+
+Cada estrato se expande por su peso (bytes o líneas del estrato / muestreados)
+y el intervalo de confianza usa la varianza de estratos colapsados de a pares
+(una unidad por estrato): es conservador si el log cambia poco entre tramos
+vecinos. Con pocos estratos esa varianza no sirve (dos estratos de tamaños
+distintos dan intervalos absurdos): por offset se usan al menos MIN_STRATA y
+en un stream con menos estratos la muestra se toma como aleatoria simple de
+líneas (varianza binomial). Las distribuciones (estados, top paths crudos y normalizados, IPs,
+subredes, templates de ataque, clases de UA) se escalan por la fracción global; las listas
+de ejemplos (hits, 401/403) quedan como se vieron en la muestra y el timeline
+y las sesiones no se incluyen.
+"""
+import math
+import os
+import random
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.services.decompress import detect_compression, iter_decompressed
+from app.services.log_analyzer import READ_CHUNK, UnifiedAnalyzer, iter_blocks, merge_analyzers
+
+# z de un intervalo del 95%
+Z_95 = 1.96
+
+# muestreo sistemático de streams: líneas muestreadas por estrato
+STREAM_LINES_PER_STRATUM = 500
+
+# menos estratos que esto no alcanzan para la varianza de estratos colapsados
+MIN_STRATA = 20
+
+
+def _metrics(summary: Dict[str, Any]) -> Dict[str, int]:
+    """Conteos del resumen que se estiman con intervalo."""
+    out = {
+        "total": summary["total"],
+        "errors_5xx": summary["errors_5xx"],
+        "rate_429": summary["rate_429"],
+        "sqli_total": summary.get("sqli_total", 0),
+        "probe_total": summary.get("probe_total", 0),
+    }
+    out.update({f"classes.{k}": v for k, v in summary["classes"].items()})
+    auth = (summary.get("auth") or {}).get("summary") or {}
+    for k in ("ssh_failed", "ssh_accepted"):
+        if k in auth:
+            out[f"auth.{k}"] = auth[k]
+    return out
+
+
+def _estimate(units: List[Tuple[float, Dict[str, int]]],
+              lines: Optional[Tuple[int, int]] = None) -> Dict[str, Dict[str, int]]:
+    """
+    units: (peso, conteos) de cada estrato, en orden. Total estimado = suma de
+    peso * conteo; varianza por estratos colapsados (pares vecinos, el último
+    grupo de tres si son impares). Con `lines` = (líneas del stream,
+    muestreadas) y menos de MIN_STRATA estratos, varianza binomial: cada conteo
+    es de líneas que cumplen algo, estimado por su proporción en la muestra
+    (con +1/+2 en la varianza, para que 0 o todas no den un intervalo nulo).
+    """
+    names = sorted({k for _w, m in units for k in m})
+    groups = [units[i:i + 2] for i in range(0, len(units), 2)]
+    if len(groups) > 1 and len(groups[-1]) == 1:
+        groups[-2] = groups[-2] + groups.pop()
+    binomial = lines is not None and len(units) < MIN_STRATA
+    out: Dict[str, Dict[str, int]] = {}
+    for name in names:
+        totals = [w * m.get(name, 0) for w, m in units]
+        value = sum(totals)
+        var = 0.0
+        if binomial:
+            population, n = lines
+            if 1 < n < population:
+                p = (min(n, sum(m.get(name, 0) for _w, m in units)) + 1) / (n + 2)
+                var = population ** 2 * (1 - n / population) * p * (1 - p) / (n - 1)
+        else:
+            for g in groups:
+                t = [w * m.get(name, 0) for w, m in g]
+                if len(t) > 1:
+                    mean = sum(t) / len(t)
+                    var += len(t) / (len(t) - 1) * sum((x - mean) ** 2 for x in t)
+        half = Z_95 * math.sqrt(var)
+        out[name] = {"value": round(value), "low": max(0, math.floor(value - half)), "high": math.ceil(value + half)}
+    return out
+
+
+def _window(f, start: int, end: int, size: int) -> bytes:
+    """
+    Las líneas que empiezan en [start, end), completas (la última se lee más
+    allá de `end` si hace falta). Ventanas que cubren estratos vecinos no
+    repiten ni pierden líneas.
+    """
+    f.seek(max(0, start - 1))
+    data = f.read(end - start + (1 if start > 0 else 0))
+    if start > 0:
+        # una línea empieza en p si p == 0 o el byte p-1 es "\n"
+        cut = data.find(b"\n")
+        data = data[cut + 1:] if cut != -1 else b""
+    if data and not data.endswith(b"\n") and end < size:
+        tail = bytearray()
+        while True:
+            chunk = f.read(READ_CHUNK)
+            if not chunk:
+                break
+            nl = chunk.find(b"\n")
+            if nl != -1:
+                tail += chunk[:nl + 1]
+                break
+            tail += chunk
+        data += bytes(tail)
+    return data
+
+
+def _byte_units(path: str, size: int, approx: bool, sample_bytes: int,
+                strata: int) -> Iterator[Tuple[float, UnifiedAnalyzer, int]]:
+    rng = random.Random(size)
+    window = max(1, sample_bytes // strata)
+    with open(path, "rb") as f:
+        for h in range(strata):
+            lo, hi = size * h // strata, size * (h + 1) // strata
+            if hi <= lo:
+                continue
+            start = lo + rng.randrange(max(1, hi - lo - window + 1))
+            end = min(hi, start + window)
+            data = _window(f, start, end, size)
+            unit = UnifiedAnalyzer(approx=approx)
+            if data:
+                unit.feed_blocks(iter_blocks([data]))
+            # cada inicio de línea del estrato cae en la ventana con probabilidad
+            # (end - start) / (hi - lo): ese es el factor de expansión
+            yield (hi - lo) / (end - start), unit, end - start
+
+
+def _line_units(path: str, kind: str, approx: bool,
+                stride: int) -> Iterator[Tuple[float, UnifiedAnalyzer, int]]:
+    per_stratum = stride * STREAM_LINES_PER_STRATUM
+    offset = random.Random(stride).randrange(stride)
+    seen, sample = 0, []
+    for block in iter_blocks(iter_decompressed(path, kind, READ_CHUNK)):
+        for ln in block:
+            if seen % stride == offset:
+                sample.append(ln)
+            seen += 1
+            if seen % per_stratum == 0:
+                yield _line_unit(sample, per_stratum, approx)
+                sample = []
+    if seen % per_stratum:
+        yield _line_unit(sample, seen % per_stratum, approx)
+
+
+def _line_unit(sample: List[Any], lines: int, approx: bool) -> Tuple[float, UnifiedAnalyzer, int]:
+    unit = UnifiedAnalyzer(approx=approx)
+    _feed_mixed(unit, sample)
+    return (lines / len(sample) if sample else 0.0), unit, len(sample)
+
+
+def _feed_mixed(unit: UnifiedAnalyzer, lines: List[Any]) -> None:
+    # iter_blocks da bloques homogéneos, pero la muestra puede mezclar str y bytes
+    run: List[Any] = []
+    for ln in lines:
+        if run and type(ln) is not type(run[0]):
+            unit.feed_blocks([run])
+            run = []
+        run.append(ln)
+    if run:
+        unit.feed_blocks([run])
+
+
+def preview_file(path: str, approx: bool = False, sample_bytes: int = 8 * 1024 * 1024,
+                 strata: int = 64, stride: int = 20) -> Dict[str, Any]:
+    """Resumen aproximado de `path` más la clave "preview" con estimaciones e intervalos del 95%."""
+    kind = detect_compression(path)
+    size = os.path.getsize(path)
+    lines = None
+    if kind is None:
+        method = "bytes"
+        units = list(_byte_units(path, size, approx, sample_bytes, max(strata, MIN_STRATA)))
+        population, sampled = size, sum(n for _w, _u, n in units)
+    else:
+        method = "lines"
+        units = list(_line_units(path, kind, approx, stride))
+        population = round(sum(w * n for w, _u, n in units))
+        sampled = sum(n for _w, _u, n in units)
+        lines = (population, sampled)
+
+    # antes del merge: merge_analyzers acumula sobre la primera unidad
+    estimates = _estimate([(w, _metrics(u.summary())) for w, u, _n in units], lines)
+    merged = merge_analyzers(u for _w, u, _n in units) if units else UnifiedAnalyzer(approx=approx)
+    out = merged.summary()
+    factor = population / sampled if sampled else 0.0
+
+    def scaled(n: int) -> int:
+        return round(n * factor)
+
+    def est(name: str) -> int:
+        return estimates.get(name, {}).get("value", 0)
+
+    out["total"] = est("total")
+    out["classes"] = {k: est(f"classes.{k}") for k in out["classes"]}
+    out["by_status"] = {k: scaled(v) for k, v in out["by_status"].items()}
+    out["top_paths"] = [(p, scaled(c)) for p, c in out["top_paths"]]
+    out["top_paths_normalized"] = [(p, scaled(c)) for p, c in out["top_paths_normalized"]]
+    out["top_ips"] = [(ip, scaled(c)) for ip, c in out["top_ips"]]
+    out["top_subnets"] = {name: [(net, scaled(c)) for net, c in nets] for name, nets in out["top_subnets"].items()}
+    templates = out["templates"]
+    templates["lines"] = scaled(templates["lines"])
+    templates["evicted_lines"] = scaled(templates["evicted_lines"])
+    templates["top"] = [dict(t, count=scaled(t["count"])) for t in templates["top"]]
+    agents = out["user_agents"]
+    agents["classes"] = {k: scaled(c) for k, c in agents["classes"].items()}
+    agents["top_scanners"] = [(name, scaled(c)) for name, c in agents["top_scanners"]]
+    agents["top_bots"] = [(name, scaled(c)) for name, c in agents["top_bots"]]
+    for name in ("errors_5xx", "rate_429", "sqli_total", "probe_total"):
+        out[name] = est(name)
+    # las sesiones de una muestra salen cortadas: no se estiman
+    out["timeline"], out["timeline_detail"], out["sessions"] = {}, {}, {}
+    out["preview"] = {
+        "method": method,  # bytes: ventanas por offset; lines: 1 de cada `stride` líneas
+        "population": population,  # bytes del archivo o líneas del stream
+        "sampled": sampled,
+        "fraction": round(sampled / population, 6) if population else 1.0,
+        "strata": len(units),
+        "variance": "binomial" if lines is not None and len(units) < MIN_STRATA else "collapsed_strata",
+        "confidence": 0.95,
+        "estimates": estimates,
+    }
+    return out
@@ -1,42 +1,313 @@
 # app/services/analysis_service.py
 import re
-from collections import defaultdict
+from collections import OrderedDict, defaultdict, deque
+from datetime import datetime
+from typing import Deque, Dict, Iterable, List, Optional, Set, Union
+
+from app.services.detectors import DetectorEngine
 
 SSH_FAIL_RE = re.compile(r"Failed password for (invalid user )?(?P<user>\S+) from (?P<ip>\d{1,3}(?:\.\d{1,3}){3}) .*ssh2")
 SSH_OK_RE   = re.compile(r"Accepted password for (?P<user>\S+) from (?P<ip>\d{1,3}(?:\.\d{1,3}){3}) .*ssh2")
 SQLI_RE     = re.compile(r"('|\")\s*or\s*1=1|union\s+select|--\s", re.I)
 XSS_RE      = re.compile(r"<script>|onerror=|onload=", re.I)
 
-def analyze_log(text: str) -> dict:
-    lines = [ln for ln in text.splitlines() if ln.strip()]
-    findings = []
-    stats = defaultdict(int)
-    fail_by_ip = defaultdict(int)
+# SQLI_RE / XSS_RE partidos por alternativa, cada una con su literal obligatorio
+WEB_DETECTORS = DetectorEngine(
+    patterns={
+        "sqli_quote_or": r"('|\")\s*or\s*1=1",
+        "sqli_union": r"union\s+select",
+        "sqli_comment": r"--\s",
+        "xss_script": r"<script>",
+        "xss_onerror": r"onerror=",
+        "xss_onload": r"onload=",
+    },
+    required={
+        "sqli_quote_or": "1=1", "sqli_union": "union", "sqli_comment": "--",
+        "xss_script": "<script>", "xss_onerror": "onerror=", "xss_onload": "onload=",
+    },
+    flags=re.I,
+)
+
+# sólo la parte XSS, para las líneas HTTP (el SQLi de esas lo cuenta LogAnalyzer)
+XSS_DETECTORS = DetectorEngine(
+    patterns={"xss_script": r"<script>", "xss_onerror": r"onerror=", "xss_onload": r"onload="},
+    required={"xss_script": "<script>", "xss_onerror": "onerror=", "xss_onload": "onload="},
+    flags=re.I,
+)
+
+# fuerza bruta: BRUTEFORCE_FAILS fallos de la misma IP dentro de BRUTEFORCE_WINDOW_S segundos
+BRUTEFORCE_FAILS = 5
+BRUTEFORCE_WINDOW_S = 300
+# tope de IPs con ventana abierta (las inactivas se descartan antes)
+BRUTEFORCE_MAX_TRACKED = 100_000
+
+_MONTHS = {m: i for i, m in enumerate(
+    ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"))}
+_DAYS_BEFORE = (0, 31, 59, 90, 120, 151, 181, 212, 243, 273, 304, 334)
+_YEAR_S = 365 * 86400
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _syslog_seconds(ln: str) -> Optional[int]:
+    """
+    Segundos del timestamp syslog al inicio de la línea. "Oct 16 12:34:56" no
+    trae año: se cuenta desde el 1/1 y el cambio de año lo resuelve el caller.
+    """
+    month = _MONTHS.get(ln[:3])
+    if month is not None and ln[6:7] == " " and ln[9:10] == ":" and ln[12:13] == ":":
+        try:
+            day, hh, mm, ss = int(ln[4:6]), int(ln[7:9]), int(ln[10:12]), int(ln[13:15])
+        except ValueError:
+            return None
+        return (_DAYS_BEFORE[month] + day - 1) * 86400 + hh * 3600 + mm * 60 + ss
+    if ln[4:5] == "-" and ln[10:11] == "T":
+        try:
+            return int((datetime.fromisoformat(ln[:19]) - _EPOCH).total_seconds())
+        except ValueError:
+            return None
+    return None
+
+
+class BruteForceWindow:
+    """
+    Detector por ventana deslizante: una IP es fuerza bruta si junta `fails`
+    fallos en `window` segundos. Cada IP tiene un ring buffer (deque con
+    maxlen) de sus últimos fallos, así cada fallo es O(1). Las IPs sin fallos
+    en la última ventana ya no pueden disparar y se descartan; la tabla queda
+    acotada por `max_tracked` aunque el log cubra varios días.
+
+    Para mergear tramos consecutivos cada instancia guarda, por IP, los
+    primeros fallos de su primera ventana (`heads`): son los únicos que pueden
+    completar una ráfaga que empezó en el tramo anterior.
+    """
+
+    def __init__(self, fails: int = BRUTEFORCE_FAILS, window: int = BRUTEFORCE_WINDOW_S,
+                 max_tracked: int = BRUTEFORCE_MAX_TRACKED):
+        self.fails = fails
+        self.window = window
+        self.max_tracked = max_tracked
+        self.flagged: Set[str] = set()
+        self.first_t: Optional[int] = None
+        self.last_t: Optional[int] = None
+        self._open: "OrderedDict[str, Deque[int]]" = OrderedDict()
+        self._heads: Dict[str, List[int]] = {}
+
+    def add(self, ip: str, t: int) -> bool:
+        """Registra un fallo; True si con este la IP pasa a ser fuerza bruta."""
+        if self.first_t is None:
+            self.first_t = t
+        self.last_t = t
+        if t <= self.first_t + self.window:
+            head = self._heads.setdefault(ip, [])
+            if len(head) < self.fails - 1:
+                head.append(t)
+
+        buf = self._open.pop(ip, None)
+        if buf is None:
+            buf = deque(maxlen=self.fails)
+        buf.append(t)
+        self._open[ip] = buf  # al final: orden por última actividad
+        self._evict(t)
+        if ip not in self.flagged and len(buf) == self.fails and t - buf[0] <= self.window:
+            self.flagged.add(ip)
+            return True
+        return False
+
+    def _evict(self, now: int) -> None:
+        opened = self._open
+        while opened:
+            ip, buf = next(iter(opened.items()))
+            if now - buf[-1] <= self.window and len(opened) <= self.max_tracked:
+                break
+            del opened[ip]
+
+    def shift(self, delta: int) -> None:
+        """Corre todos los tiempos guardados `delta` segundos (cambio de año entre tramos)."""
+        if not delta or self.first_t is None:
+            return
+        self.first_t += delta
+        self.last_t += delta
+        for ip, buf in self._open.items():
+            self._open[ip] = deque([t + delta for t in buf], maxlen=self.fails)
+        for head in self._heads.values():
+            head[:] = [t + delta for t in head]
+
+    def to_state(self) -> dict:
+        return {
+            "fails": self.fails, "window": self.window, "max_tracked": self.max_tracked,
+            "flagged": sorted(self.flagged), "first_t": self.first_t, "last_t": self.last_t,
+            "open": [[ip, list(buf)] for ip, buf in self._open.items()],
+            "heads": self._heads,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BruteForceWindow":
+        bf = cls(state["fails"], state["window"], state["max_tracked"])
+        bf.flagged = set(state["flagged"])
+        bf.first_t, bf.last_t = state["first_t"], state["last_t"]
+        for ip, times in state["open"]:
+            bf._open[ip] = deque(times, maxlen=bf.fails)
+        bf._heads = {ip: list(times) for ip, times in state["heads"].items()}
+        return bf
 
-    for ln in lines:
-        if SSH_FAIL_RE.search(ln):
+    def merge(self, other: "BruteForceWindow") -> None:
+        """Suma el tramo siguiente (`other`) del mismo log."""
+        if other.first_t is None:
+            return
+        self.flagged |= other.flagged
+        # ráfagas que cruzan el corte: cola de este tramo + cabeza del siguiente
+        for ip, head in other._heads.items():
+            if ip in self.flagged:
+                continue
+            buf = deque(self._open.get(ip, ()), maxlen=self.fails)
+            for t in head:
+                buf.append(t)
+                if len(buf) == self.fails and t - buf[0] <= self.window:
+                    self.flagged.add(ip)
+                    break
+
+        if self.first_t is None:
+            self._heads = {ip: list(h) for ip, h in other._heads.items()}
+            self.first_t = other.first_t
+        else:
+            limit = self.first_t + self.window
+            for ip, head in other._heads.items():
+                mine = self._heads.setdefault(ip, [])
+                mine.extend(t for t in head if t <= limit)
+                del mine[self.fails - 1:]
+                if not mine:
+                    del self._heads[ip]
+
+        for ip, buf in other._open.items():
+            merged = deque(self._open.pop(ip, ()), maxlen=self.fails)
+            merged.extend(buf)
+            self._open[ip] = merged
+        self.last_t = other.last_t
+        self._evict(self.last_t)
+
+
+class AuthAnalyzer:
+    """
+    Versión incremental de `analyze_log` (sshd/auth + SQLi/XSS genéricos).
+    `max_findings` acota la lista de hallazgos; los contadores siguen completos.
+    La fuerza bruta se detecta por ventana de tiempo (`BruteForceWindow`).
+    """
+
+    def __init__(self, max_findings: Optional[int] = None):
+        self.max_findings = max_findings
+        self.lines = 0
+        self.findings: List[dict] = []
+        self.stats = defaultdict(int)
+        self.bruteforce = BruteForceWindow()
+        # timestamps syslog sin año: desfase acumulado al pasar de diciembre a enero
+        self._year_shift = 0
+        self._last_raw: Optional[int] = None
+
+    def _add_finding(self, kind: str, ln: str) -> None:
+        if self.max_findings is None or len(self.findings) < self.max_findings:
+            self.findings.append({"type": kind, "line": ln})
+
+    def feed(self, ln: str) -> None:
+        if not ln.strip():
+            return
+        self.lines += 1
+        stats = self.stats
+        m = SSH_FAIL_RE.search(ln) if "Failed password for " in ln else None
+        if m:
             stats["ssh_failed"] += 1
-            m = SSH_FAIL_RE.search(ln)
-            if m:
-                fail_by_ip[m.group("ip")] += 1
-        if SSH_OK_RE.search(ln):
+            self.bruteforce.add(m.group("ip"), self._timestamp(ln))
+        if "Accepted password for " in ln and SSH_OK_RE.search(ln):
             stats["ssh_accepted"] += 1
-        if SQLI_RE.search(ln):
+        hits = WEB_DETECTORS.scan(ln)
+        if any(h.startswith("sqli_") for h in hits):
             stats["sqli"] += 1
-            findings.append({"type": "SQLi", "line": ln})
-        if XSS_RE.search(ln):
+            self._add_finding("SQLi", ln)
+        if any(h.startswith("xss_") for h in hits):
             stats["xss"] += 1
-            findings.append({"type": "XSS", "line": ln})
-
-    summary = {
-        "ssh_failed": stats["ssh_failed"],
-        "ssh_accepted": stats["ssh_accepted"],
-        "sqli": stats["sqli"],
-        "xss": stats["xss"],
-        "bruteforce_ips": sum(1 for c in fail_by_ip.values() if c >= 5),
-        "risk": _compute_risk(stats),
-    }
-    return {"summary": summary, "findings": findings}
+            self._add_finding("XSS", ln)
+
+    def feed_http(self, ln: Union[str, bytes]) -> None:
+        """
+        Línea que ya parseó como HTTP (no cuenta en `lines`): sólo se busca
+        XSS, el SQLi de esas líneas va a `sqli_total` de `LogAnalyzer`.
+        """
+        if isinstance(ln, bytes):
+            if XSS_DETECTORS.first_bytes(ln) is None:
+                return
+            ln = ln.decode("ascii")
+        elif XSS_DETECTORS.first(ln) is None:
+            return
+        self.stats["xss"] += 1
+        self._add_finding("XSS", ln)
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        for ln in lines:
+            self.feed(ln)
+
+    def _timestamp(self, ln: str) -> int:
+        raw = _syslog_seconds(ln)
+        if raw is None:
+            # sin timestamp legible: cuenta como "ahora" (el último visto)
+            return self.bruteforce.last_t or 0
+        if self._last_raw is not None and raw < self._last_raw - _YEAR_S // 2:
+            self._year_shift += _YEAR_S
+        self._last_raw = raw
+        return raw + self._year_shift
+
+    def merge(self, other: "AuthAnalyzer") -> "AuthAnalyzer":
+        self.lines += other.lines
+        for k, v in other.stats.items():
+            self.stats[k] += v
+        # cada tramo arranca sin desfase de año: se alinea el siguiente con este
+        shift = self._year_shift
+        mine, theirs = self.bruteforce, other.bruteforce
+        if mine.last_t is not None and theirs.first_t is not None:
+            while theirs.first_t + shift < mine.last_t - _YEAR_S // 2:
+                shift += _YEAR_S
+        theirs.shift(shift)
+        mine.merge(theirs)
+        if other._last_raw is not None:
+            self._last_raw = other._last_raw
+            self._year_shift = shift + other._year_shift
+        for f in other.findings:
+            self._add_finding(f["type"], f["line"])
+        return self
+
+    def to_state(self) -> dict:
+        """Estado JSON-serializable (sesiones de ingesta incremental)."""
+        return {
+            "max_findings": self.max_findings, "lines": self.lines, "findings": self.findings,
+            "stats": dict(self.stats), "bruteforce": self.bruteforce.to_state(),
+            "year_shift": self._year_shift, "last_raw": self._last_raw,
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "AuthAnalyzer":
+        an = cls(state["max_findings"])
+        an.lines = state["lines"]
+        an.findings = list(state["findings"])
+        an.stats.update(state["stats"])
+        an.bruteforce = BruteForceWindow.from_state(state["bruteforce"])
+        an._year_shift, an._last_raw = state["year_shift"], state["last_raw"]
+        return an
+
+    def summary(self) -> dict:
+        stats = self.stats
+        stats["bruteforce_ips"] = len(self.bruteforce.flagged)
+        summary = {
+            "ssh_failed": stats["ssh_failed"],
+            "ssh_accepted": stats["ssh_accepted"],
+            "sqli": stats["sqli"],
+            "xss": stats["xss"],
+            "bruteforce_ips": stats["bruteforce_ips"],
+            "risk": _compute_risk(stats),
+        }
+        return {"summary": summary, "findings": list(self.findings)}
+
+def analyze_log(text: str) -> dict:
+    analyzer = AuthAnalyzer()
+    analyzer.feed_lines(text.splitlines())
+    return analyzer.summary()
 
 def _compute_risk(s):
     score = 0
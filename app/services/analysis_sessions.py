@@ -0,0 +1,56 @@
+# app/services/analysis_sessions.py
+"""
+Ingesta incremental para /analysis/sessions (logs que se siguen "en vivo").
+
+El estado del analizador se guarda en la base como JSON comprimido con zlib;
+cada chunk se procesa una sola vez y se suma a ese estado, así seguir un log
+todo el día cuesta O(bytes nuevos) por POST en vez de re-analizar todo.
+
+Las líneas se cortan en el último "\\n" del chunk: lo que queda después (una
+línea incompleta, o un caracter UTF-8 partido) se guarda como `carry` y se
+antepone al chunk siguiente. El resultado final es el mismo que analizar el
+archivo completo de una vez.
+"""
+import json
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+from app.services.log_analyzer import READ_CHUNK, UnifiedAnalyzer, iter_blocks
+
+STATE_VERSION = 1
+
+# una "línea" sin "\n" más larga que esto se procesa igual (no se acumula sin límite)
+MAX_CARRY = 1024 * 1024
+
+
+def dump_state(analyzer: UnifiedAnalyzer) -> bytes:
+    state = {"v": STATE_VERSION, "analyzer": analyzer.to_state()}
+    return zlib.compress(json.dumps(state, separators=(",", ":")).encode("utf-8"), 6)
+
+
+def load_state(blob: bytes) -> UnifiedAnalyzer:
+    state = json.loads(zlib.decompress(blob).decode("utf-8"))
+    if state.get("v") != STATE_VERSION:
+        raise ValueError("Estado de sesión de una versión incompatible")
+    return UnifiedAnalyzer.from_state(state["analyzer"])
+
+
+def ingest_chunk(state: Optional[bytes], carry: bytes, data: bytes, approx: bool = False,
+                 final: bool = False) -> Tuple[bytes, bytes, Dict[str, Any]]:
+    """
+    Suma `data` al estado. Devuelve (estado nuevo, carry nuevo, resumen).
+    Con `final=True` se procesa también la última línea sin "\\n" (cierre de sesión).
+    Función top-level y sin efectos: corre en el pool de procesos.
+    """
+    analyzer = load_state(state) if state else UnifiedAnalyzer(approx=approx)
+    buf = carry + data
+    if final or (len(buf) > MAX_CARRY and buf.rfind(b"\n") < 0):
+        cut = len(buf)
+    else:
+        cut = buf.rfind(b"\n") + 1
+    if cut:
+        ready = memoryview(buf)[:cut]
+        analyzer.feed_blocks(iter_blocks(
+            bytes(ready[i:i + READ_CHUNK]) for i in range(0, cut, READ_CHUNK)
+        ))
+    return dump_state(analyzer), buf[cut:], analyzer.summary()
@@ -0,0 +1,273 @@
+# app/services/analysis_store.py
+"""
+Historial de análisis y rollups por minuto / hora / día.
+
+Cada análisis guarda su resumen en `analysis_runs` y suma su desglose por
+minuto ("timeline" + "timeline_detail" del resumen) a las tablas de rollup
+del usuario. Los dashboards leen sólo los rollups: la tendencia de un mes son
+~30 filas diarias, sin volver a tocar ningún log.
+
+Los buckets usan la hora del log tal como viene, igual que el timeline del
+resumen (no se convierte a UTC).
+
+Un análisis completo en segundo plano (después de una vista previa) deja su
+run en "running" desde que arranca (`start_run`) y pasa a "done" al
+guardarse o a "failed" (`fail_run`): el estado vive en la base y se ve desde
+cualquier worker de uvicorn. Los rollups se suman recién al terminar.
+"""
+import json
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models_analysis import AnalysisRun, RollupDay, RollupHour, RollupMinute
+
+GRANULARITIES = {"minute": RollupMinute, "hour": RollupHour, "day": RollupDay}
+_STEPS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1), "day": timedelta(days=1)}
+
+# columnas de cada rollup, en el orden de las filas de `minute_rows`
+METRICS = ("requests", "errors_4xx", "errors_5xx", "sqli_hits", "probe_hits")
+
+# tope de buckets por minuto/hora; "auto" elige la granularidad más fina que entra
+MAX_POINTS = 1500
+
+# un run que sigue "running" después de esto se da por caído (p.ej. se reinició el worker)
+STALE_RUNNING = timedelta(hours=6)
+
+# largo máximo del error guardado de un análisis fallido
+MAX_ERROR_CHARS = 500
+
+
+def _truncate(dt: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return dt.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return dt.replace(minute=0, second=0, microsecond=0)
+    return dt.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def minute_rows(summary: Dict[str, Any]) -> Dict[datetime, List[int]]:
+    """{minuto: [requests, 4xx, 5xx, sqli, probes]} a partir del resumen."""
+    rows: Dict[datetime, List[int]] = {}
+    for key, n in (summary.get("timeline") or {}).items():
+        rows[datetime.strptime(key, "%Y-%m-%d %H:%M")] = [n, 0, 0, 0, 0]
+    for key, detail in (summary.get("timeline_detail") or {}).items():
+        row = rows.setdefault(datetime.strptime(key, "%Y-%m-%d %H:%M"), [0, 0, 0, 0, 0])
+        row[1:] = detail
+    return rows
+
+
+def _rollup(rows: Dict[datetime, List[int]], granularity: str) -> Dict[datetime, List[int]]:
+    if granularity == "minute":
+        return rows
+    out: Dict[datetime, List[int]] = defaultdict(lambda: [0] * len(METRICS))
+    for minute, values in rows.items():
+        acc = out[_truncate(minute, granularity)]
+        for i, v in enumerate(values):
+            acc[i] += v
+    return out
+
+
+def _add_rollups(db: Session, user_id: int, rows: Dict[datetime, List[int]]) -> None:
+    for granularity, model in GRANULARITIES.items():
+        buckets = _rollup(rows, granularity)
+        existing = {
+            r.bucket: r
+            for r in db.query(model).filter(
+                model.user_id == user_id,
+                model.bucket >= min(buckets),
+                model.bucket <= max(buckets),
+            )
+        }
+        for bucket, values in buckets.items():
+            row = existing.get(bucket)
+            if row is None:
+                db.add(model(user_id=user_id, bucket=bucket, **dict(zip(METRICS, values))))
+            else:
+                for name, v in zip(METRICS, values):
+                    setattr(row, name, getattr(row, name) + v)
+
+
+def find_run(db: Session, user_id: int, sha256: str, approx: bool) -> Optional[AnalysisRun]:
+    """El run de ese archivo en ese modo (exacto y aproximado son runs distintos)."""
+    return (db.query(AnalysisRun)
+            .filter(AnalysisRun.user_id == user_id, AnalysisRun.sha256 == sha256,
+                    AnalysisRun.approx == approx)
+            .first())
+
+
+def _record_once(db: Session, user_id: int, summary: Dict[str, Any], source: str, name: str,
+                 sha256: Optional[str], approx: bool, commit: bool = True) -> AnalysisRun:
+    counted = False
+    run = None
+    if sha256:
+        run = find_run(db, user_id, sha256, approx)
+        if run is not None and run.status == "done":
+            return run
+        # el mismo archivo en el otro modo ya sumó su tráfico a los rollups
+        counted = (db.query(AnalysisRun.id)
+                   .filter(AnalysisRun.user_id == user_id, AnalysisRun.sha256 == sha256,
+                           AnalysisRun.status == "done")
+                   .first()) is not None
+    rows = minute_rows(summary)
+    values = dict(
+        source=source, name=(name or "")[:200],
+        total=summary.get("total", 0),
+        first_minute=min(rows) if rows else None, last_minute=max(rows) if rows else None,
+        summary=json.dumps(summary, ensure_ascii=False),
+        status="done", error=None, created_at=datetime.utcnow(),
+    )
+    if run is None:
+        run = AnalysisRun(user_id=user_id, sha256=sha256, approx=approx, **values)
+        db.add(run)
+    elif (db.query(AnalysisRun)
+          .filter(AnalysisRun.id == run.id, AnalysisRun.status != "done")
+          .update(values, synchronize_session=False)) != 1:
+        # otro worker terminó este run entre la consulta y el update
+        db.rollback()
+        return find_run(db, user_id, sha256, approx)
+    if rows and not counted:
+        _add_rollups(db, user_id, rows)
+    if not commit:
+        db.flush()
+        return run
+    db.commit()
+    db.refresh(run)
+    return run
+
+
+def record_run(db: Session, user_id: int, summary: Dict[str, Any], source: str = "upload",
+               name: str = "", sha256: Optional[str] = None, approx: bool = False,
+               commit: bool = True) -> AnalysisRun:
+    """
+    Guarda el resumen y suma su desglose a los rollups, en una sola transacción.
+    Un upload con el mismo sha256 y modo que uno ya guardado devuelve ese run
+    sin volver a sumar (re-subir un archivo no duplica los conteos); en el
+    otro modo (exacto/aproximado) guarda su propio run pero no suma de nuevo.
+
+    Con `commit=False` (sólo sin sha256) todo queda en la transacción del
+    caller, que hace el commit o el rollback; un IntegrityError se propaga.
+    """
+    if not commit:
+        return _record_once(db, user_id, summary, source, name, sha256, approx, commit=False)
+    try:
+        return _record_once(db, user_id, summary, source, name, sha256, approx)
+    except IntegrityError:
+        # otro análisis del mismo usuario creó el bucket o el run a la vez; si fue
+        # el run, el reintento lo encuentra y lo devuelve sin sumar a los rollups
+        db.rollback()
+        return _record_once(db, user_id, summary, source, name, sha256, approx)
+
+
+def is_stale(run: AnalysisRun) -> bool:
+    return run.status == "running" and datetime.utcnow() - run.created_at > STALE_RUNNING
+
+
+def start_run(db: Session, user_id: int, source: str, name: str, sha256: str, approx: bool) -> bool:
+    """
+    Deja el run de ese archivo en "running" antes de lanzar su análisis en
+    segundo plano. False si ya está terminado o corriendo (en cualquier
+    worker): el caller no lanza nada. Un run fallido o colgado se reintenta.
+    """
+    run = find_run(db, user_id, sha256, approx)
+    now = datetime.utcnow()
+    if run is None:
+        db.add(AnalysisRun(user_id=user_id, source=source, name=(name or "")[:200], sha256=sha256,
+                           approx=approx, summary="{}", status="running", created_at=now))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()  # otro worker lo arrancó a la vez
+            return False
+        return True
+    if run.status == "done" or (run.status == "running" and not is_stale(run)):
+        return False
+    # compare-and-swap: de dos workers que lo reintentan, arranca uno solo
+    claimed = (db.query(AnalysisRun)
+               .filter(AnalysisRun.id == run.id, AnalysisRun.status == run.status,
+                       AnalysisRun.created_at == run.created_at)
+               .update({"status": "running", "error": None, "created_at": now}, synchronize_session=False))
+    db.commit()
+    return claimed == 1
+
+
+def fail_run(db: Session, user_id: int, sha256: str, approx: bool, error: str) -> None:
+    """Marca como fallido el run en segundo plano (si nadie lo terminó)."""
+    (db.query(AnalysisRun)
+     .filter(AnalysisRun.user_id == user_id, AnalysisRun.sha256 == sha256,
+             AnalysisRun.approx == approx, AnalysisRun.status == "running")
+     .update({"status": "failed", "error": (error or "")[:MAX_ERROR_CHARS]}, synchronize_session=False))
+    db.commit()
+
+
+def pick_granularity(start: datetime, end: datetime) -> str:
+    for granularity, step in _STEPS.items():
+        if (end - start) / step <= MAX_POINTS:
+            return granularity
+    return "day"
+
+
+def query_rollups(db: Session, user_id: int, start: datetime, end: datetime,
+                  granularity: str = "auto") -> Dict[str, Any]:
+    """
+    Serie de [start, end) leída de la tabla de rollup. Sólo trae los buckets
+    con datos; `totals` suma la serie. Levanta ValueError con una
+    granularidad desconocida o un rango de más de MAX_POINTS minutos/horas
+    (por día no hay tope: son pocas filas aunque el rango sea de años).
+    """
+    if granularity == "auto":
+        granularity = pick_granularity(start, end)
+    model = GRANULARITIES.get(granularity)
+    if model is None:
+        raise ValueError(f"Granularidad desconocida: {granularity}")
+    if end <= start:
+        raise ValueError("El rango está vacío (end <= start)")
+    if granularity != "day" and (end - start) / _STEPS[granularity] > MAX_POINTS:
+        raise ValueError(f"Demasiados buckets de {granularity} (máx {MAX_POINTS}); usá una granularidad mayor")
+
+    rows = (
+        db.query(model)
+        .filter(model.user_id == user_id, model.bucket >= _truncate(start, granularity), model.bucket < end)
+        .order_by(model.bucket)
+        .all()
+    )
+    points = [{"bucket": r.bucket.isoformat(), **{m: getattr(r, m) for m in METRICS}} for r in rows]
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "points": points,
+        "totals": {m: sum(p[m] for p in points) for m in METRICS},
+    }
+
+
+def list_runs(db: Session, user_id: int, limit: int = 50) -> List[Dict[str, Any]]:
+    runs = (
+        db.query(AnalysisRun)
+        .filter(AnalysisRun.user_id == user_id)
+        .order_by(AnalysisRun.created_at.desc(), AnalysisRun.id.desc())
+        .limit(limit)
+        .all()
+    )
+    return [run_out(r) for r in runs]
+
+
+def run_out(run: AnalysisRun, with_summary: bool = False) -> Dict[str, Any]:
+    out = {
+        "id": run.id,
+        "source": run.source,
+        "name": run.name,
+        "sha256": run.sha256,
+        "approx": run.approx,
+        "status": run.status,
+        "total": run.total,
+        "first_minute": run.first_minute.isoformat() if run.first_minute else None,
+        "last_minute": run.last_minute.isoformat() if run.last_minute else None,
+        "created_at": run.created_at.isoformat() if run.created_at else None,
+    }
+    if with_summary:
+        out["summary"] = json.loads(run.summary)
+    return out
@@ -0,0 +1,54 @@
+# app/services/decompress.py
+"""
+Descompresión transparente de logs rotados (.gz/.bz2/.xz).
+
+El formato se detecta por los magic bytes, no por la extensión (el upload se
+guarda en un temporal sin nombre original). La descompresión es incremental:
+se leen bloques descomprimidos de tamaño fijo y nunca se arma el archivo
+completo en memoria ni en disco.
+"""
+import bz2
+import gzip
+import lzma
+import zlib
+from typing import Callable, Dict, Iterator, Optional
+
+# magic bytes -> nombre
+MAGIC = {
+    b"\x1f\x8b": "gzip",
+    b"BZh": "bzip2",
+    b"\xfd7zXZ\x00": "xz",
+}
+_OPENERS: Dict[str, Callable] = {
+    "gzip": gzip.open,
+    "bzip2": bz2.open,
+    "xz": lzma.open,
+}
+_MAGIC_LEN = max(len(m) for m in MAGIC)
+
+
+class CorruptArchive(ValueError):
+    """El archivo tiene magic de comprimido pero el contenido está truncado o dañado."""
+
+
+def detect_compression(path: str) -> Optional[str]:
+    """"gzip" | "bzip2" | "xz" si el archivo empieza con su magic, si no None."""
+    with open(path, "rb") as fh:
+        head = fh.read(_MAGIC_LEN)
+    for magic, name in MAGIC.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def iter_decompressed(path: str, kind: str, chunk_size: int) -> Iterator[bytes]:
+    """Bloques descomprimidos de `path` (soporta archivos multi-miembro, como `cat a.gz b.gz`)."""
+    with _OPENERS[kind](path, "rb") as fh:
+        while True:
+            try:
+                chunk = fh.read(chunk_size)
+            except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+                raise CorruptArchive(f"{kind} inválido: {e}") from None
+            if not chunk:
+                return
+            yield chunk
@@ -0,0 +1,179 @@
+# app/services/detectors.py
+"""
+Motor de detección multi-patrón.
+
+- Literales (p.ej. paths sensibles): una alternancia de literales compilada
+  (el motor de `re` la recorre en una sola pasada en C).
+- Regex: cada detector puede declarar un literal obligatorio (`required`).
+  Para texto ASCII primero se buscan esos literales sobre `text.lower()` y
+  sólo se corre el regex de los detectores cuyo literal apareció; en tráfico
+  normal la gran mayoría de las líneas no llega a evaluar ningún regex.
+  El resto (texto no ASCII o detectores sin literal) usa una sola alternancia
+  con grupos nombrados.
+- `first_bytes` hace lo mismo sobre líneas ASCII en `bytes`, sin decodificar.
+- `candidates` aplica esos literales a un lote entero de una vez (un solo
+  `lower()` y unas pocas búsquedas sobre las líneas unidas) para saber qué
+  líneas vale la pena mirar de a una.
+"""
+import re
+from bisect import bisect_right
+from itertools import accumulate
+from typing import AnyStr, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# flags globales al inicio del patrón, p.ej. "(?i)..."
+_LEADING_FLAGS_RE = re.compile(r"^\(\?([aiLmsux]+)\)")
+
+
+def _scoped(pattern: str) -> str:
+    # "(?i)foo" -> "(?i:foo)": cada detector conserva sus flags dentro de la alternancia
+    m = _LEADING_FLAGS_RE.match(pattern)
+    if not m:
+        return f"(?:{pattern})"
+    return f"(?{m.group(1)}:{pattern[m.end():]})"
+
+
+def _alternation(named: Dict[str, str]) -> str:
+    # lookahead: finditer avanza de a un caracter y no se "come" hits solapados
+    return "(?=" + "|".join(f"(?P<{name}>{body})" for name, body in named.items()) + ")"
+
+
+class DetectorEngine:
+    """
+    patterns: {nombre: regex}
+    required: {nombre: literal en minúsculas que todo match de ese regex contiene}
+    literals: {nombre: [strings]}  (búsqueda exacta, sensible a mayúsculas)
+
+    `first(text)` devuelve el primer detector que dispara (o None) y
+    `scan(text)` todos los que disparan, en el orden en que fueron declarados.
+    `first_bytes(data)` es `first(data.decode("ascii"))` para datos ASCII.
+    """
+
+    def __init__(self, patterns: Optional[Dict[str, str]] = None,
+                 literals: Optional[Dict[str, Iterable[str]]] = None,
+                 required: Optional[Dict[str, str]] = None, flags: int = 0):
+        patterns = patterns or {}
+        required = required or {}
+        literals = {name: list(words) for name, words in (literals or {}).items()}
+        self.names: List[str] = list(patterns) + list(literals)
+        self._words: List[str] = [w for words in literals.values() for w in words]
+
+        self._regex = None
+        self._checks: List[Tuple[str, Optional[str], "re.Pattern"]] = []
+        if patterns:
+            self._regex = re.compile(_alternation({n: _scoped(p) for n, p in patterns.items()}), flags)
+            self._checks = [(n, required.get(n), re.compile(p, flags)) for n, p in patterns.items()]
+
+        # versiones bytes de lo mismo (sin \x1c-\x1f ni \x0b/\x0c en el texto,
+        # \s, \b y (?i) se comportan igual que en str para ASCII)
+        self._checks_b: Optional[List[Tuple[str, Optional[bytes], "re.Pattern"]]] = None
+        try:
+            self._checks_b = [
+                (n, lit.encode("ascii") if lit else None, re.compile(rx.pattern.encode("ascii"), flags))
+                for n, lit, rx in self._checks
+            ]
+        except (UnicodeEncodeError, ValueError, re.error):
+            self._checks_b = None  # patrón no ASCII: first_bytes decodifica
+
+        self._literal_regex = None
+        self._literal_regex_b = None
+        if literals:
+            alternation = _alternation({
+                name: "|".join(re.escape(w) for w in words) for name, words in literals.items()
+            })
+            self._literal_regex = re.compile(alternation)
+            if alternation.isascii():
+                self._literal_regex_b = re.compile(alternation.encode("ascii"))
+
+    def _regex_first(self, text: str) -> Optional[str]:
+        if text.isascii():
+            low = text.lower()
+            for name, lit, rx in self._checks:
+                if (lit is None or lit in low) and rx.search(text):
+                    return name
+            return None
+        # con texto no ASCII el lower() no es un prefiltro confiable (case folding Unicode)
+        m = self._regex.search(text)
+        return m.lastgroup if m else None
+
+    def _literal_hits(self, text: str) -> Iterable[str]:
+        return (m.lastgroup for m in self._literal_regex.finditer(text))
+
+    def first(self, text: str) -> Optional[str]:
+        if self._regex is not None:
+            name = self._regex_first(text)
+            if name:
+                return name
+        if self._literal_regex is not None:
+            for name in self._literal_hits(text):
+                return name
+        return None
+
+    def first_bytes(self, data: bytes) -> Optional[str]:
+        if self._checks_b is None or (self._literal_regex is not None and self._literal_regex_b is None):
+            return self.first(data.decode("ascii"))
+        if self._checks_b:
+            low = data.lower()
+            for name, lit, rx in self._checks_b:
+                if (lit is None or lit in low) and rx.search(data):
+                    return name
+        if self._literal_regex_b is not None:
+            m = self._literal_regex_b.search(data)
+            if m:
+                return m.lastgroup
+        return None
+
+    @staticmethod
+    def join_lines(lines: Sequence[AnyStr]) -> Tuple[AnyStr, List[int]]:
+        """
+        Lote unido con "\n" y bounds[i] = offset donde empieza la línea i+1.
+        Se calcula una vez y se comparte entre motores (ver `candidates`).
+        """
+        blob = (b"\n" if isinstance(lines[0], bytes) else "\n").join(lines)
+        return blob, list(accumulate(len(ln) + 1 for ln in lines))
+
+    def candidates(self, lines: Sequence[AnyStr],
+                   joined: Optional[Tuple[AnyStr, List[int]]] = None) -> Optional[Set[int]]:
+        """
+        Índices de `lines` en los que `first` puede disparar (superconjunto).
+        None si no hay prefiltro posible para el lote (regex sin literal o
+        texto no ASCII): hay que evaluar todas las líneas.
+        """
+        if not lines:
+            return set()
+        if self._checks and any(lit is None for _n, lit, _rx in self._checks):
+            return None
+        is_bytes = isinstance(lines[0], bytes)
+        # los literales no contienen "\n": ningún match cruza de una línea a otra
+        blob, bounds = joined or self.join_lines(lines)
+        if self._checks and not is_bytes and not blob.isascii():
+            return None  # lower() no ASCII puede cambiar los offsets
+        out: Set[int] = set()
+
+        # literales de los regex: sobre el texto en minúsculas; los de
+        # `literals`: tal cual (son sensibles a mayúsculas)
+        searches = []
+        if self._checks:
+            searches.append((blob.lower(), [lit for _n, lit, _rx in self._checks]))
+        if self._words:
+            searches.append((blob, self._words))
+        for text, words in searches:
+            for word in words:
+                needle = word.encode("utf-8") if is_bytes else word
+                pos = text.find(needle)
+                while pos != -1:
+                    i = bisect_right(bounds, pos)
+                    out.add(i)
+                    pos = text.find(needle, bounds[i])
+        return out
+
+    def scan(self, text: str) -> List[str]:
+        hits = set()
+        if self._regex is not None:
+            low = text.lower() if text.isascii() else None
+            hits.update(
+                n for n, lit, rx in self._checks
+                if (lit is None or low is None or lit in low) and rx.search(text)
+            )
+        if self._literal_regex is not None:
+            hits.update(self._literal_hits(text))
+        return [n for n in self.names if n in hits]
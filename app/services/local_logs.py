@@ -0,0 +1,99 @@
+# app/services/local_logs.py
+"""
+Análisis de logs que ya están en el disco del servidor (instalaciones self-hosted).
+
+Sólo se aceptan archivos dentro de ANALYSIS_LOCAL_ROOT (se resuelven symlinks
+y "..", así no se puede salir de la raíz). El archivo se mapea con `mmap` y
+se recorre por ventanas del mapeo: no hay upload, ni temporal, ni lecturas
+intermedias. Se puede retomar desde un offset: el resultado trae
+`next_offset` para la próxima llamada.
+"""
+import mmap
+import os
+from typing import Iterator, Optional, Tuple
+
+from app.services.decompress import detect_compression
+from app.services.log_analyzer import READ_CHUNK, UnifiedAnalyzer, analyze_file_range, iter_blocks
+
+
+class LocalPathError(ValueError):
+    """Path fuera de la raíz permitida, inexistente o que no es un archivo regular."""
+
+
+def resolve_local_path(path: str, root: Optional[str]) -> str:
+    """Path real de `path` (relativo a `root` o absoluto) si cae dentro de `root`."""
+    if not root:
+        raise LocalPathError("El análisis de archivos locales no está habilitado (ANALYSIS_LOCAL_ROOT)")
+    real_root = os.path.realpath(root)
+    real = os.path.realpath(os.path.join(real_root, path))
+    if os.path.commonpath([real_root, real]) != real_root:
+        raise LocalPathError("El path está fuera de la raíz permitida")
+    if not os.path.isfile(real):
+        raise LocalPathError("No existe o no es un archivo regular")
+    return real
+
+
+def _align(mm: "mmap.mmap", pos: int, size: int) -> int:
+    """Primer inicio de línea en `pos` o después (pos si ya está justo tras un "\\n")."""
+    if pos <= 0:
+        return 0
+    if pos >= size:
+        return size
+    if mm[pos - 1:pos] == b"\n":
+        return pos
+    nl = mm.find(b"\n", pos)
+    return size if nl < 0 else nl + 1
+
+
+def plan_range(path: str, offset: int = 0, max_bytes: Optional[int] = None) -> Tuple[int, int, int]:
+    """
+    (start, end, size) alineados a líneas completas. `offset` se corre al
+    próximo inicio de línea; con `max_bytes` el tramo corta en el primer "\\n"
+    después de offset + max_bytes.
+    """
+    size = os.path.getsize(path)
+    if detect_compression(path):
+        if offset or max_bytes:
+            raise LocalPathError("Un archivo comprimido no se puede retomar por offset")
+        return 0, size, size
+    if size == 0:
+        return 0, 0, 0
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start = _align(mm, max(0, offset), size)
+        end = size if max_bytes is None else _align(mm, start + max(1, max_bytes), size)
+    return start, end, size
+
+
+def _mapped_chunks(mm: "mmap.mmap", start: int, end: int) -> Iterator[bytes]:
+    view = memoryview(mm)
+    try:
+        for pos in range(start, end, READ_CHUNK):
+            yield bytes(view[pos:min(pos + READ_CHUNK, end)])
+    finally:
+        view.release()
+
+
+def analyze_mapped_range(path: str, start: int, end: int, approx: bool = False) -> UnifiedAnalyzer:
+    """Como `analyze_file_range`, pero recorriendo un mmap del archivo (picklable para el pool)."""
+    if start >= end or detect_compression(path):
+        return analyze_file_range(path, start, end, approx)
+    analyzer = UnifiedAnalyzer(approx=approx)
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        analyzer.feed_blocks(iter_blocks(_mapped_chunks(mm, start, end)))
+    return analyzer
+
+
+def split_range(path: str, start: int, end: int, shards: int) -> list:
+    """Parte [start, end) en `shards` tramos cortando después de un "\\n"."""
+    if shards <= 1 or end - start <= 0 or detect_compression(path):
+        return [(start, end)]
+    cuts = [start]
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, shards):
+            pos = _align(mm, start + (end - start) * i // shards, end)
+            if pos >= end:
+                break
+            if pos > cuts[-1]:
+                cuts.append(pos)
+    cuts.append(end)
+    return list(zip(cuts[:-1], cuts[1:]))
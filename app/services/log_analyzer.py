@@ -0,0 +1,1111 @@
+# app/services/log_analyzer.py
+"""
+Motor de análisis de logs HTTP (formato combined de Nginx/Apache).
+
+`LogAnalyzer` es incremental: se alimenta línea por línea y arma el resumen al
+final, así no hace falta tener el archivo entero en memoria. `LineSplitter`
+corta chunks de bytes en líneas completas (respetando multibyte UTF-8 y
+líneas partidas entre chunks). `analyze_log(text)` queda como atajo.
+`UnifiedAnalyzer` combina el análisis HTTP con el de sshd/auth en una pasada.
+
+Los bloques que son ASCII puro (sin los controles que str trata como espacio
+o salto de línea) se tokenizan directamente en `bytes`, sin decodificar; los
+paths se cuentan como bytes y se decodifican sólo al armar el resumen.
+
+Las IPs se cuentan como enteros (IPv4 en 32 bits, IPv6 en 128 con un bit de
+marca arriba) y se agrupan en /24 y /16 (IPv4) y /48 (IPv6) con shifts sobre
+esos enteros, a partir de los mismos conteos por lote.
+"""
+import codecs
+import functools
+import ipaddress
+import os
+import re
+import socket
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.services.analysis_service import XSS_DETECTORS, AuthAnalyzer
+from app.services.decompress import detect_compression, iter_decompressed
+from app.services.detectors import DetectorEngine
+from app.services.log_formats import looks_syslog, register_format, sniff_format
+from app.services.log_sessions import SessionTracker
+from app.services.ua_classifier import AUTOMATED, CLASSES as UA_CLASSES, KNOWN_AGENTS, classify_ua
+from app.services.log_templates import TemplateMiner, request_tokens
+from app.services.path_normalizer import PathNormalizer, default_normalizer
+from app.services.sketches import HyperLogLog, Reservoir, SpaceSaving
+
+COMBINED_RE = re.compile(
+    r'^(?P<ip>\S+)\s+\S+\s+\S+\s+\[(?P<time>[^\]]+)\]\s+'
+    r'"(?P<method>[A-Z]+)\s+(?P<path>[^"\s]+)(?:\s+HTTP/[0-9.]+)?"\s+'
+    r'(?P<status>\d{3})\s+(?P<size>\S+)\s+"(?P<ref>[^"]*)"\s+"(?P<ua>[^"]*)"'
+)
+COMBINED_RE_B = re.compile(COMBINED_RE.pattern.encode("ascii"))
+
+SQLI_PATTERNS = [
+    r"(?i)\bunion\b.+\bselect\b",
+    r"(?i)(\bor\b|\band\b)\s+1=1",
+    r"(?i)\binformation_schema\b",
+    r"(?i)sqlmap",
+]
+SENSITIVE_FILES = ["/.env", "/wp-login.php", "/phpmyadmin", "/config.php", ".bak", ".zip", ".tar"]
+
+# SQLi sobre path, referer y UA (con prefiltro por literal) y probes sobre el path
+SQLI_DETECTORS = DetectorEngine(
+    patterns=dict(zip(("sqli_union", "sqli_tautology", "sqli_schema", "sqli_sqlmap"), SQLI_PATTERNS)),
+    required={"sqli_union": "union", "sqli_tautology": "1=1",
+              "sqli_schema": "information_schema", "sqli_sqlmap": "sqlmap"},
+)
+PROBE_DETECTORS = DetectorEngine(literals={"probe": SENSITIVE_FILES})
+
+# el resumen sólo muestra las primeras N líneas sospechosas
+MAX_HITS = 20
+
+# líneas por lote al actualizar los contadores
+BATCH_LINES = 8192
+
+# modo aproximado: cuántos paths/IPs candidatos sigue cada top-K
+TOPK_CAPACITY = 1000
+
+# veredictos de probe memorizados por path
+VERDICT_CACHE_SIZE = 65536
+
+# templates de ataque que muestra el resumen
+TOP_TEMPLATES = 20
+
+# contadores por minuto del desglose ("timeline_detail" del resumen)
+_BREAKDOWN = ("timeline_4xx", "timeline_5xx", "timeline_sqli", "timeline_probes")
+
+# mismos separadores que usa str.splitlines()
+_LINE_BREAKS = "\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029"
+
+# controles ASCII que str trata como salto de línea o espacio y bytes no: un
+# bloque que los tiene va por el camino str para que el resultado sea idéntico
+_STR_ONLY_CONTROLS = (b"\x0b", b"\x0c", b"\x1c", b"\x1d", b"\x1e", b"\x1f")
+
+
+def _bytes_safe(data: bytes) -> bool:
+    return data.isascii() and not any(c in data for c in _STR_ONLY_CONTROLS)
+
+
+def _text(key: bytes) -> str:
+    # by_path/by_ip cuentan bytes (el camino str codifica sus claves igual)
+    return key.decode("utf-8", "surrogatepass")
+
+
+def _key(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+# IPv6 como entero: 128 bits + este bit, así nunca choca con una IPv4 (< 2**32)
+_V6_TAG = 1 << 128
+_V4_LIMIT = 1 << 32
+
+
+@functools.lru_cache(maxsize=65536)
+def _ip_key(raw: bytes) -> Union[int, bytes]:
+    """
+    IP (bytes) -> entero. Sólo si vuelve a escribirse igual (IPv4 sin ceros a
+    la izquierda, IPv6 comprimida en minúsculas y sin zona): así el resumen
+    muestra exactamente el texto del log. Lo demás (hostnames, basura) queda
+    como bytes.
+    """
+    try:
+        text = raw.decode("ascii")
+        if ":" not in text:
+            packed = socket.inet_pton(socket.AF_INET, text)
+            if socket.inet_ntoa(packed) == text:
+                return int.from_bytes(packed, "big")
+        elif "%" not in text:
+            addr = ipaddress.IPv6Address(text)
+            if addr.compressed == text:
+                return int(addr) | _V6_TAG
+    except (UnicodeDecodeError, OSError, ValueError):
+        pass
+    return raw
+
+
+def _ip_text(key: Union[int, bytes]) -> str:
+    if isinstance(key, bytes):
+        return _text(key)
+    if key < _V4_LIMIT:
+        return socket.inet_ntoa(key.to_bytes(4, "big"))
+    return ipaddress.IPv6Address(key ^ _V6_TAG).compressed
+
+
+def _ip_dump(key: Union[int, bytes]) -> Union[int, str]:
+    # estado JSON: enteros tal cual, el resto como texto
+    return key if isinstance(key, int) else _text(key)
+
+
+def _ip_load(value: Union[int, str]) -> Union[int, bytes]:
+    # estados viejos traen la IP como texto: se convierte igual que al contar
+    return value if isinstance(value, int) else _ip_key(_key(value))
+
+
+# subred -> (bits que se descartan, prefijo); las claves son ip >> bits
+SUBNETS = {"ipv4_24": (8, 24), "ipv4_16": (16, 16), "ipv6_48": (80, 48)}
+
+
+def _subnet_text(name: str, key: int) -> str:
+    shift, prefix = SUBNETS[name]
+    if name.startswith("ipv4"):
+        return f"{socket.inet_ntoa((key << shift).to_bytes(4, 'big'))}/{prefix}"
+    return f"{ipaddress.IPv6Address(key << shift).compressed}/{prefix}"
+
+
+def _parse_time(s: str) -> datetime | None:
+    # e.g. 17/Sep/2025:05:25:00 +0000
+    try:
+        return datetime.strptime(s, "%d/%b/%Y:%H:%M:%S %z")
+    except Exception:
+        return None
+
+
+# "dd/Mon/YYYY:HH:MM" + zona -> (clave del timeline "YYYY-mm-dd HH:MM", epoch del minuto)
+_MINUTE_CACHE: Dict[str, Tuple[Optional[str], int]] = {}
+_MINUTE_CACHE_MAX = 100_000
+# timestamp completo -> (clave, epoch): en un log real se repite el mismo segundo muchas veces
+_STAMP_CACHE: Dict[str, Tuple[Optional[str], Optional[int]]] = {}
+_NO_STAMP: Tuple[Optional[str], Optional[int]] = (None, None)
+
+
+def _minute_stamp(s: str) -> Tuple[Optional[str], Optional[int]]:
+    """
+    (clave del timeline, epoch en segundos) o (None, None) si no parsea. La
+    clave es `_parse_time(s).strftime("%Y-%m-%d %H:%M")` pero strptime corre una
+    sola vez por minuto y zona: con el formato fijo "17/Sep/2025:05:25:00 +0000"
+    los segundos (00-59) no cambian ni la validez ni la clave, sólo se suman al epoch.
+    """
+    try:
+        return _STAMP_CACHE[s]
+    except KeyError:
+        pass
+    if len(s) == 26 and s[17] == ":" and s[20] == " " and s[18] in "012345" and s[19] in "0123456789":
+        ck = s[:17] + s[20:]
+        try:
+            key, base = _MINUTE_CACHE[ck]
+        except KeyError:
+            dt = _parse_time(s)
+            key, base = (dt.strftime("%Y-%m-%d %H:%M"), int(dt.timestamp()) - dt.second) if dt else (None, 0)
+            if len(_MINUTE_CACHE) >= _MINUTE_CACHE_MAX:
+                _MINUTE_CACHE.clear()
+            _MINUTE_CACHE[ck] = (key, base)
+        out = (key, base + int(s[18:20])) if key else _NO_STAMP
+    else:
+        dt = _parse_time(s)
+        out = (dt.strftime("%Y-%m-%d %H:%M"), int(dt.timestamp())) if dt else _NO_STAMP
+    if len(_STAMP_CACHE) >= _MINUTE_CACHE_MAX:
+        _STAMP_CACHE.clear()
+    _STAMP_CACHE[s] = out
+    return out
+
+
+def _minute_key(s: str) -> Optional[str]:
+    return _minute_stamp(s)[0]
+
+
+def parse_combined(line: str) -> Optional[Tuple[str, str, str, str, int, str, str]]:
+    """
+    Tokeniza una línea combined (ya sin espacios en los extremos) con find/split.
+    Devuelve (ip, time, method, path, status, ua, referer) o None. Ante cualquier cosa
+    fuera del caso común cae a COMBINED_RE, así el resultado es siempre el mismo
+    que el del regex.
+    """
+    lb = line.find("[")
+    if lb > 0 and line[lb - 1].isspace():
+        head = line[:lb].split()
+        rb = line.find("]", lb + 1)
+        if len(head) == 3 and rb > lb + 1 and line[rb + 1:rb + 3] == ' "':
+            qs = rb + 3
+            qe = line.find('"', qs)
+            req = line[qs:qe] if qe > 0 else ""
+            parts = req.split()
+            n = len(parts)
+            method = parts[0] if n else ""
+            if (
+                (n == 2 or (n == 3 and parts[2][:5] == "HTTP/" and len(parts[2]) > 5
+                            and not parts[2][5:].strip("0123456789.")))
+                and method.isascii() and method.isalpha() and method.isupper()
+                and req.startswith(method) and req.endswith(parts[-1])
+                and line[qe + 1:qe + 2] == " " and line[qe + 5:qe + 6] == " "
+            ):
+                st = line[qe + 2:qe + 5]
+                se = line.find(" ", qe + 6)
+                size = line[qe + 6:se]
+                if (
+                    st.isascii() and st.isdigit()
+                    and se > 0 and (size == "-" or size.isdigit())
+                    and line[se + 1:se + 2] == '"'
+                ):
+                    re_ = line.find('"', se + 2)
+                    ue = line.find('"', re_ + 3) if re_ > 0 and line[re_ + 1:re_ + 3] == ' "' else -1
+                    if ue > 0:
+                        return head[0], line[lb + 1:rb], method, parts[1], int(st), line[re_ + 3:ue], line[se + 2:re_]
+
+    m = COMBINED_RE.match(line)
+    if not m:
+        return None
+    return (m.group("ip"), m.group("time"), m.group("method"), m.group("path"),
+            int(m.group("status")), m.group("ua"), m.group("ref"))
+
+
+def parse_combined_bytes(line: bytes) -> Optional[Tuple[bytes, bytes, bytes, bytes, int, bytes, bytes]]:
+    """`parse_combined` para una línea ASCII en bytes (ver `_bytes_safe`); campos en bytes."""
+    lb = line.find(b"[")
+    if lb > 0 and line[lb - 1:lb].isspace():
+        head = line[:lb].split()
+        rb = line.find(b"]", lb + 1)
+        if len(head) == 3 and rb > lb + 1 and line[rb + 1:rb + 3] == b' "':
+            qs = rb + 3
+            qe = line.find(b'"', qs)
+            req = line[qs:qe] if qe > 0 else b""
+            parts = req.split()
+            n = len(parts)
+            method = parts[0] if n else b""
+            if (
+                (n == 2 or (n == 3 and parts[2][:5] == b"HTTP/" and len(parts[2]) > 5
+                            and not parts[2][5:].strip(b"0123456789.")))
+                and method.isalpha() and method.isupper()
+                and req.startswith(method) and req.endswith(parts[-1])
+                and line[qe + 1:qe + 2] == b" " and line[qe + 5:qe + 6] == b" "
+            ):
+                st = line[qe + 2:qe + 5]
+                se = line.find(b" ", qe + 6)
+                size = line[qe + 6:se]
+                if (
+                    st.isdigit()
+                    and se > 0 and (size == b"-" or size.isdigit())
+                    and line[se + 1:se + 2] == b'"'
+                ):
+                    re_ = line.find(b'"', se + 2)
+                    ue = line.find(b'"', re_ + 3) if re_ > 0 and line[re_ + 1:re_ + 3] == b' "' else -1
+                    if ue > 0:
+                        return head[0], line[lb + 1:rb], method, parts[1], int(st), line[re_ + 3:ue], line[se + 2:re_]
+
+    m = COMBINED_RE_B.match(line)
+    if not m:
+        return None
+    return (m.group("ip"), m.group("time"), m.group("method"), m.group("path"),
+            int(m.group("status")), m.group("ua"), m.group("ref"))
+
+
+class LineSplitter:
+    """
+    Convierte chunks de bytes en líneas de texto completas.
+    Da exactamente las mismas líneas que `data.decode(..., errors="ignore").splitlines()`.
+    """
+
+    def __init__(self, encoding: str = "utf-8"):
+        self._utf8 = codecs.lookup(encoding).name == "utf-8"
+        self._decoder = codecs.getincrementaldecoder(encoding)(errors="ignore")
+        self._carry = ""
+        self._bcarry = b""
+
+    def push_raw(self, chunk: bytes) -> List[Any]:
+        """
+        Como `push`, pero si el bloque (y lo que quedó pendiente) es ASCII sin
+        controles ambiguos devuelve las líneas como `bytes` sin decodificar.
+        Cada llamada devuelve líneas de un solo tipo.
+        """
+        if self._utf8 and not self._decoder.getstate()[0] and _bytes_safe(chunk):
+            if self._carry:
+                carry = self._carry.encode("utf-8", "surrogatepass")
+                if not _bytes_safe(carry):
+                    return self.push(chunk)
+                self._carry, self._bcarry = "", carry
+            buf = self._bcarry + chunk
+            if not buf:
+                return []
+            pieces = buf.splitlines(True)
+            last = pieces[-1]
+            if last.endswith(b"\n"):
+                self._bcarry = b""
+            else:
+                self._bcarry = pieces.pop()
+            return [p[:-2] if p.endswith(b"\r\n") else p[:-1] for p in pieces]
+        return self.push(chunk)
+
+    def push(self, chunk: bytes) -> List[str]:
+        if self._bcarry:
+            self._carry, self._bcarry = self._bcarry.decode("ascii"), b""
+        buf = self._carry + self._decoder.decode(chunk)
+        if not buf:
+            return []
+        pieces = buf.splitlines(True)
+        last = pieces[-1]
+        # la última pieza queda pendiente si no terminó o si termina en "\r"
+        # (el "\n" de un "\r\n" puede venir en el próximo chunk)
+        if last[-1] in _LINE_BREAKS and last[-1] != "\r":
+            self._carry = ""
+        else:
+            self._carry = pieces.pop()
+        return [_strip_eol(p) for p in pieces]
+
+    def close(self) -> List[str]:
+        if self._bcarry:
+            self._carry, self._bcarry = self._bcarry.decode("ascii"), b""
+        rest = self._carry + self._decoder.decode(b"", final=True)
+        self._carry = ""
+        return rest.splitlines()
+
+
+def _strip_eol(piece: str) -> str:
+    if piece.endswith("\r\n"):
+        return piece[:-2]
+    return piece[:-1]
+
+
+def iter_lines(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[str]:
+    splitter = LineSplitter(encoding)
+    for chunk in chunks:
+        yield from splitter.push(chunk)
+    yield from splitter.close()
+
+
+def iter_blocks(chunks: Iterable[bytes], encoding: str = "utf-8") -> Iterator[List[Any]]:
+    """Listas de líneas por chunk: `bytes` si el chunk es ASCII seguro, si no `str`."""
+    splitter = LineSplitter(encoding)
+    for chunk in chunks:
+        lines = splitter.push_raw(chunk)
+        if lines:
+            yield lines
+    lines = splitter.close()
+    if lines:
+        yield lines
+
+
+def _is_probe(path: Any) -> bool:
+    """¿El path pide algún archivo sensible?"""
+    if isinstance(path, bytes):
+        return PROBE_DETECTORS.first_bytes(path) is not None
+    return PROBE_DETECTORS.first(path) is not None
+
+
+class LogAnalyzer:
+    """
+    Acumula contadores a medida que llegan líneas; `summary()` arma el dict final.
+
+    Con `approx=True` la memoria queda fija aunque haya millones de paths/IPs
+    distintos: top paths/IPs con Space-Saving, distintos con HyperLogLog y las
+    líneas sospechosas con un reservoir (muestra uniforme en vez de las primeras).
+    El resumen agrega la clave "approx" con las cotas de error.
+
+    SQLi se busca en la línea entera (también ident/user, referer, UA y lo
+    que venga después), con el prefiltro de literales por lote de
+    `DetectorEngine.candidates`. El veredicto de probe depende sólo del path
+    y queda en un LRU por path (`_verdict`): en tráfico real los mismos paths
+    se repiten muchísimo. El resumen reporta el hit rate en "verdict_cache".
+
+    Las líneas que disparan algún detector se agrupan además en templates
+    (`log_templates.TemplateMiner`): el resumen trae los patrones de ataque
+    más frecuentes con conteos y ejemplos en "templates". Es lo único del
+    resumen que depende de cómo se partió el log: los clusters se arman en
+    orden de llegada y un merge los vuelve a parear por similitud.
+
+    Los paths se cuentan dos veces: tal cual (`by_path`) y normalizados
+    (`by_path_norm`, ver `path_normalizer`: ids, UUIDs, hashes y valores del
+    query string pasan a placeholders); el resumen trae los dos tops.
+
+    Las visitas (IP + UA + hora) alimentan `log_sessions.SessionTracker`,
+    que reconstruye sesiones cortando por inactividad: "sessions" trae
+    requests y duración por sesión y las que parecen crawlers.
+
+    Cada UA se clasifica (browser/bot/scanner/tool/other, ver `ua_classifier`)
+    una vez por valor distinto del lote, con el veredicto en un LRU por UA
+    exacto: "user_agents" trae requests por clase, la proporción automatizada
+    y los scanners/herramientas y bots conocidos más activos.
+    """
+
+    def __init__(self, approx: bool = False):
+        self.approx = approx
+        self.paths: PathNormalizer = default_normalizer()
+        self.total = 0
+        self.by_status: Counter = Counter()
+        if approx:
+            self.by_path = SpaceSaving(TOPK_CAPACITY)
+            self.by_path_norm = SpaceSaving(TOPK_CAPACITY)
+            self.by_ip = SpaceSaving(TOPK_CAPACITY)
+            self.by_subnet = {name: SpaceSaving(TOPK_CAPACITY) for name in SUBNETS}
+            self.distinct_paths = HyperLogLog()
+            self.distinct_ips = HyperLogLog()
+            self.sqli = Reservoir(MAX_HITS, seed=1)
+            self.probes = Reservoir(MAX_HITS, seed=2)
+        else:
+            self.by_path = Counter()
+            self.by_path_norm = Counter()
+            self.by_ip = Counter()
+            self.by_subnet = {name: Counter() for name in SUBNETS}
+            self.sqli = []
+            self.probes = []
+        self.errors_5xx = 0
+        self.rate_429 = 0
+        self.unauthorized_401: Counter = Counter()
+        self.admin_forbidden_403: Counter = Counter()
+        self.timeline: Counter = Counter()
+        # desglose por minuto para los rollups (sólo minutos con algo que contar)
+        self.timeline_4xx: Counter = Counter()
+        self.timeline_5xx: Counter = Counter()
+        self.timeline_sqli: Counter = Counter()
+        self.timeline_probes: Counter = Counter()
+        self.sqli_total = 0
+        self.probe_total = 0
+        # hits/misses de LRUs anteriores (merges, pickles); se suman a cache_info()
+        self.verdict_hits = 0
+        self.verdict_misses = 0
+        self._verdict = functools.lru_cache(maxsize=VERDICT_CACHE_SIZE)(_is_probe)
+        self.templates = TemplateMiner()
+        self.sessions = SessionTracker()
+        self.ua_classes: Counter = Counter()
+        # requests por nombre conocido (sqlmap, curl, googlebot...)
+        self.ua_agents: Counter = Counter()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # el LRU no se puede picklear (vuelve del pool de procesos): se guardan sus conteos
+        state = self.__dict__.copy()
+        state["verdict_hits"], state["verdict_misses"] = self._verdict_stats()
+        del state["_verdict"]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._verdict = functools.lru_cache(maxsize=VERDICT_CACHE_SIZE)(_is_probe)
+
+    def _verdict_stats(self) -> Tuple[int, int]:
+        info = self._verdict.cache_info()
+        return self.verdict_hits + info.hits, self.verdict_misses + info.misses
+
+    def feed(self, raw: str) -> None:
+        self.feed_lines((raw,))
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        it = iter(lines)
+        while True:
+            batch = list(islice(it, BATCH_LINES))
+            if not batch:
+                return
+            self._feed_batch(batch)
+
+    def _feed_batch(self, batch: List[Any], rejected: Optional[List[Any]] = None) -> None:
+        # los contadores grandes se actualizan una vez por lote (Counter.update
+        # cuenta en C y conserva el orden de primera aparición).
+        # `rejected` junta (en orden) las líneas que no son combined.
+        # by_path usa claves bytes en los dos caminos (ver _text); by_ip, enteros (ver _ip_key)
+        if batch and isinstance(batch[0], bytes):
+            self._feed_batch_bytes(batch, rejected)
+            return
+        ips: List[str] = []
+        paths: List[str] = []
+        statuses: List[int] = []
+        minutes: List[str] = []
+        stamps: List[Optional[int]] = []
+        uas: List[str] = []
+        parse, minute_stamp = parse_combined, _minute_stamp
+        sqli_first, is_probe = SQLI_DETECTORS.first, self._verdict
+        sqli_cand = SQLI_DETECTORS.candidates(batch)
+        sample_all = self.approx  # el reservoir necesita ver todos los hits
+
+        for i, raw in enumerate(batch):
+            tok = parse(raw.strip())
+            if tok is None:
+                if rejected is not None:
+                    rejected.append(raw)
+                continue
+            ip, time_s, method, path, status, ua, _ref = tok
+            key, ts = minute_stamp(time_s)
+            if key:
+                minutes.append(key)
+            ips.append(ip)
+            stamps.append(ts)
+            uas.append(ua)
+            paths.append(path)
+            statuses.append(status)
+
+            if status >= 400:
+                if status >= 500:
+                    self.errors_5xx += 1
+                    if key:
+                        self.timeline_5xx[key] += 1
+                elif key:
+                    self.timeline_4xx[key] += 1
+                if status == 429:
+                    self.rate_429 += 1
+                if status == 401 and path.endswith("/api/login"):
+                    self.unauthorized_401[ip] += 1
+                if status == 403 and path.startswith("/admin"):
+                    self.admin_forbidden_403[ip] += 1
+
+            # los detectores miran todas las líneas candidatas (los rollups cuentan
+            # cada hit aunque la muestra del resumen ya esté llena)
+            hit = (sqli_cand is None or i in sqli_cand) and sqli_first(raw) is not None
+            probe = is_probe(path)
+            if hit:
+                self.sqli_total += 1
+                if key:
+                    self.timeline_sqli[key] += 1
+                if sample_all or len(self.sqli) < MAX_HITS:
+                    self.sqli.append(raw)
+
+            if probe:
+                self.probe_total += 1
+                if key:
+                    self.timeline_probes[key] += 1
+                if sample_all or len(self.probes) < MAX_HITS:
+                    self.probes.append(raw)
+
+            if hit or probe:
+                self.templates.add(request_tokens(method, path, status, ua), raw.strip())
+
+        ip_keys = [ip.encode("utf-8", "surrogatepass") for ip in ips]
+        self._count(statuses, [p.encode("utf-8", "surrogatepass") for p in paths], ip_keys, minutes)
+        ua_keys = [ua.encode("utf-8", "surrogatepass") for ua in uas]
+        self.sessions.feed(stamps, ip_keys, ua_keys)
+        self._count_agents(ua_keys)
+
+    def _feed_batch_bytes(self, batch: List[bytes], rejected: Optional[List[Any]] = None) -> None:
+        # mismo recorrido que _feed_batch sobre líneas ASCII sin decodificar;
+        # sólo se decodifica lo que va al resumen tal cual (hits, IPs de 401/403)
+        ips: List[bytes] = []
+        paths: List[bytes] = []
+        statuses: List[int] = []
+        minutes: List[str] = []
+        stamps: List[Optional[int]] = []
+        uas: List[bytes] = []
+        parse, minute_stamp = parse_combined_bytes, _minute_stamp
+        sqli_first, is_probe = SQLI_DETECTORS.first_bytes, self._verdict
+        sqli_cand = SQLI_DETECTORS.candidates(batch)
+        sample_all = self.approx
+
+        for i, raw in enumerate(batch):
+            tok = parse(raw.strip())
+            if tok is None:
+                if rejected is not None:
+                    rejected.append(raw)
+                continue
+            ip, time_b, method, path, status, ua, _ref = tok
+            key, ts = minute_stamp(time_b.decode("ascii"))
+            if key:
+                minutes.append(key)
+            ips.append(ip)
+            stamps.append(ts)
+            uas.append(ua)
+            paths.append(path)
+            statuses.append(status)
+
+            if status >= 400:
+                if status >= 500:
+                    self.errors_5xx += 1
+                    if key:
+                        self.timeline_5xx[key] += 1
+                elif key:
+                    self.timeline_4xx[key] += 1
+                if status == 429:
+                    self.rate_429 += 1
+                if status == 401 and path.endswith(b"/api/login"):
+                    self.unauthorized_401[ip.decode("ascii")] += 1
+                if status == 403 and path.startswith(b"/admin"):
+                    self.admin_forbidden_403[ip.decode("ascii")] += 1
+
+            # los detectores miran todas las líneas candidatas (los rollups cuentan
+            # cada hit aunque la muestra del resumen ya esté llena)
+            hit = (sqli_cand is None or i in sqli_cand) and sqli_first(raw) is not None
+            probe = is_probe(path)
+            if hit:
+                self.sqli_total += 1
+                if key:
+                    self.timeline_sqli[key] += 1
+                if sample_all or len(self.sqli) < MAX_HITS:
+                    self.sqli.append(raw.decode("ascii"))
+
+            if probe:
+                self.probe_total += 1
+                if key:
+                    self.timeline_probes[key] += 1
+                if sample_all or len(self.probes) < MAX_HITS:
+                    self.probes.append(raw.decode("ascii"))
+
+            if hit or probe:
+                self.templates.add(
+                    request_tokens(method.decode("ascii"), path.decode("ascii"), status, ua.decode("ascii")),
+                    raw.strip().decode("ascii"),
+                )
+
+        self._count(statuses, paths, ips, minutes)
+        self.sessions.feed(stamps, ips, uas)
+        self._count_agents(uas)
+
+    def _count_agents(self, uas: List[bytes]) -> None:
+        # los UAs se cuentan en C y se clasifica sólo cada UA distinto del lote
+        classes, agents = self.ua_classes, self.ua_agents
+        for ua, c in Counter(uas).items():
+            kind, name = classify_ua(ua)
+            classes[kind] += c
+            if name is not None:
+                agents[name] += c
+
+    def _count(self, statuses: List[int], paths: List[bytes], ips: List[bytes], minutes: List[str]) -> None:
+        self.total += len(ips)
+        self.by_status.update(statuses)
+        self.by_path.update(paths)
+        # un lookup en el LRU del normalizador por línea; la regex corre una vez por path distinto
+        self.by_path_norm.update(map(self.paths.normalize, paths))
+        # las IPs se cuentan primero como bytes (en C) y sólo las distintas del
+        # lote se pasan a entero; las subredes salen de esos mismos conteos
+        by_ip: Counter = Counter()
+        v4_24: Counter = Counter()
+        v4_16: Counter = Counter()
+        v6_48: Counter = Counter()
+        ip_key = _ip_key
+        for raw, c in Counter(ips).items():
+            key = ip_key(raw)
+            by_ip[key] += c
+            if isinstance(key, int):
+                if key < _V4_LIMIT:
+                    v4_24[key >> 8] += c
+                    v4_16[key >> 16] += c
+                else:
+                    v6_48[(key ^ _V6_TAG) >> 80] += c
+        self.by_ip.update(by_ip)
+        for name, counts in (("ipv4_24", v4_24), ("ipv4_16", v4_16), ("ipv6_48", v6_48)):
+            if counts:
+                self.by_subnet[name].update(counts)
+        self.timeline.update(minutes)
+        if self.approx:
+            self.distinct_paths.update(paths)
+            self.distinct_ips.update(by_ip)
+
+    def merge(self, other: "LogAnalyzer") -> "LogAnalyzer":
+        """
+        Suma el estado de `other` (el tramo siguiente del mismo log).
+        Mergeando en orden, el resumen es idéntico al de un análisis secuencial
+        (los empates de most_common respetan el orden de primera aparición),
+        salvo los templates de ataque, que pueden agruparse distinto.
+        """
+        if self.approx != other.approx:
+            raise ValueError("No se puede mergear un análisis exacto con uno aproximado")
+        if self.paths.rules != other.paths.rules:
+            raise ValueError("No se puede mergear análisis con distintas reglas de paths")
+        self.total += other.total
+        self.by_status.update(other.by_status)
+        if self.approx:
+            self.by_path.merge(other.by_path)
+            self.by_path_norm.merge(other.by_path_norm)
+            self.by_ip.merge(other.by_ip)
+            for name in SUBNETS:
+                self.by_subnet[name].merge(other.by_subnet[name])
+            self.distinct_paths.merge(other.distinct_paths)
+            self.distinct_ips.merge(other.distinct_ips)
+            self.sqli.merge(other.sqli)
+            self.probes.merge(other.probes)
+        else:
+            self.by_path.update(other.by_path)
+            self.by_path_norm.update(other.by_path_norm)
+            self.by_ip.update(other.by_ip)
+            for name in SUBNETS:
+                self.by_subnet[name].update(other.by_subnet[name])
+            self.sqli = (self.sqli + other.sqli)[:MAX_HITS]
+            self.probes = (self.probes + other.probes)[:MAX_HITS]
+        self.errors_5xx += other.errors_5xx
+        self.rate_429 += other.rate_429
+        self.unauthorized_401.update(other.unauthorized_401)
+        self.admin_forbidden_403.update(other.admin_forbidden_403)
+        self.timeline.update(other.timeline)
+        for name in _BREAKDOWN:
+            getattr(self, name).update(getattr(other, name))
+        self.sqli_total += other.sqli_total
+        self.probe_total += other.probe_total
+        hits, misses = other._verdict_stats()
+        self.verdict_hits += hits
+        self.verdict_misses += misses
+        self.templates.merge(other.templates)
+        self.sessions.merge(other.sessions)
+        self.ua_classes.update(other.ua_classes)
+        self.ua_agents.update(other.ua_agents)
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        """Estado JSON-serializable (los Counter como pares, en orden de inserción)."""
+        state: Dict[str, Any] = {
+            "approx": self.approx,
+            "total": self.total,
+            "by_status": list(self.by_status.items()),
+            "errors_5xx": self.errors_5xx,
+            "rate_429": self.rate_429,
+            "unauthorized_401": list(self.unauthorized_401.items()),
+            "admin_forbidden_403": list(self.admin_forbidden_403.items()),
+            "timeline": list(self.timeline.items()),
+            "sqli_total": self.sqli_total,
+            "probe_total": self.probe_total,
+            "verdict_stats": list(self._verdict_stats()),
+            "templates": self.templates.to_state(),
+            "sessions": self.sessions.to_state(),
+            "path_rules": list(self.paths.rules),
+            "ua_classes": list(self.ua_classes.items()),
+            "ua_agents": list(self.ua_agents.items()),
+        }
+        state.update((name, list(getattr(self, name).items())) for name in _BREAKDOWN)
+        if self.approx:
+            state.update(
+                by_path=self.by_path.to_state(_text), by_path_norm=self.by_path_norm.to_state(_text),
+                by_ip=self.by_ip.to_state(_ip_dump),
+                by_subnet={name: ss.to_state() for name, ss in self.by_subnet.items()},
+                distinct_paths=self.distinct_paths.to_state(), distinct_ips=self.distinct_ips.to_state(),
+                sqli=self.sqli.to_state(), probes=self.probes.to_state(),
+            )
+        else:
+            state.update(
+                by_path=[[_text(k), c] for k, c in self.by_path.items()],
+                by_path_norm=[[_text(k), c] for k, c in self.by_path_norm.items()],
+                by_ip=[[_ip_dump(k), c] for k, c in self.by_ip.items()],
+                by_subnet={name: list(counts.items()) for name, counts in self.by_subnet.items()},
+                sqli=self.sqli, probes=self.probes,
+            )
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "LogAnalyzer":
+        an = cls(approx=state["approx"])
+        an.total = state["total"]
+        an.by_status.update(dict(state["by_status"]))
+        an.errors_5xx, an.rate_429 = state["errors_5xx"], state["rate_429"]
+        an.unauthorized_401.update(dict(state["unauthorized_401"]))
+        an.admin_forbidden_403.update(dict(state["admin_forbidden_403"]))
+        an.timeline.update(dict(state["timeline"]))
+        # estados de sesiones anteriores al desglose: arrancan en cero
+        for name in _BREAKDOWN:
+            getattr(an, name).update(dict(state.get(name, ())))
+        an.sqli_total, an.probe_total = state.get("sqli_total", 0), state.get("probe_total", 0)
+        an.verdict_hits, an.verdict_misses = state.get("verdict_stats", (0, 0))
+        if "templates" in state:
+            an.templates = TemplateMiner.from_state(state["templates"])
+        if "sessions" in state:
+            an.sessions = SessionTracker.from_state(state["sessions"])
+        an.ua_classes.update(dict(state.get("ua_classes", ())))
+        an.ua_agents.update(dict(state.get("ua_agents", ())))
+        rules = tuple(state.get("path_rules", an.paths.rules))
+        if rules != an.paths.rules:
+            an.paths = PathNormalizer(rules)
+        if an.approx:
+            an.by_path = SpaceSaving.from_state(state["by_path"], _key)
+            if "by_path_norm" in state:
+                an.by_path_norm = SpaceSaving.from_state(state["by_path_norm"], _key)
+            an.by_ip = SpaceSaving.from_state(state["by_ip"], _ip_load)
+            for name, sub in state.get("by_subnet", {}).items():
+                an.by_subnet[name] = SpaceSaving.from_state(sub)
+            an.distinct_paths = HyperLogLog.from_state(state["distinct_paths"])
+            an.distinct_ips = HyperLogLog.from_state(state["distinct_ips"])
+            an.sqli = Reservoir.from_state(state["sqli"])
+            an.probes = Reservoir.from_state(state["probes"])
+        else:
+            an.by_path.update({_key(k): c for k, c in state["by_path"]})
+            an.by_path_norm.update({_key(k): c for k, c in state.get("by_path_norm", ())})
+            for k, c in state["by_ip"]:
+                an.by_ip[_ip_load(k)] += c
+            for name, pairs in state.get("by_subnet", {}).items():
+                an.by_subnet[name].update(dict(pairs))
+            an.sqli, an.probes = list(state["sqli"]), list(state["probes"])
+        if "by_path_norm" not in state:
+            # estados de antes de la normalización: se arma desde los paths crudos
+            norm: Counter = Counter()
+            for p, c in (an.by_path.counts if an.approx else an.by_path).items():
+                norm[an.paths.normalize(p)] += c
+            an.by_path_norm.update(norm)
+        return an
+
+    def _timeline_detail(self) -> Dict[str, List[int]]:
+        # {minuto: [4xx, 5xx, sqli, probes]}, sólo minutos con algún valor
+        counters = [getattr(self, name) for name in _BREAKDOWN]
+        keys = set().union(*counters)
+        return {k: [c[k] for c in counters] for k in sorted(keys)}
+
+    def _verdict_summary(self) -> Dict[str, Any]:
+        hits, misses = self._verdict_stats()
+        lookups = hits + misses
+        return {
+            "capacity": VERDICT_CACHE_SIZE,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def _agents_summary(self) -> Dict[str, Any]:
+        classified = sum(self.ua_classes.values())
+        automated = sum(self.ua_classes[k] for k in AUTOMATED)
+
+        def top(kinds):
+            return [(name, c) for name, c in self.ua_agents.most_common() if KNOWN_AGENTS[name][0] in kinds][:10]
+
+        return {
+            "classes": {k: self.ua_classes[k] for k in UA_CLASSES},
+            # bots + scanners + herramientas sobre el total de requests
+            "bot_share": round(automated / classified, 4) if classified else 0.0,
+            "top_scanners": top(("scanner", "tool")),
+            "top_bots": top(("bot",)),
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        # buckets por clase
+        classes = Counter()
+        for s, c in self.by_status.items():
+            k = f"{s//100}xx"
+            classes[k] += c
+
+        out = {
+            "total": self.total,
+            "classes": dict(classes),
+            "by_status": dict(self.by_status.most_common()),
+            "top_paths": [(_text(p), c) for p, c in self.by_path.most_common(10)],
+            "top_paths_normalized": [(_text(p), c) for p, c in self.by_path_norm.most_common(10)],
+            "path_rules": list(self.paths.rules),
+            "top_ips": [(_ip_text(ip), c) for ip, c in self.by_ip.most_common(10)],
+            "top_subnets": {
+                name: [(_subnet_text(name, k), c) for k, c in counts.most_common(10)]
+                for name, counts in self.by_subnet.items()
+            },
+            "errors_5xx": self.errors_5xx,
+            "rate_429": self.rate_429,
+            "unauth_401": self.unauthorized_401.most_common(),
+            "admin_403": self.admin_forbidden_403.most_common(),
+            "sqli_hits": list(self.sqli)[:MAX_HITS],
+            "probe_hits": list(self.probes)[:MAX_HITS],
+            "timeline": dict(sorted(self.timeline.items())),
+            "sqli_total": self.sqli_total,
+            "probe_total": self.probe_total,
+            "timeline_detail": self._timeline_detail(),
+            "verdict_cache": self._verdict_summary(),
+            "templates": self.templates.summary(TOP_TEMPLATES),
+            "sessions": self.sessions.summary(),
+            "user_agents": self._agents_summary(),
+        }
+        if self.approx:
+            out["approx"] = {
+                "topk_capacity": TOPK_CAPACITY,
+                # cada conteo de top_* puede estar sobreestimado como mucho en su error
+                "top_paths_error": [self.by_path.error(p) for p, _ in self.by_path.most_common(10)],
+                "top_ips_error": [self.by_ip.error(ip) for ip, _ in self.by_ip.most_common(10)],
+                "max_count_error": max(self.by_path.max_error(), self.by_ip.max_error()),
+                "distinct_paths": self.distinct_paths.count(),
+                "distinct_ips": self.distinct_ips.count(),
+                "distinct_rel_error": round(self.distinct_ips.relative_error, 4),
+                "sqli_seen": self.sqli.seen,
+                "probe_seen": self.probes.seen,
+            }
+        return out
+
+
+def analyze_log(text: str) -> Dict[str, Any]:
+    analyzer = LogAnalyzer()
+    analyzer.feed_lines(text.splitlines())
+    return analyzer.summary()
+
+
+register_format("combined", lambda line: parse_combined(line.strip()) is not None)
+
+
+class UnifiedAnalyzer:
+    """
+    Pipeline de una sola pasada para uploads HTTP, sshd/auth o mezclados.
+
+    El formato principal se detecta con las primeras líneas. Con "combined"
+    cada línea va primero al parser HTTP y las que no parsean pasan a
+    `AuthAnalyzer`; con "syslog" las líneas con prefijo syslog van directo a
+    `AuthAnalyzer` sin intentar el parser HTTP. Las líneas HTTP pasan además
+    por el chequeo XSS de auth (`AuthAnalyzer.feed_http`) en el mismo lote.
+    Cada línea se lee una vez y el resumen es el de `LogAnalyzer` más
+    "formats" y, si hubo líneas de auth o hallazgos, la sección "auth".
+    """
+
+    def __init__(self, approx: bool = False):
+        self.http = LogAnalyzer(approx=approx)
+        self.auth = AuthAnalyzer(max_findings=MAX_HITS)
+        self.format: Optional[str] = None
+        self.syslog_lines = 0
+
+    def feed(self, raw: str) -> None:
+        self.feed_lines((raw,))
+
+    def feed_lines(self, lines: Iterable[str]) -> None:
+        it = iter(lines)
+        while True:
+            batch = list(islice(it, BATCH_LINES))
+            if not batch:
+                return
+            self._feed_batch(batch)
+
+    def feed_blocks(self, blocks: Iterable[List[Any]]) -> None:
+        """Como `feed_lines` pero con los bloques de `iter_blocks` (str o bytes)."""
+        for block in blocks:
+            for i in range(0, len(block), BATCH_LINES):
+                self._feed_batch(block[i:i + BATCH_LINES])
+
+    def _feed_batch(self, batch: List[Any]) -> None:
+        is_bytes = isinstance(batch[0], bytes)
+        if self.format is None:
+            self.format = sniff_format((ln.decode("ascii") for ln in batch) if is_bytes else batch)
+        if is_bytes and self.format == "syslog":
+            # auth va por el camino str de todas formas
+            batch, is_bytes = [ln.decode("ascii") for ln in batch], False
+
+        rest: List[Any] = []
+        # líneas del lote que pueden tener XSS (None: hay que mirarlas todas)
+        xss_cand = XSS_DETECTORS.candidates(batch)
+        if self.format != "syslog":
+            self.http._feed_batch(batch, rest)
+            rejected = {id(ln) for ln in rest}
+            web = [i for i in (range(len(batch)) if xss_cand is None else sorted(xss_cand))
+                   if id(batch[i]) not in rejected]
+            if not web:
+                # caso común: ninguna línea HTTP con XSS, auth sólo ve las rechazadas
+                for ln in rest:
+                    self._feed_auth(ln.decode("ascii") if is_bytes else ln)
+                return
+            web_set = set(web)
+            for i, ln in enumerate(batch):
+                if i in web_set:
+                    self.auth.feed_http(ln)
+                elif id(ln) in rejected:
+                    self._feed_auth(ln.decode("ascii") if is_bytes else ln)
+            return
+
+        flags = [looks_syslog(ln) for ln in batch]
+        self.http._feed_batch([ln for ln, is_sys in zip(batch, flags) if not is_sys], rest)
+        # `rest` es una subsecuencia (mismos objetos) de las líneas no syslog:
+        # se recorre el lote para pasarle todo a auth en el orden original
+        j = 0
+        for i, (ln, is_sys) in enumerate(zip(batch, flags)):
+            if is_sys:
+                self.syslog_lines += 1
+                self.auth.feed(ln)
+            elif j < len(rest) and rest[j] is ln:
+                j += 1
+                self.auth.feed(ln)
+            elif xss_cand is None or i in xss_cand:
+                self.auth.feed_http(ln)
+
+    def _feed_auth(self, ln: str) -> None:
+        if looks_syslog(ln):
+            self.syslog_lines += 1
+        self.auth.feed(ln)
+
+    def merge(self, other: "UnifiedAnalyzer") -> "UnifiedAnalyzer":
+        self.http.merge(other.http)
+        self.auth.merge(other.auth)
+        self.syslog_lines += other.syslog_lines
+        self.format = self.format or other.format
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "format": self.format,
+            "syslog_lines": self.syslog_lines,
+            "http": self.http.to_state(),
+            "auth": self.auth.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "UnifiedAnalyzer":
+        an = cls.__new__(cls)
+        an.format = state["format"]
+        an.syslog_lines = state["syslog_lines"]
+        an.http = LogAnalyzer.from_state(state["http"])
+        an.auth = AuthAnalyzer.from_state(state["auth"])
+        return an
+
+    def summary(self) -> Dict[str, Any]:
+        out = self.http.summary()
+        out["format"] = self.format or "combined"
+        out["formats"] = {
+            "combined": self.http.total,
+            "syslog": self.syslog_lines,
+            "other": self.auth.lines - self.syslog_lines,
+        }
+        if self.syslog_lines or self.auth.findings:
+            out["auth"] = self.auth.summary()
+        return out
+
+
+# tamaño de lectura al analizar archivos del disco
+READ_CHUNK = 1024 * 1024
+
+
+def shard_ranges(path: str, shards: int) -> List[Tuple[int, int]]:
+    """
+    Parte el archivo en `shards` rangos de bytes [inicio, fin) que cortan justo
+    después de un "\n", así ninguna línea queda partida entre dos tramos.
+    Un archivo comprimido no se puede partir por bytes: va en un solo tramo.
+    """
+    size = os.path.getsize(path)
+    if shards <= 1 or size == 0 or detect_compression(path):
+        return [(0, size)]
+    cuts = [0]
+    with open(path, "rb") as fh:
+        for i in range(1, shards):
+            pos = max(cuts[-1], size * i // shards)
+            fh.seek(pos)
+            while True:
+                block = fh.read(64 * 1024)
+                if not block:
+                    pos = size
+                    break
+                nl = block.find(b"\n")
+                if nl >= 0:
+                    pos += nl + 1
+                    break
+                pos += len(block)
+            if pos >= size:
+                break
+            if pos > cuts[-1]:
+                cuts.append(pos)
+    cuts.append(size)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _read_range(path: str, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        left = end - start
+        while left > 0:
+            chunk = fh.read(min(READ_CHUNK, left))
+            if not chunk:
+                break
+            left -= len(chunk)
+            yield chunk
+
+
+def analyze_file_range(path: str, start: int = 0, end: Optional[int] = None,
+                       approx: bool = False) -> UnifiedAnalyzer:
+    """
+    Analiza un tramo del archivo y devuelve el estado parcial (mergeable).
+    Si el archivo es .gz/.bz2/.xz se descomprime al vuelo (sólo como tramo único).
+    """
+    size = os.path.getsize(path)
+    if end is None:
+        end = size
+    kind = detect_compression(path) if size else None
+    if kind and (start, end) != (0, size):
+        raise ValueError("Un archivo comprimido sólo se analiza completo")
+    chunks = iter_decompressed(path, kind, READ_CHUNK) if kind else _read_range(path, start, end)
+    analyzer = UnifiedAnalyzer(approx=approx)
+    analyzer.feed_blocks(iter_blocks(chunks))
+    return analyzer
+
+
+def merge_analyzers(parts: Iterable[UnifiedAnalyzer]) -> UnifiedAnalyzer:
+    """Mergea estados parciales (todos exactos o todos aproximados) en el orden del archivo."""
+    it = iter(parts)
+    merged = next(it, None) or UnifiedAnalyzer()
+    for part in it:
+        merged.merge(part)
+    return merged
+
+
+def merge_and_summarize(parts: List[UnifiedAnalyzer]) -> Dict[str, Any]:
+    """`merge_analyzers(parts).summary()` como función top-level, para correrla en el pool."""
+    return merge_analyzers(parts).summary()
+
+
+def analyze_file(path: str, approx: bool = False) -> Dict[str, Any]:
+    """Analiza un archivo en disco leyendo por bloques (pensado para correr en el pool)."""
+    return analyze_file_range(path, approx=approx).summary()
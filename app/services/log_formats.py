@@ -0,0 +1,49 @@
+# app/services/log_formats.py
+"""
+Registro de formatos de log.
+
+Cada formato registra un matcher `line -> bool`; `sniff_format` mira las
+primeras líneas y devuelve el formato que más coincide, que el pipeline usa
+para decidir a qué parser mandar primero cada línea.
+"""
+import re
+from typing import Callable, Dict, Iterable
+
+# cuántas líneas no vacías se miran para detectar el formato
+SNIFF_LINES = 50
+
+# "Oct 16 12:34:56 host sshd[123]: ..." o "2025-10-16T12:34:56+00:00 host sshd[123]: ..."
+SYSLOG_RE = re.compile(
+    r"^(?:[A-Z][a-z]{2} [ \d]\d \d\d:\d\d:\d\d|\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d\S*)\s+\S+\s+[\w./-]+(?:\[\d+\])?:\s"
+)
+
+_FORMATS: Dict[str, Callable[[str], bool]] = {}
+
+
+def register_format(name: str, matcher: Callable[[str], bool]) -> None:
+    _FORMATS[name] = matcher
+
+
+def looks_syslog(line: str) -> bool:
+    return SYSLOG_RE.match(line) is not None
+
+
+def sniff_format(lines: Iterable[str], default: str = "combined") -> str:
+    """Formato con más coincidencias en las primeras líneas (empates: orden de registro)."""
+    sample = []
+    for ln in lines:
+        if ln.strip():
+            sample.append(ln)
+            if len(sample) >= SNIFF_LINES:
+                break
+    if not sample:
+        return default
+    best, best_hits = default, 0
+    for name, matcher in _FORMATS.items():
+        hits = sum(1 for ln in sample if matcher(ln))
+        if hits > best_hits:
+            best, best_hits = name, hits
+    return best
+
+
+register_format("syslog", looks_syslog)
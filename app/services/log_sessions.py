@@ -0,0 +1,298 @@
+# app/services/log_sessions.py
+"""
+Reconstrucción de sesiones de visitantes (IP + user agent) sobre el log HTTP.
+
+Una sesión es una racha de requests de la misma IP con el mismo UA; se corta
+cuando el reloj del log (la hora más alta vista hasta esa línea) pasa en más
+de `gap` segundos a su último acceso. La tabla de sesiones abiertas se barre a
+medida que avanza ese reloj (cada `gap / 4`) y las vencidas se cierran, así la
+memoria depende de los visitantes concurrentes y no de las líneas. Con más de
+`max_open` abiertas se fuerza el cierre de las de último acceso más viejo
+(queda contado en el resumen). Cuándo se barre no cambia el resultado: una
+sesión vencida que sigue en la tabla se corta igual con la próxima visita,
+aunque el log traiga líneas fuera de orden.
+
+Al cerrarse, cada sesión suma a estadísticas que se pueden sumar entre tramos
+(histogramas de requests y duración, sesiones "crawler" y el top por tasa).
+Las sesiones que empezaron dentro de `gap` del comienzo del tramo quedan
+aparte (`leading`): en un merge se unen con la sesión abierta del tramo
+anterior; con el log en orden de tiempo el resultado es el de una sola pasada.
+"""
+import heapq
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# hueco de inactividad que corta una sesión (segundos)
+DEFAULT_GAP = 30 * 60
+
+# sesiones abiertas a la vez; pasado el tope se cierran las más viejas
+MAX_OPEN = 100_000
+
+# una sesión es crawler si tiene al menos estos requests y esta tasa (req/min)
+CRAWL_MIN_REQUESTS = 20
+CRAWL_RATE = 60.0
+
+TOP_CRAWLERS = 10
+
+# (límite superior inclusivo, etiqueta); None = sin límite
+REQUEST_BUCKETS = ((1, "1"), (5, "2-5"), (20, "6-20"), (100, "21-100"), (1000, "101-1000"), (None, ">1000"))
+DURATION_BUCKETS = ((59, "<1m"), (599, "1-10m"), (1799, "10-30m"), (7199, "30m-2h"), (None, ">2h"))
+
+Key = Tuple[bytes, bytes]
+
+
+def _bucket(value: int, buckets) -> str:
+    for limit, label in buckets:
+        if limit is None or value <= limit:
+            return label
+    return buckets[-1][1]
+
+
+def _text(raw: bytes) -> str:
+    return raw.decode("utf-8", "surrogatepass")
+
+
+def _raw(text: str) -> bytes:
+    return text.encode("utf-8", "surrogatepass")
+
+
+def _join(a: List[int], b: List[int]) -> List[int]:
+    # `b` sigue a `a` en el log
+    return [a[0], b[1], a[2] + b[2]]
+
+
+class _SessionStats:
+    """Agregados de sesiones cerradas; sumar en cualquier orden da lo mismo."""
+
+    def __init__(self, crawl_rate: float = CRAWL_RATE):
+        self.crawl_rate = crawl_rate
+        self.sessions = 0
+        self.requests = 0
+        self.duration = 0
+        self.by_requests: Counter = Counter()
+        self.by_duration: Counter = Counter()
+        self.crawlers = 0
+        # min-heap de (tasa, requests, -inicio, ip, ua, duración): orden total, no depende del orden de cierre
+        self.top: List[Tuple[float, int, int, bytes, bytes, int]] = []
+
+    def add(self, key: Key, s: List[int]) -> None:
+        first, last, n = s
+        dur = max(0, last - first)  # con líneas fuera de orden el último acceso puede ser anterior
+        self.sessions += 1
+        self.requests += n
+        self.duration += dur
+        self.by_requests[_bucket(n, REQUEST_BUCKETS)] += 1
+        self.by_duration[_bucket(dur, DURATION_BUCKETS)] += 1
+        if n >= CRAWL_MIN_REQUESTS:
+            rate = n * 60 / max(dur, 60)
+            if rate >= self.crawl_rate:
+                self.crawlers += 1
+            self._push((rate, n, -first, key[0], key[1], dur))
+
+    def _push(self, entry: Tuple[float, int, int, bytes, bytes, int]) -> None:
+        if len(self.top) < TOP_CRAWLERS:
+            heapq.heappush(self.top, entry)
+        elif entry > self.top[0]:
+            heapq.heapreplace(self.top, entry)
+
+    def merge(self, other: "_SessionStats") -> None:
+        self.sessions += other.sessions
+        self.requests += other.requests
+        self.duration += other.duration
+        self.by_requests.update(other.by_requests)
+        self.by_duration.update(other.by_duration)
+        self.crawlers += other.crawlers
+        for entry in other.top:
+            self._push(entry)
+
+    def copy(self) -> "_SessionStats":
+        out = _SessionStats(self.crawl_rate)
+        out.merge(self)
+        return out
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "sessions": self.sessions,
+            "requests": self.requests,
+            "duration": self.duration,
+            "by_requests": dict(self.by_requests),
+            "by_duration": dict(self.by_duration),
+            "crawlers": self.crawlers,
+            "top": [[rate, n, neg_first, _text(ip), _text(ua), dur] for rate, n, neg_first, ip, ua, dur in self.top],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], crawl_rate: float) -> "_SessionStats":
+        out = cls(crawl_rate)
+        out.sessions, out.requests, out.duration = state["sessions"], state["requests"], state["duration"]
+        out.by_requests.update(state["by_requests"])
+        out.by_duration.update(state["by_duration"])
+        out.crawlers = state["crawlers"]
+        for rate, n, neg_first, ip, ua, dur in state["top"]:
+            out._push((rate, n, neg_first, _raw(ip), _raw(ua), dur))
+        return out
+
+
+class SessionTracker:
+    def __init__(self, gap: int = DEFAULT_GAP, max_open: int = MAX_OPEN, crawl_rate: float = CRAWL_RATE):
+        self.gap = gap
+        self.max_open = max_open
+        self.crawl_rate = crawl_rate
+        # (ip, ua) -> [primer acceso, último acceso, requests]
+        self.open: Dict[Key, List[int]] = {}
+        # cerradas que empezaron dentro de `gap` del inicio del tramo (ver merge)
+        self.leading: Dict[Key, List[int]] = {}
+        self.stats = _SessionStats(crawl_rate)
+        self.start: Optional[int] = None
+        self.clock: Optional[int] = None
+        self.next_sweep: Optional[int] = None
+        self.forced = 0
+
+    def feed(self, stamps: Sequence[Optional[int]], ips: Sequence[bytes], uas: Sequence[bytes]) -> None:
+        """
+        Un lote de visitas en el orden del log: epoch en segundos (None si la
+        hora no parsea, la visita se ignora), IP y UA.
+        """
+        if self.start is None:
+            first = next((t for t in stamps if t is not None), None)
+            if first is None:
+                return
+            self.start = self.clock = self.next_sweep = first
+        open_, gap, get = self.open, self.gap, self.open.get
+        clock = self.clock
+        for t, key in zip(stamps, zip(ips, uas)):
+            if t is None:
+                continue
+            if t > clock:
+                clock = t
+            s = get(key)
+            if s is None:
+                open_[key] = [t, t, 1]
+            elif clock - s[1] > gap:
+                self._close(key, s)
+                open_[key] = [t, t, 1]
+            else:
+                s[1] = t
+                s[2] += 1
+        self.clock = clock
+        if clock >= self.next_sweep or len(open_) > self.max_open:
+            self._sweep()
+
+    def _sweep(self) -> None:
+        clock, gap = self.clock, self.gap
+        stale = [key for key, s in self.open.items() if clock - s[1] > gap]
+        for key in stale:
+            self._close(key, self.open.pop(key))
+        excess = len(self.open) - self.max_open
+        if excess > 0:
+            self.forced += excess
+            for key, _s in heapq.nsmallest(excess, self.open.items(), key=lambda kv: kv[1][1]):
+                self._close(key, self.open.pop(key))
+        self.next_sweep = clock + max(1, gap // 4)
+
+    def _close(self, key: Key, s: List[int]) -> None:
+        if s[0] - self.start <= self.gap and key not in self.leading and len(self.leading) < self.max_open:
+            self.leading[key] = s
+        else:
+            self.stats.add(key, s)
+
+    def merge(self, other: "SessionTracker") -> "SessionTracker":
+        """
+        Suma `other` (el tramo siguiente del log). Las sesiones abiertas al
+        final de este tramo se unen con la primera sesión de la misma IP+UA
+        en `other` si arrancó a menos de `gap` de su último acceso.
+        """
+        self.forced += other.forced
+        self.stats.merge(other.stats)
+        if other.start is None:
+            return self
+        if self.start is None:
+            self.start, self.clock, self.next_sweep = other.start, other.clock, other.next_sweep
+            self.open = {k: list(s) for k, s in other.open.items()}
+            self.leading = {k: list(s) for k, s in other.leading.items()}
+            return self
+
+        gap = self.gap
+        leading_in = dict(other.leading)
+        open_in = dict(other.open)
+        for key, s in self.open.items():
+            # en una pasada, el reloj al llegar `o` sería el mayor de los dos
+            o = leading_in.get(key)
+            if o is not None and max(self.clock, o[0]) - s[1] <= gap:
+                leading_in[key] = _join(s, o)
+                continue
+            o = open_in.get(key)
+            # en `other` la primera sesión de la clave, si no está en leading, sigue abierta
+            if (o is not None and key not in leading_in and o[0] - other.start <= gap
+                    and max(self.clock, o[0]) - s[1] <= gap):
+                open_in[key] = _join(s, o)
+            elif o is not None or key in leading_in:
+                self._close(key, s)
+            else:
+                # la clave no aparece en `other`: sigue abierta (puede seguir en un tramo
+                # posterior); si ya venció la cierra el _sweep de abajo
+                open_in[key] = s
+        for key, s in leading_in.items():
+            self._close(key, list(s))
+        self.open = {k: list(s) for k, s in open_in.items()}
+        self.clock = max(self.clock, other.clock)
+        self._sweep()
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        def dump(sessions):
+            return [[_text(ip), _text(ua), *s] for (ip, ua), s in sessions.items()]
+
+        return {
+            "params": [self.gap, self.max_open, self.crawl_rate],
+            "start": self.start,
+            "clock": self.clock,
+            "forced": self.forced,
+            "open": dump(self.open),
+            "leading": dump(self.leading),
+            "stats": self.stats.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SessionTracker":
+        tr = cls(*state["params"])
+        tr.start, tr.clock, tr.forced = state["start"], state["clock"], state["forced"]
+        tr.next_sweep = tr.clock
+        for ip, ua, first, last, n in state["open"]:
+            tr.open[(_raw(ip), _raw(ua))] = [first, last, n]
+        for ip, ua, first, last, n in state["leading"]:
+            tr.leading[(_raw(ip), _raw(ua))] = [first, last, n]
+        tr.stats = _SessionStats.from_state(state["stats"], tr.crawl_rate)
+        return tr
+
+    def summary(self) -> Dict[str, Any]:
+        # las sesiones todavía abiertas cuentan como terminadas al final del log
+        stats = self.stats.copy()
+        for sessions in (self.leading, self.open):
+            for key, s in sessions.items():
+                stats.add(key, s)
+        n = stats.sessions
+        return {
+            "gap_seconds": self.gap,
+            "sessions": n,
+            "avg_requests": round(stats.requests / n, 2) if n else 0.0,
+            "avg_duration_s": round(stats.duration / n, 1) if n else 0.0,
+            "requests_hist": {label: stats.by_requests[label] for _l, label in REQUEST_BUCKETS},
+            "duration_hist": {label: stats.by_duration[label] for _l, label in DURATION_BUCKETS},
+            "crawl_rate_per_min": self.crawl_rate,
+            "crawl_min_requests": CRAWL_MIN_REQUESTS,
+            "crawlers": stats.crawlers,
+            "top_crawlers": [
+                {
+                    "ip": _text(ip),
+                    "ua": _text(ua),
+                    "requests": n_,
+                    "duration_s": dur,
+                    "rate_per_min": round(rate, 2),
+                    "start": datetime.fromtimestamp(-neg_first, timezone.utc).isoformat(),
+                }
+                for rate, n_, neg_first, ip, ua, dur in sorted(stats.top, reverse=True)
+            ],
+            "forced_closes": self.forced,
+        }
@@ -0,0 +1,207 @@
+# app/services/log_templates.py
+"""
+Minado de templates online al estilo Drain para agrupar líneas de ataque.
+
+Cada línea se reduce a tokens (números, IPs, hashes y UUIDs enmascarados) y
+baja por un árbol de profundidad fija: cantidad de tokens -> primeros
+`depth - 2` tokens (método, "/", primer segmento del path) -> hoja con unos
+pocos clusters. En la hoja se elige el cluster más parecido (fracción de
+posiciones iguales, sin contar separadores); si supera
+`sim_threshold` la línea se suma y las posiciones que difieren pasan a
+"<*>", si no se abre un cluster nuevo. El trabajo por línea es O(depth) más
+la comparación con los clusters de una sola hoja.
+
+La memoria está acotada: cada nodo tiene como mucho `max_children` hijos (el
+resto cae en "<*>") y hay como mucho `max_clusters` clusters; al pasarse se
+descarta el usado hace más tiempo y, si su hoja queda vacía, también la hoja y
+los nodos del árbol que quedan sin hijos. Cada cluster recuerda su camino en el
+árbol, así el estado se serializa y se mergea (tramos en paralelo, sesiones)
+sin reubicar nada.
+"""
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote_plus
+
+WILDCARD = "<*>"
+
+# tokens del request: separadores de URL sueltos, el resto hasta el próximo
+_TOKEN_RE = re.compile(r"[/?&=;,]|[^\s/?&=;,]+")
+_SEPARATORS = frozenset("/?&=;,")
+
+# (regex, máscara), en orden; se aplican al token entero
+_MASKS = [
+    (re.compile(r"\d{1,3}(?:\.\d{1,3}){3}"), "<IP>"),
+    (re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"), "<UUID>"),
+    (re.compile(r"(?=[0-9a-fA-F]*\d)[0-9a-fA-F]{12,}"), "<HEX>"),
+    (re.compile(r"[-+]?\d+(?:[.,:]\d+)*"), "<NUM>"),
+]
+
+
+def mask_token(token: str) -> str:
+    for rx, mask in _MASKS:
+        if rx.fullmatch(token):
+            return mask
+    return token
+
+
+def request_tokens(method: str, path: str, status: int, ua: str) -> List[str]:
+    """Tokens de una línea HTTP: método, path decodificado, estado y producto del UA."""
+    tokens = [method]
+    tokens.extend(mask_token(t) for t in _TOKEN_RE.findall(unquote_plus(path)))
+    tokens.append(str(status))
+    product = ua.split(None, 1)[0] if ua.strip() else "-"
+    tokens.extend(mask_token(t) for t in _TOKEN_RE.findall(product))
+    return tokens
+
+
+class _Cluster:
+    __slots__ = ("template", "count", "examples", "route")
+
+    def __init__(self, template: List[str], count: int, examples: List[str], route: Tuple[str, ...]):
+        self.template = template
+        self.count = count
+        self.examples = examples
+        self.route = route  # claves del árbol: (largo, token1, token2, ...)
+
+
+class TemplateMiner:
+    def __init__(self, depth: int = 5, sim_threshold: float = 0.5, max_children: int = 100,
+                 max_clusters: int = 1000, max_examples: int = 3):
+        self.depth = depth
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_clusters = max_clusters
+        self.max_examples = max_examples
+        self.lines = 0
+        self.evicted = 0
+        self._tree: Dict[Any, Any] = {}
+        self._leaves: Dict[Tuple[str, ...], List[int]] = {}
+        # id -> cluster, en orden de uso (el primero es el candidato a descartar)
+        self._clusters: "OrderedDict[int, _Cluster]" = OrderedDict()
+        self._next_id = 0
+
+    def _route(self, tokens: Sequence[str]) -> Tuple[str, ...]:
+        # baja por el árbol creando nodos; con el nodo lleno se usa el comodín
+        node = self._tree
+        route: List[str] = []
+        keys = [str(len(tokens))] + [
+            WILDCARD if any(ch.isdigit() for ch in t) else t for t in tokens[:self.depth - 2]
+        ]
+        for key in keys:
+            if key not in node and len(node) >= self.max_children:
+                key = WILDCARD
+            node = node.setdefault(key, {})
+            route.append(key)
+        return tuple(route)
+
+    @staticmethod
+    def _similarity(template: Sequence[str], tokens: Sequence[str]) -> Tuple[float, int]:
+        # los separadores no cuentan: dos URLs cualquiera comparten casi todas las "/"
+        same = params = n = 0
+        for a, b in zip(template, tokens):
+            if b in _SEPARATORS:
+                continue
+            n += 1
+            if a == WILDCARD:
+                params += 1
+            elif a == b:
+                same += 1
+        return (same / n if n else 1.0), params
+
+    def add(self, tokens: Sequence[str], example: str = "", count: int = 1,
+            route: Optional[Tuple[str, ...]] = None, examples: Sequence[str] = ()) -> None:
+        if not tokens:
+            return
+        self.lines += count
+        route = route or self._route(tokens)
+        leaf = self._leaves.setdefault(route, [])
+        best, best_key = None, (-1.0, -1)
+        for cid in leaf:
+            cluster = self._clusters[cid]
+            key = self._similarity(cluster.template, tokens)
+            if key > best_key:
+                best, best_key = cid, key
+        samples = list(examples) or ([example] if example else [])
+        if best is not None and best_key[0] >= self.sim_threshold:
+            cluster = self._clusters[best]
+            cluster.template = [a if a == b else WILDCARD for a, b in zip(cluster.template, tokens)]
+            cluster.count += count
+            room = self.max_examples - len(cluster.examples)
+            if room > 0:
+                cluster.examples.extend(samples[:room])
+            self._clusters.move_to_end(best)
+            return
+        cid = self._next_id
+        self._next_id += 1
+        self._clusters[cid] = _Cluster(list(tokens), count, samples[:self.max_examples], route)
+        leaf.append(cid)
+        if len(self._clusters) > self.max_clusters:
+            old_id, old = self._clusters.popitem(last=False)
+            self._evict(old_id, old)
+
+    def _evict(self, cid: int, cluster: _Cluster) -> None:
+        self.evicted += cluster.count
+        leaf = self._leaves[cluster.route]
+        leaf.remove(cid)
+        if leaf:
+            return
+        del self._leaves[cluster.route]
+        # poda de abajo hacia arriba los nodos que quedaron sin hijos
+        path = [self._tree]
+        for key in cluster.route[:-1]:
+            path.append(path[-1][key])
+        for node, key in zip(reversed(path), reversed(cluster.route)):
+            if node[key]:
+                break
+            del node[key]
+
+    def merge(self, other: "TemplateMiner") -> "TemplateMiner":
+        """Suma los clusters de `other` en su mismo lugar del árbol (se parean por similitud)."""
+        lines = self.lines
+        for cluster in other._clusters.values():
+            self._ensure_route(cluster.route)
+            self.add(cluster.template, count=cluster.count, route=cluster.route, examples=cluster.examples)
+        self.lines = lines + other.lines
+        self.evicted += other.evicted
+        return self
+
+    def _ensure_route(self, route: Tuple[str, ...]) -> None:
+        node = self._tree
+        for key in route:
+            node = node.setdefault(key, {})
+
+    def to_state(self) -> Dict[str, Any]:
+        return {
+            "params": [self.depth, self.sim_threshold, self.max_children, self.max_clusters, self.max_examples],
+            "lines": self.lines,
+            "evicted": self.evicted,
+            "clusters": [[c.template, c.count, c.examples, list(c.route)] for c in self._clusters.values()],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "TemplateMiner":
+        miner = cls(*state["params"])
+        for template, count, examples, route in state["clusters"]:
+            route = tuple(route)
+            miner._ensure_route(route)
+            cid = miner._next_id
+            miner._next_id += 1
+            miner._clusters[cid] = _Cluster(list(template), count, list(examples), route)
+            miner._leaves.setdefault(route, []).append(cid)
+        miner.lines = state["lines"]
+        miner.evicted = state["evicted"]
+        return miner
+
+    def top(self, n: int = 20) -> List[Dict[str, Any]]:
+        clusters = sorted(self._clusters.values(), key=lambda c: c.count, reverse=True)[:n]
+        return [{"template": " ".join(c.template), "count": c.count, "examples": list(c.examples)}
+                for c in clusters]
+
+    def summary(self, n: int = 20) -> Dict[str, Any]:
+        return {
+            "lines": self.lines,
+            "clusters": len(self._clusters),
+            "evicted_lines": self.evicted,
+            "top": self.top(n),
+        }
@@ -0,0 +1,85 @@
+# app/services/path_normalizer.py
+"""
+Normalización de paths antes de contar: `/users/123` y `/users/124` pasan a
+`/users/{id}`, así el top de paths no se llena de variantes de la misma ruta.
+
+Las reglas de segmento (un segmento entero entre "/") se compilan en una sola
+regex alternada; "query" reemplaza los valores del query string dejando los
+nombres de los parámetros (`/search?q=abc&page=2` -> `/search?q={v}&page={v}`).
+Cada path distinto se normaliza una vez: el resultado queda en un LRU por
+instancia. Las reglas activas salen de ANALYSIS_PATH_RULES (vacío = paths
+tal cual).
+"""
+import functools
+import re
+import zlib
+from typing import Dict, Optional, Sequence, Tuple
+
+from app.config import get_settings
+
+# regla -> (patrón de un segmento entero, placeholder); el orden es el de prueba
+SEGMENT_RULES: Dict[str, Tuple[bytes, bytes]] = {
+    "uuid": (rb"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}", b"{uuid}"),
+    "num": (rb"[0-9]+", b"{id}"),
+    "hash": (rb"[0-9a-fA-F]{16,}", b"{hash}"),
+}
+RULES = tuple(SEGMENT_RULES) + ("query",)
+
+# paths distintos memorizados por normalizador
+PATH_CACHE_SIZE = 65536
+
+_QUERY_VALUE_RE = re.compile(rb"=[^&]*")
+
+
+def parse_rules(spec: str) -> Tuple[str, ...]:
+    """"uuid, num,query" -> ("uuid", "num", "query"); ValueError con reglas desconocidas."""
+    rules = tuple(r.strip().lower() for r in spec.split(",") if r.strip())
+    unknown = [r for r in rules if r not in RULES]
+    if unknown:
+        raise ValueError(f"Reglas de paths desconocidas: {', '.join(unknown)} (válidas: {', '.join(RULES)})")
+    return rules
+
+
+class PathNormalizer:
+    def __init__(self, rules: Sequence[str] = RULES):
+        # orden canónico: dos configuraciones con las mismas reglas normalizan igual
+        self.rules = tuple(r for r in RULES if r in rules)
+        segment = [name for name in SEGMENT_RULES if name in self.rules]
+        self._placeholders = {name: SEGMENT_RULES[name][1] for name in segment}
+        self._segment_re = re.compile(
+            rb"(?<=/)(?:" + b"|".join(b"(?P<%s>%s)" % (name.encode(), SEGMENT_RULES[name][0]) for name in segment)
+            + rb")(?=/|$)"
+        ) if segment else None
+        self._query = "query" in self.rules
+        self.normalize = functools.lru_cache(maxsize=PATH_CACHE_SIZE)(self._normalize)
+
+    def __reduce__(self):
+        # el LRU no se puede picklear: se reconstruye vacío con las mismas reglas
+        return (PathNormalizer, (self.rules,))
+
+    @property
+    def tag(self) -> str:
+        """Identificador corto de las reglas (para claves de cache)."""
+        return f"{zlib.crc32(','.join(self.rules).encode()):08x}"
+
+    def _segment(self, m: "re.Match") -> bytes:
+        return self._placeholders[m.lastgroup]
+
+    def _normalize(self, path: bytes) -> bytes:
+        base, sep, query = path.partition(b"?")
+        if self._segment_re is not None:
+            base = self._segment_re.sub(self._segment, base)
+        if sep and self._query:
+            query = _QUERY_VALUE_RE.sub(b"={v}", query)
+        return base + sep + query
+
+
+_default: Optional[PathNormalizer] = None
+
+
+def default_normalizer() -> PathNormalizer:
+    """El normalizador de ANALYSIS_PATH_RULES (uno por proceso)."""
+    global _default
+    if _default is None:
+        _default = PathNormalizer(parse_rules(get_settings().ANALYSIS_PATH_RULES))
+    return _default
@@ -1,3 +1,4 @@
+import io
 from pathlib import Path
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
@@ -49,3 +50,80 @@ def generate_pdf(report_data: dict, filename_prefix: str = "analysis") -> str:
     c.save()
 
     return f"reports/{filename}"
+
+
+def render_summary_pdf(summary: dict, paths: str = "raw") -> bytes:
+    """PDF minimalista del resumen de /analysis/generate (corre dentro del pool de análisis)."""
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=A4)
+    w, h = A4
+    y = h - 2*cm
+    def line(txt, dy=14):
+        nonlocal y
+        c.drawString(2*cm, y, txt[:110])
+        y -= dy
+        if y < 2*cm:
+            c.showPage(); y = h - 2*cm
+    c.setFont("Helvetica-Bold", 14); line("AlertTrail — Resumen de análisis")
+    c.setFont("Helvetica", 10)
+    line(f"Total requests: {summary['total']}")
+    approx = summary.get("approx")
+    if approx:
+        line(f"Modo aproximado: ~{approx['distinct_ips']} IPs y ~{approx['distinct_paths']} paths distintos "
+             f"(±{approx['distinct_rel_error']*100:.1f}%), error máx. top: {approx['max_count_error']}")
+    auth = summary.get("auth")
+    if auth:
+        st = auth["summary"]
+        line(f"SSH fallidos: {st.get('ssh_failed', 0)}   •   aceptados: {st.get('ssh_accepted', 0)}   •   "
+             f"fuerza bruta: {st.get('bruteforce_ips', 0)} IPs   •   riesgo: {st.get('risk', 'low')}")
+    files = summary.get("files") or []
+    if files:
+        line(f"Archivos del lote: {len(files)}")
+        for f in files:
+            if "error" in f:
+                line(f"  - {f['name']}  :: error: {f['error']}")
+            else:
+                line(f"  - {f['name']}  :: {f['total']} req, 5xx {f['errors_5xx']}, SQLi {f['sqli_total']}, "
+                     f"probes {f['probe_total']}  ({f['first'] or '-'} -> {f['last'] or '-'})")
+    for k in ("2xx","3xx","4xx","5xx"):
+        if k in summary["classes"]: line(f"{k}: {summary['classes'][k]}")
+    line(f"Errores 5xx: {summary['errors_5xx']}   •   429: {summary['rate_429']}")
+    normalized = paths == "normalized" and "top_paths_normalized" in summary
+    line("Top paths (normalizados):" if normalized else "Top paths:")
+    for p,cnt in summary["top_paths_normalized" if normalized else "top_paths"][:8]:
+        line(f"  - {p}  :: {cnt}")
+    line("Top IPs:")
+    for ip,cnt in summary["top_ips"][:8]:
+        line(f"  - {ip}  :: {cnt}")
+    if summary["unauth_401"]:
+        line("401 por IP:")
+        for ip,cnt in summary["unauth_401"][:8]:
+            line(f"  - {ip}  :: {cnt}")
+    if summary["admin_403"]:
+        line("403 /admin por IP:")
+        for ip,cnt in summary["admin_403"][:8]:
+            line(f"  - {ip}  :: {cnt}")
+    sessions = summary.get("sessions")
+    if sessions:
+        line(f"Sesiones: {sessions['sessions']}   •   requests/sesión: {sessions['avg_requests']}   •   "
+             f"duración media: {sessions['avg_duration_s']} s   •   crawlers: {sessions['crawlers']}")
+        for cr in sessions["top_crawlers"][:5]:
+            line(f"  - {cr['ip']}  {cr['ua'][:40]}  :: {cr['requests']} req, {cr['rate_per_min']} req/min")
+    agents = summary.get("user_agents")
+    if agents:
+        line(f"Tráfico automatizado: {agents['bot_share']*100:.1f}%   •   " +
+             "   ".join(f"{k}: {c}" for k, c in agents["classes"].items()))
+        for name, cnt in agents["top_scanners"][:5]:
+            line(f"  - {name}  :: {cnt}")
+    if summary["sqli_hits"]:
+        line("Posibles SQLi:")
+        for s in summary["sqli_hits"][:5]: line(f"  - {s}")
+    if summary["probe_hits"]:
+        line("Probes sensibles:")
+        for s in summary["probe_hits"][:5]: line(f"  - {s}")
+    templates = (summary.get("templates") or {}).get("top") or []
+    if templates:
+        line("Patrones de ataque:")
+        for t in templates[:8]: line(f"  - {t['template']}  :: {t['count']}")
+    c.showPage(); c.save()
+    return buf.getvalue()
@@ -0,0 +1,182 @@
+# app/services/result_cache.py
+"""
+Cache de resultados de /analysis por contenido.
+
+La clave es el SHA-256 del upload (calculado mientras se copia a disco) más
+el modo de análisis; si el mismo archivo se vuelve a subir se devuelve el
+resumen y el PDF/HTML ya generados sin pasar por el pool.
+
+Dos niveles:
+- memoria: LRU acotado en bytes (ANALYSIS_CACHE_MEM_BYTES), por proceso.
+- disco: `REPORTS_DIR/analysis_cache`, acotado en bytes
+  (ANALYSIS_CACHE_DISK_BYTES); al pasarse se borran los archivos usados hace
+  más tiempo (mtime, que se actualiza en cada hit). Los bytes escritos se
+  llevan en un contador: el directorio se recorre sólo al arrancar y cuando
+  el contador pasa el tope (ese recorrido lo vuelve a sincronizar con lo que
+  escribieron los otros workers).
+
+Todo es I/O bloqueante: desde un handler async se llama con `run_in_threadpool`.
+"""
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from app.config import get_settings
+from app.services.path_normalizer import default_normalizer
+
+# subir cuando cambie la forma del resumen: las entradas viejas dejan de matchear
+CACHE_VERSION = 11
+
+_cache: Optional["ResultCache"] = None
+
+
+def cache_key(digest: str, approx: bool = False) -> str:
+    # las reglas de paths cambian "top_paths_normalized": otra config, otra entrada
+    return f"{digest}-{'approx' if approx else 'exact'}-v{CACHE_VERSION}-p{default_normalizer().tag}"
+
+
+class ResultCache:
+    """Guarda bytes por (clave, tipo); tipo = "summary" | "pdf" | "html"."""
+
+    def __init__(self, directory: Optional[Path], mem_bytes: int, disk_bytes: int):
+        self.directory = directory
+        self.mem_bytes = mem_bytes
+        self.disk_bytes = disk_bytes
+        self._mem: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._mem_used = 0
+        self._lock = threading.Lock()
+        self._disk_used: Optional[int] = None  # None: todavía no se recorrió el directorio
+        self._disk_lock = threading.Lock()
+
+    # ---- memoria ----
+    def _mem_get(self, k: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            data = self._mem.get(k)
+            if data is not None:
+                self._mem.move_to_end(k)
+            return data
+
+    def _mem_put(self, k: Tuple[str, str], data: bytes) -> None:
+        # una entrada que ocupa más de un cuarto del tier vaciaría todo lo demás
+        if len(data) > self.mem_bytes // 4:
+            return
+        with self._lock:
+            old = self._mem.pop(k, None)
+            if old is not None:
+                self._mem_used -= len(old)
+            self._mem[k] = data
+            self._mem_used += len(data)
+            while self._mem_used > self.mem_bytes:
+                _, evicted = self._mem.popitem(last=False)
+                self._mem_used -= len(evicted)
+
+    # ---- disco ----
+    def _file(self, key: str, kind: str) -> Path:
+        return self.directory / f"{key}.{kind}"
+
+    def _disk_get(self, key: str, kind: str) -> Optional[bytes]:
+        if self.directory is None:
+            return None
+        path = self._file(key, kind)
+        try:
+            data = path.read_bytes()
+            os.utime(path)  # LRU por mtime
+            return data
+        except OSError:
+            return None
+
+    def _disk_put(self, key: str, kind: str, data: bytes) -> None:
+        if self.directory is None or len(data) > self.disk_bytes:
+            return
+        path = self._file(key, kind)
+        try:
+            old = path.stat().st_size
+        except OSError:
+            old = 0
+        try:
+            fd, tmp = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+            with os.fdopen(fd, "wb") as out:
+                out.write(data)
+            os.replace(tmp, path)  # atómico: nunca se lee un archivo a medias
+        except OSError:
+            return
+        with self._disk_lock:
+            if self._disk_used is None:
+                self._disk_used = self._evict_disk()
+                return
+            self._disk_used += len(data) - old
+            if self._disk_used > self.disk_bytes:
+                self._disk_used = self._evict_disk()
+
+    def _evict_disk(self) -> int:
+        """Borra los más viejos hasta entrar en el tope; devuelve los bytes que quedan."""
+        entries = []
+        for p in self.directory.iterdir():
+            if p.name.startswith(".tmp_"):
+                continue
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        used = sum(size for _, size, _ in entries)
+        for _, size, p in sorted(entries, key=lambda e: e[0]):
+            if used <= self.disk_bytes:
+                break
+            try:
+                p.unlink()
+                used -= size
+            except OSError:
+                pass
+        return used
+
+    # ---- API ----
+    def get(self, key: str, kind: str) -> Optional[bytes]:
+        data = self._mem_get((key, kind))
+        if data is None:
+            data = self._disk_get(key, kind)
+            if data is not None:
+                self._mem_put((key, kind), data)
+        return data
+
+    def put(self, key: str, kind: str, data: bytes) -> None:
+        self._mem_put((key, kind), data)
+        self._disk_put(key, kind, data)
+
+    def get_summary(self, key: str) -> Optional[Dict[str, Any]]:
+        data = self.get(key, "summary")
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
+
+    def put_summary(self, key: str, summary: Dict[str, Any]) -> None:
+        self.put(key, "summary", json.dumps(summary, ensure_ascii=False).encode("utf-8"))
+
+
+def _cache_dir() -> Optional[Path]:
+    settings = get_settings()
+    if settings.ANALYSIS_CACHE_DISK_BYTES <= 0:
+        return None
+    for base in (Path(settings.REPORTS_DIR), Path("/tmp/reports")):
+        path = base / "analysis_cache"
+        try:
+            path.mkdir(parents=True, exist_ok=True)
+            return path
+        except OSError:
+            continue
+    return None
+
+
+def get_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        _cache = ResultCache(_cache_dir(), settings.ANALYSIS_CACHE_MEM_BYTES, settings.ANALYSIS_CACHE_DISK_BYTES)
+    return _cache
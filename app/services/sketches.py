@@ -0,0 +1,211 @@
+# app/services/sketches.py
+"""
+Estructuras de tamaño fijo para el modo aproximado del analizador de logs.
+
+- SpaceSaving: top-K con conteos sobreestimados (error por ítem <= N/K).
+- HyperLogLog: cantidad de distintos (error relativo ~ 1.04/sqrt(2^p)).
+- Reservoir: muestra uniforme de tamaño fijo (algoritmo R).
+
+Las tres son mergeables, así los tramos del análisis en paralelo se combinan
+igual que los Counter del modo exacto. Los hashes son deterministas (blake2b)
+para que los HLL de distintos procesos sean compatibles.
+"""
+import base64
+import hashlib
+import heapq
+import math
+import random
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+
+
+def _same(x: Any) -> Any:
+    return x
+
+
+class SpaceSaving:
+    """Top-K aproximado. Expone `update()` y `most_common()` como un Counter."""
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.n = 0
+        self.counts: Dict[Any, int] = {}
+        self.errors: Dict[Any, int] = {}
+
+    def _min_count(self) -> int:
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.values())
+
+    def update(self, items: Iterable[Any]) -> None:
+        """Suma un lote de ítems (se cuenta exacto y se mergea como un resumen más)."""
+        block = items if isinstance(items, Counter) else Counter(items)
+        self.n += sum(block.values())
+        self._merge_counts(block, {}, 0)
+
+    def merge(self, other: "SpaceSaving") -> None:
+        self.n += other.n
+        self._merge_counts(other.counts, other.errors, other._min_count())
+
+    def _merge_counts(self, counts: Dict[Any, int], errors: Dict[Any, int], other_min: int) -> None:
+        # merge de resúmenes Space-Saving: un ítem ausente en un lado pudo
+        # tener hasta el mínimo de ese lado (si estaba lleno)
+        own_min = self._min_count()
+        merged_c: Dict[Any, int] = {}
+        merged_e: Dict[Any, int] = {}
+        for item, c in self.counts.items():
+            oc = counts.get(item)
+            if oc is None:
+                merged_c[item] = c + other_min
+                merged_e[item] = self.errors[item] + other_min
+            else:
+                merged_c[item] = c + oc
+                merged_e[item] = self.errors[item] + errors.get(item, 0)
+        for item, oc in counts.items():
+            if item not in merged_c:
+                merged_c[item] = oc + own_min
+                merged_e[item] = errors.get(item, 0) + own_min
+        if len(merged_c) > self.capacity:
+            keep = heapq.nlargest(self.capacity, merged_c, key=merged_c.__getitem__)
+            merged_c = {k: merged_c[k] for k in keep}
+        self.counts = merged_c
+        self.errors = {k: merged_e[k] for k in merged_c}
+
+    def most_common(self, n: int | None = None) -> List[Tuple[Any, int]]:
+        items = sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)
+        return items if n is None else items[:n]
+
+    def to_state(self, dump_key: Callable[[Any], Any] = _same) -> Dict[str, Any]:
+        """Estado JSON-serializable; `dump_key` convierte las claves (p.ej. bytes -> str)."""
+        return {
+            "capacity": self.capacity,
+            "n": self.n,
+            "items": [[dump_key(k), c, self.errors[k]] for k, c in self.counts.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], load_key: Callable[[Any], Any] = _same) -> "SpaceSaving":
+        ss = cls(state["capacity"])
+        ss.n = state["n"]
+        for k, c, e in state["items"]:
+            key = load_key(k)
+            ss.counts[key] = c
+            ss.errors[key] = e
+        return ss
+
+    def error(self, item: Any) -> int:
+        return self.errors.get(item, 0)
+
+    def max_error(self) -> int:
+        """Cota global: ningún conteo reportado excede al real en más de esto."""
+        return self._min_count()
+
+
+class HyperLogLog:
+    """Cardinalidad aproximada con 2^p registros de un byte."""
+
+    def __init__(self, p: int = 14):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    @staticmethod
+    def _hash(item: Any) -> int:
+        data = item if isinstance(item, bytes) else str(item).encode("utf-8", "surrogatepass")
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+    def add(self, item: Any) -> None:
+        h = self._hash(item)
+        idx = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def update(self, items: Iterable[Any]) -> None:
+        for item in set(items):
+            self.add(item)
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.p != self.p:
+            raise ValueError("HyperLogLog con distinta precisión")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        est = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if est <= 2.5 * m and zeros:
+            est = m * math.log(m / zeros)  # linear counting para cardinalidades chicas
+        return int(round(est))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.m)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "HyperLogLog":
+        hll = cls(state["p"])
+        hll.registers = bytearray(base64.b64decode(state["registers"]))
+        return hll
+
+
+class Reservoir:
+    """Muestra uniforme de `capacity` ítems sobre todo lo visto."""
+
+    def __init__(self, capacity: int = 20, seed: int = 0):
+        self.capacity = capacity
+        self.seen = 0
+        self.items: List[Any] = []
+        self._rng = random.Random(seed)
+
+    def append(self, item: Any) -> None:
+        self.seen += 1
+        if len(self.items) < self.capacity:
+            self.items.append(item)
+        else:
+            j = self._rng.randrange(self.seen)
+            if j < self.capacity:
+                self.items[j] = item
+
+    def merge(self, other: "Reservoir") -> None:
+        # muestra sin reemplazo de la unión: cada lugar sale de un lado con
+        # probabilidad proporcional a lo que ese lado todavía representa
+        mine, theirs = list(self.items), list(other.items)
+        left_a, left_b = self.seen, other.seen
+        out: List[Any] = []
+        while len(out) < self.capacity and (mine or theirs):
+            take_a = bool(mine) and (not theirs or self._rng.random() * (left_a + left_b) < left_a)
+            src = mine if take_a else theirs
+            out.append(src.pop(self._rng.randrange(len(src))))
+            if take_a:
+                left_a -= 1
+            else:
+                left_b -= 1
+        self.items = out
+        self.seen += other.seen
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def to_state(self) -> Dict[str, Any]:
+        version, internal, gauss = self._rng.getstate()
+        return {"capacity": self.capacity, "seen": self.seen, "items": list(self.items),
+                "rng": [version, list(internal), gauss]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "Reservoir":
+        res = cls(state["capacity"])
+        res.seen = state["seen"]
+        res.items = list(state["items"])
+        version, internal, gauss = state["rng"]
+        res._rng.setstate((version, tuple(internal), gauss))
+        return res
+
+    def __len__(self) -> int:
+        return len(self.items)
@@ -0,0 +1,78 @@
+# app/services/ua_classifier.py
+"""
+Clasificación de user agents: browser, bot (crawlers de buscadores y
+similares), scanner (sqlmap, nikto, nuclei...), tool (curl, wget, librerías
+HTTP) u other.
+
+Los nombres conocidos se buscan todos juntos con `DetectorEngine` (literales
+sobre el UA en minúsculas) y gana el primero en el orden declarado: scanners,
+después tools, después bots. El veredicto queda en un LRU por UA exacto: en un
+log real hay pocos UAs distintos y casi todas las líneas son un hit.
+"""
+import functools
+from typing import Dict, Optional, Tuple
+
+from app.services.detectors import DetectorEngine
+
+# nombre -> (clase, literales en minúsculas); el orden es la prioridad
+KNOWN_AGENTS: Dict[str, Tuple[str, Tuple[str, ...]]] = {
+    "sqlmap": ("scanner", ("sqlmap",)),
+    "nikto": ("scanner", ("nikto",)),
+    "nmap": ("scanner", ("nmap",)),
+    "masscan": ("scanner", ("masscan",)),
+    "zgrab": ("scanner", ("zgrab",)),
+    "nuclei": ("scanner", ("nuclei",)),
+    "wpscan": ("scanner", ("wpscan",)),
+    "acunetix": ("scanner", ("acunetix", "acunetix-")),
+    "nessus": ("scanner", ("nessus",)),
+    "openvas": ("scanner", ("openvas",)),
+    "gobuster": ("scanner", ("gobuster",)),
+    "dirbuster": ("scanner", ("dirbuster",)),
+    "ffuf": ("scanner", ("fuzz faster u fool", "ffuf")),
+    "wfuzz": ("scanner", ("wfuzz",)),
+    "hydra": ("scanner", ("hydra",)),
+    "burp": ("scanner", ("burp",)),
+    "curl": ("tool", ("curl/",)),
+    "wget": ("tool", ("wget/",)),
+    "python": ("tool", ("python-requests", "python-urllib", "aiohttp", "httpx/", "python/")),
+    "go_http_client": ("tool", ("go-http-client",)),
+    "java": ("tool", ("java/", "apache-httpclient", "okhttp")),
+    "libwww_perl": ("tool", ("libwww-perl", "lwp::")),
+    "node": ("tool", ("node-fetch", "axios/", "undici")),
+    "httpie": ("tool", ("httpie/",)),
+    "postman": ("tool", ("postmanruntime",)),
+    "googlebot": ("bot", ("googlebot", "google-inspectiontool", "adsbot-google")),
+    "bingbot": ("bot", ("bingbot", "bingpreview")),
+    "yandex": ("bot", ("yandexbot", "yandex.com/bots")),
+    "baiduspider": ("bot", ("baiduspider",)),
+    "duckduckbot": ("bot", ("duckduckbot",)),
+    "applebot": ("bot", ("applebot",)),
+    "facebook": ("bot", ("facebookexternalhit", "facebot")),
+    "ahrefs": ("bot", ("ahrefsbot",)),
+    "semrush": ("bot", ("semrushbot",)),
+    "gptbot": ("bot", ("gptbot", "chatgpt-user", "claudebot", "ccbot")),
+    "bot": ("bot", ("bot", "crawler", "spider", "slurp", "scraper")),
+}
+CLASSES = ("browser", "bot", "scanner", "tool", "other")
+AUTOMATED = ("bot", "scanner", "tool")
+
+# UAs distintos memorizados
+UA_CACHE_SIZE = 16384
+
+UA_DETECTORS = DetectorEngine(literals={name: words for name, (_cls, words) in KNOWN_AGENTS.items()})
+
+_BROWSER_PREFIXES = ("mozilla/", "opera/")
+
+
+@functools.lru_cache(maxsize=UA_CACHE_SIZE)
+def classify_ua(ua: bytes) -> Tuple[str, Optional[str]]:
+    """(clase, nombre conocido o None) de un UA tal como viene en el log."""
+    low = ua.decode("utf-8", "replace").strip().lower()
+    if not low or low == "-":
+        return "other", None
+    hits = UA_DETECTORS.scan(low)
+    if hits:
+        return KNOWN_AGENTS[hits[0]][0], hits[0]
+    if low.startswith(_BROWSER_PREFIXES):
+        return "browser", None
+    return "other", None
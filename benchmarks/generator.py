@@ -0,0 +1,135 @@
+# benchmarks/generator.py
+"""
+Generador determinístico (con seed) de logs sintéticos para los benchmarks.
+
+- combined: access log Nginx/Apache, con cantidad de IPs/paths configurable y
+  proporciones de SQLi y probes de archivos sensibles.
+- auth: /var/log/auth.log de sshd, con fallos, logins aceptados y ráfagas de
+  fuerza bruta (varias IPs atacantes con muchos fallos seguidos).
+
+Los timestamps avanzan de forma monótona, como en un log real.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Iterator
+
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+_UAS = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Mobile/15E148",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:121.0) Gecko/20100101 Firefox/121.0",
+    "Googlebot/2.1 (+http://www.google.com/bot.html)",
+    "curl/8.0.1",
+)
+_SQLI = (
+    "/products?id=1%20union%20select%20username,password%20from%20users",
+    "/search?q=1' or 1=1 --",
+    "/item?id=1%20and%201=1",
+    "/x?q=select%20*%20from%20information_schema.tables",
+)
+_PROBES = ("/.env", "/wp-login.php", "/phpmyadmin/index.php", "/config.php", "/backup.zip", "/site.tar", "/db.bak")
+_USERS = ("root", "admin", "ubuntu", "test", "oracle", "postgres", "git", "deploy")
+
+
+@dataclass
+class GenOptions:
+    seed: int = 42
+    n_ips: int = 5000
+    n_paths: int = 2000
+    sqli_ratio: float = 0.005
+    probe_ratio: float = 0.01
+    # auth
+    fail_ratio: float = 0.3
+    bruteforce_ratio: float = 0.05  # fracción de líneas que son ráfagas de fuerza bruta
+    lines_per_second: int = 50
+
+
+def _ips(r: random.Random, n: int) -> list:
+    return ["%d.%d.%d.%d" % (r.randrange(1, 224), r.randrange(256), r.randrange(256), r.randrange(1, 255))
+            for _ in range(n)]
+
+
+def combined_lines(opts: GenOptions) -> Iterator[str]:
+    r = random.Random(opts.seed)
+    ips = _ips(r, opts.n_ips)
+    paths = ["/", "/index.html", "/api/login", "/admin", "/static/app.js"] + [
+        "/product/%d" % i for i in range(max(0, opts.n_paths - 5))
+    ]
+    statuses = [200] * 40 + [301, 304, 304, 404, 404, 401, 403, 429, 500, 503]
+    t = datetime(2025, 9, 17, 0, 0, 0)
+    step = timedelta(seconds=1)
+    i = 0
+    while True:
+        if i % opts.lines_per_second == 0:
+            t += step
+        i += 1
+        # IPs con distribución sesgada (pocas IPs con mucho tráfico)
+        ip = ips[min(int(r.paretovariate(1.2)) - 1, len(ips) - 1)] if r.random() < 0.5 else r.choice(ips)
+        path, ua = r.choice(paths), r.choice(_UAS)
+        x = r.random()
+        if x < opts.sqli_ratio:
+            path, ua = r.choice(_SQLI), "sqlmap/1.7"
+        elif x < opts.sqli_ratio + opts.probe_ratio:
+            path = r.choice(_PROBES)
+        yield '%s - - [%s +0000] "%s %s HTTP/1.1" %d %d "-" "%s"' % (
+            ip, t.strftime("%d/%b/%Y:%H:%M:%S"), r.choice(("GET", "GET", "GET", "POST")), path,
+            r.choice(statuses), r.randrange(100, 20000), ua,
+        )
+
+
+def auth_lines(opts: GenOptions) -> Iterator[str]:
+    r = random.Random(opts.seed)
+    ips = _ips(r, opts.n_ips)
+    attackers = ips[: max(1, opts.n_ips // 100)]
+    t = datetime(2025, 9, 17, 0, 0, 0)
+    pid = 1000
+    burst_ip, burst_left = None, 0
+    i = 0
+    while True:
+        if i % opts.lines_per_second == 0:
+            t += timedelta(seconds=1)
+        i += 1
+        pid = pid + 1 if pid < 65000 else 1000
+        ts = "%s %2d %s" % (_MONTHS[t.month - 1], t.day, t.strftime("%H:%M:%S"))
+        if burst_left == 0 and r.random() < opts.bruteforce_ratio / 20:
+            burst_ip, burst_left = r.choice(attackers), 20
+        if burst_left:
+            burst_left -= 1
+            yield "%s srv sshd[%d]: Failed password for %s%s from %s port %d ssh2" % (
+                ts, pid, r.choice(("", "invalid user ")), r.choice(_USERS), burst_ip, r.randrange(1024, 65535))
+            continue
+        ip, x = r.choice(ips), r.random()
+        if x < opts.fail_ratio:
+            yield "%s srv sshd[%d]: Failed password for %s from %s port %d ssh2" % (
+                ts, pid, r.choice(_USERS), ip, r.randrange(1024, 65535))
+        elif x < opts.fail_ratio + 0.2:
+            yield "%s srv sshd[%d]: Accepted password for %s from %s port %d ssh2" % (
+                ts, pid, r.choice(_USERS), ip, r.randrange(1024, 65535))
+        elif x < opts.fail_ratio + 0.2 + opts.sqli_ratio:
+            yield "%s srv app[%d]: GET /search?q=' or 1=1 -- from %s" % (ts, pid, ip)
+        else:
+            yield "%s srv CRON[%d]: pam_unix(cron:session): session opened for user root by (uid=0)" % (ts, pid)
+
+
+GENERATORS = {"combined": combined_lines, "auth": auth_lines}
+
+
+def write_log(path: str, kind: str, target_bytes: int, opts: GenOptions) -> int:
+    """Escribe ~target_bytes de log `kind` en `path`. Devuelve la cantidad de líneas."""
+    lines = GENERATORS[kind](opts)
+    written = n = 0
+    buf = []
+    with open(path, "w", encoding="ascii", newline="\n") as out:
+        for ln in lines:
+            buf.append(ln)
+            written += len(ln) + 1
+            n += 1
+            if len(buf) >= 10000:
+                out.write("\n".join(buf) + "\n")
+                buf.clear()
+            if written >= target_bytes:
+                break
+        if buf:
+            out.write("\n".join(buf) + "\n")
+    return n
@@ -0,0 +1,246 @@
+# benchmarks/run.py
+"""
+Runner de benchmarks del análisis de logs.
+
+    python -m benchmarks.run                          # 10MB, 100MB y 1GB, combined + auth
+    python -m benchmarks.run --sizes 10M,100M --out bench.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.15
+    python -m benchmarks.run --engines http_pool --workers 1,2,4,8 --sizes 1G
+
+Cada medición corre en un subproceso nuevo (así el pico de RSS es sólo de ese
+motor) y reporta líneas/s, MB/s y RSS máximo. Los logs se generan una vez por
+(tipo, tamaño, seed) en --data-dir y se reutilizan. Con --baseline se compara
+contra un JSON anterior y el proceso sale con 1 si algún caso quedó más lento
+que baseline * (1 - tolerance).
+
+`http_pool` mide `analysis_pool.analyze_path` con el archivo partido en un
+tramo por worker (tramos + merge + resumen, sin contar el arranque del pool),
+una vez por cada valor de --workers: la fila `speedup` es contra 1 worker.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from dataclasses import asdict
+from typing import Dict, List, Optional
+
+from benchmarks.generator import GenOptions, write_log
+
+# motor -> (tipo de log, descripción)
+ENGINES = {
+    "http_file": ("combined", "log_analyzer.analyze_file (streaming desde disco, lo que usa /analysis)"),
+    "http_text": ("combined", "log_analyzer.analyze_log(text) (analysis.analyze_log, todo en memoria)"),
+    "auth_file": ("auth", "log_analyzer.analyze_file sobre auth.log (pipeline unificado)"),
+    "auth_text": ("auth", "analysis_service.analyze_log(text)"),
+    "http_pool": ("combined", "analysis_pool.analyze_path con un tramo por worker (ver --workers)"),
+}
+
+_UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+def parse_size(s: str) -> int:
+    s = s.strip().upper().rstrip("B")
+    if s and s[-1] in _UNITS:
+        return int(float(s[:-1]) * _UNITS[s[-1]])
+    return int(s)
+
+
+def _run_engine(engine: str, path: str) -> None:
+    """Corre dentro del subproceso: mide e imprime un JSON en stdout."""
+    if engine == "http_file" or engine == "auth_file":
+        from app.services.log_analyzer import analyze_file
+        t0 = time.perf_counter()
+        analyze_file(path)
+    elif engine == "http_text":
+        from app.services.log_analyzer import analyze_log
+        t0 = time.perf_counter()
+        with open(path, "rb") as fh:
+            analyze_log(fh.read().decode("utf-8", errors="ignore"))
+    elif engine == "http_pool":
+        import asyncio
+        from app.config import get_settings
+        from app.services import analysis_pool
+        # ANALYSIS_WORKERS viene del entorno (ver run); el pool arranca antes de medir
+        executor = analysis_pool._get_executor()
+        if executor is not None:
+            list(executor.map(time.sleep, [0.2] * get_settings().ANALYSIS_WORKERS))
+        t0 = time.perf_counter()
+        asyncio.run(analysis_pool.analyze_path(path))
+        seconds = time.perf_counter() - t0
+        analysis_pool.shutdown()
+        print(json.dumps({"seconds": seconds, "peak_rss_bytes": _peak_rss()}))
+        return
+    elif engine == "auth_text":
+        from app.services.analysis_service import analyze_log
+        t0 = time.perf_counter()
+        with open(path, "rb") as fh:
+            analyze_log(fh.read().decode("utf-8", errors="ignore"))
+    else:
+        raise SystemExit(f"motor desconocido: {engine}")
+    seconds = time.perf_counter() - t0
+    print(json.dumps({"seconds": seconds, "peak_rss_bytes": _peak_rss()}))
+
+
+def _peak_rss() -> int:
+    # ru_maxrss está en KiB en Linux y en bytes en macOS; los workers del pool cuentan aparte
+    rss = max(resource.getrusage(who).ru_maxrss for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN))
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+def _dataset(data_dir: str, kind: str, size: int, opts: GenOptions) -> Dict:
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"{kind}_{size}_{opts.seed}.log")
+    meta_path = path + ".json"
+    meta = {"kind": kind, "size": size, "options": asdict(opts)}
+    if os.path.exists(meta_path) and os.path.exists(path):
+        with open(meta_path) as fh:
+            old = json.load(fh)
+        if old.get("options") == meta["options"]:
+            return {**old, "path": path}
+    t0 = time.perf_counter()
+    meta["lines"] = write_log(path, kind, size, opts)
+    meta["bytes"] = os.path.getsize(path)
+    with open(meta_path, "w") as fh:
+        json.dump(meta, fh)
+    print(f"  generado {path} ({meta['lines']} líneas, {time.perf_counter() - t0:.1f}s)", file=sys.stderr)
+    return {**meta, "path": path}
+
+
+def _cases(engines: List[str], workers: List[int]):
+    for engine in engines:
+        if engine == "http_pool":
+            yield from ((engine, w) for w in workers)
+        else:
+            yield engine, None
+
+
+def run(sizes: List[int], engines: List[str], opts: GenOptions, data_dir: str, repeat: int,
+        workers: Optional[List[int]] = None) -> Dict:
+    results = []
+    for size in sizes:
+        single = None  # segundos de http_pool con 1 worker, para el speedup
+        for engine, n_workers in _cases(engines, workers or [os.cpu_count() or 1]):
+            kind = ENGINES[engine][0]
+            ds = _dataset(data_dir, kind, size, opts)
+            env = dict(os.environ)
+            if n_workers is not None:
+                env.update(ANALYSIS_WORKERS=str(n_workers), ANALYSIS_SHARD_MIN_BYTES="0")
+            best = None
+            for _ in range(repeat):
+                out = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.run", "--child", engine, ds["path"]],
+                    check=True, capture_output=True, text=True, env=env,
+                )
+                m = json.loads(out.stdout.strip().splitlines()[-1])
+                if best is None or m["seconds"] < best["seconds"]:
+                    best = {**m, "peak_rss_bytes": max(m["peak_rss_bytes"], (best or m)["peak_rss_bytes"])}
+            row = {
+                "engine": engine,
+                "kind": kind,
+                "size": size,
+                "bytes": ds["bytes"],
+                "lines": ds["lines"],
+                "seconds": round(best["seconds"], 4),
+                "lines_per_s": round(ds["lines"] / best["seconds"]),
+                "mb_per_s": round(ds["bytes"] / best["seconds"] / 1e6, 2),
+                "peak_rss_mb": round(best["peak_rss_bytes"] / 1e6, 1),
+            }
+            label = engine
+            if n_workers is not None:
+                row["workers"] = n_workers
+                if n_workers == 1:
+                    single = best["seconds"]
+                if single is not None:
+                    row["speedup"] = round(single / best["seconds"], 2)
+                label = f"{engine}x{n_workers}"
+            results.append(row)
+            print("  {label:<12} {size:>6}  {lines_per_s:>9} líneas/s  {mb_per_s:>7} MB/s  "
+                  "RSS {peak_rss_mb:>7} MB".format(**{**row, "label": label, "size": _fmt_size(size)}),
+                  file=sys.stderr)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "options": asdict(opts),
+        "results": results,
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Casos (motor, tamaño) con líneas/s por debajo de baseline * (1 - tolerance)."""
+    base = {(r["engine"], r["size"], r.get("workers")): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["engine"], r["size"], r.get("workers")))
+        if not b:
+            continue
+        ratio = r["lines_per_s"] / b["lines_per_s"] if b["lines_per_s"] else 1.0
+        r["vs_baseline"] = round(ratio, 3)
+        if ratio < 1 - tolerance:
+            regressions.append(f"{r['engine']} {_fmt_size(r['size'])}: {r['lines_per_s']} líneas/s "
+                               f"vs {b['lines_per_s']} ({(ratio - 1) * 100:+.1f}%)")
+    return regressions
+
+
+def _fmt_size(n: int) -> str:
+    for unit in ("G", "M", "K"):
+        if n >= _UNITS[unit] and n % _UNITS[unit] == 0:
+            return f"{n // _UNITS[unit]}{unit}"
+    return str(n)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmarks del análisis de logs")
+    ap.add_argument("--child", nargs=2, metavar=("ENGINE", "PATH"), help=argparse.SUPPRESS)
+    ap.add_argument("--sizes", default="10M,100M,1G", help="p.ej. 10M,100M")
+    ap.add_argument("--engines", default=",".join(ENGINES), help=",".join(ENGINES))
+    ap.add_argument("--workers", default=None, help="http_pool: procesos a probar, p.ej. 1,2,4 (default: CPUs)")
+    ap.add_argument("--repeat", type=int, default=1, help="corridas por caso (se queda con la mejor)")
+    ap.add_argument("--data-dir", default=os.path.join("benchmarks", ".data"))
+    ap.add_argument("--out", default=None, help="archivo JSON de resultados")
+    ap.add_argument("--baseline", default=None, help="JSON de una corrida anterior para comparar")
+    ap.add_argument("--tolerance", type=float, default=0.10)
+    ap.add_argument("--seed", type=int, default=GenOptions.seed)
+    ap.add_argument("--ips", type=int, default=GenOptions.n_ips)
+    ap.add_argument("--paths", type=int, default=GenOptions.n_paths)
+    ap.add_argument("--sqli", type=float, default=GenOptions.sqli_ratio)
+    ap.add_argument("--probes", type=float, default=GenOptions.probe_ratio)
+    ap.add_argument("--bruteforce", type=float, default=GenOptions.bruteforce_ratio)
+    args = ap.parse_args(argv)
+
+    if args.child:
+        _run_engine(*args.child)
+        return 0
+
+    engines = [e.strip() for e in args.engines.split(",") if e.strip()]
+    unknown = [e for e in engines if e not in ENGINES]
+    if unknown:
+        ap.error(f"motores desconocidos: {', '.join(unknown)}")
+    opts = GenOptions(seed=args.seed, n_ips=args.ips, n_paths=args.paths, sqli_ratio=args.sqli,
+                      probe_ratio=args.probes, bruteforce_ratio=args.bruteforce)
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    workers = [int(w) for w in args.workers.split(",") if w.strip()] if args.workers else None
+    current = run(sizes, engines, opts, args.data_dir, max(1, args.repeat), workers)
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(current, json.load(fh), args.tolerance)
+        for line in regressions:
+            print(f"REGRESIÓN {line}", file=sys.stderr)
+        status = 1 if regressions else 0
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(current, fh, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
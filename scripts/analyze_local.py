@@ -0,0 +1,44 @@
+# scripts/analyze_local.py
+"""
+Analiza un log que ya está en el servidor (misma lógica que POST /analysis/local).
+
+    python -m scripts.analyze_local nginx/access.log
+    python -m scripts.analyze_local nginx/access.log --offset 1048576 --max-bytes 536870912
+
+El path tiene que estar dentro de ANALYSIS_LOCAL_ROOT (o de --root). Imprime el
+resultado en JSON; `next_offset` es el valor para el próximo --offset.
+"""
+import argparse
+import json
+import sys
+
+from app.config import get_settings
+from app.services.local_logs import LocalPathError, analyze_mapped_range, plan_range, resolve_local_path
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Análisis de un log local vía mmap")
+    ap.add_argument("path")
+    ap.add_argument("--root", default=None, help="raíz permitida (por defecto ANALYSIS_LOCAL_ROOT)")
+    ap.add_argument("--offset", type=int, default=0)
+    ap.add_argument("--max-bytes", type=int, default=None)
+    ap.add_argument("--approx", action="store_true")
+    args = ap.parse_args(argv)
+
+    try:
+        path = resolve_local_path(args.path, args.root or get_settings().ANALYSIS_LOCAL_ROOT)
+        start, end, size = plan_range(path, args.offset, args.max_bytes)
+    except LocalPathError as e:
+        print(f"[analyze_local][ERROR] {e}", file=sys.stderr)
+        return 2
+
+    summary = analyze_mapped_range(path, start, end, approx=args.approx).summary()
+    result = {"path": args.path, "summary": summary, "start": start,
+              "next_offset": end, "size": size, "eof": end >= size}
+    json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -45,6 +45,10 @@ def ensure_tables():
         import app.routers.rules  # registra UserRule y UserSetting
     except Exception as e:
         print("[init_db] aviso: no pude registrar modelos de rules:", e)
+    try:
+        import app.models_analysis  # noqa: F401  (registra AnalysisSession)
+    except Exception as e:
+        print("[init_db] aviso: no pude registrar modelos de análisis:", e)
     Base.metadata.create_all(bind=engine)
     print("[init_db] create_all OK")
 
@@ -168,6 +172,68 @@ def ensure_mail_accounts_columns():
         print("[init_db] mail_accounts backfill OK")
 
 
+# ---------------------------------------------------------------------------
+# Migraciones ligeras (sin Alembic): MAIL_ALERTS
+# ---------------------------------------------------------------------------
+def ensure_mail_alerts_unique():
+    # create_all no agrega constraints a tablas existentes: índice único a mano,
+    # dejando la alerta más vieja de cada (user_id, msg_uid) repetido
+    insp = inspect(engine)
+    if "mail_alerts" not in insp.get_table_names():
+        return
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM mail_alerts WHERE id NOT IN ("
+            "SELECT MIN(id) FROM mail_alerts GROUP BY user_id, msg_uid)"
+        )).rowcount
+        if removed:
+            print(f"[init_db] mail_alerts: {removed} alertas duplicadas borradas")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_mail_alert_user_msg "
+            "ON mail_alerts (user_id, msg_uid)"
+        ))
+        print("[init_db] mail_alerts unique OK")
+
+
+# ---------------------------------------------------------------------------
+# Migraciones ligeras (sin Alembic): ANALYSIS_RUNS
+# ---------------------------------------------------------------------------
+def ensure_analysis_runs_columns():
+    insp = inspect(engine)
+    if "analysis_runs" not in insp.get_table_names():
+        return
+    cols = {c["name"] for c in insp.get_columns("analysis_runs")}
+    with engine.begin() as conn:
+        if "status" not in cols:
+            conn.execute(text(
+                "ALTER TABLE analysis_runs "
+                "ADD COLUMN status VARCHAR(16) DEFAULT 'done' NOT NULL"
+            ))
+            print("[init_db] analysis_runs.status agregado")
+        if "error" not in cols:
+            conn.execute(text("ALTER TABLE analysis_runs ADD COLUMN error TEXT"))
+            print("[init_db] analysis_runs.error agregado")
+
+
+def ensure_analysis_runs_unique():
+    # un run por (usuario, sha256, modo); los repetidos de carreras viejas se borran
+    insp = inspect(engine)
+    if "analysis_runs" not in insp.get_table_names():
+        return
+    with engine.begin() as conn:
+        removed = conn.execute(text(
+            "DELETE FROM analysis_runs WHERE sha256 IS NOT NULL AND id NOT IN ("
+            "SELECT MIN(id) FROM analysis_runs WHERE sha256 IS NOT NULL GROUP BY user_id, sha256, approx)"
+        )).rowcount
+        if removed:
+            print(f"[init_db] analysis_runs: {removed} runs duplicados borrados")
+        conn.execute(text(
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_analysis_runs_user_sha256_approx "
+            "ON analysis_runs (user_id, sha256, approx)"
+        ))
+        print("[init_db] analysis_runs unique OK")
+
+
 # ---------------------------------------------------------------------------
 # Seed / actualización de admin
 # ---------------------------------------------------------------------------
@@ -262,6 +328,9 @@ def main():
     ensure_tables()
     ensure_users_columns()
     ensure_mail_accounts_columns()
+    ensure_mail_alerts_unique()
+    ensure_analysis_runs_columns()
+    ensure_analysis_runs_unique()
     seed_admin()
     print("[init_db] OK")
 
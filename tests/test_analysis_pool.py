@@ -0,0 +1,30 @@
+# tests/test_analysis_pool.py
+import asyncio
+import os
+
+import pytest
+
+from app.services import analysis_pool
+
+
+@pytest.fixture(autouse=True)
+def fresh_pool():
+    analysis_pool.shutdown()
+    analysis_pool._slots = None  # el semáforo queda atado al loop de cada asyncio.run
+    yield
+    analysis_pool.shutdown()
+    analysis_pool._slots = None
+
+
+def test_pool_se_rearma_si_muere_un_worker():
+    async def scenario():
+        assert await analysis_pool.run_in_pool(len, "abc") == 3
+        broken = analysis_pool._executor
+        with pytest.raises(analysis_pool.PoolBroken):
+            await analysis_pool.run_in_pool(os._exit, 1)  # el worker muere sin responder
+        assert analysis_pool._executor is None
+        assert await analysis_pool.run_in_pool(len, "abcd") == 4
+        assert analysis_pool._executor is not broken
+
+    asyncio.run(scenario())
+
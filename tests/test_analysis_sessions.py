@@ -0,0 +1,46 @@
+# tests/test_analysis_sessions.py
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (tabla users de las foreign keys)
+from app.database import Base
+from app.models_analysis import AnalysisRun, AnalysisSession
+from app.routers import analysis_sessions
+
+SUMMARY = {"total": 2, "timeline": {"2025-10-10 13:55": 2}, "timeline_detail": {"2025-10-10 13:55": [0, 0, 0, 0]}}
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_cierre_y_run_en_la_misma_transacción(db, monkeypatch):
+    s = AnalysisSession(token="t", user_id=1, name="live", carry=b"")
+    db.add(s)
+    db.commit()
+    values = {AnalysisSession.closed: True}
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("base caída")
+
+    monkeypatch.setattr(analysis_sessions, "record_run", broken)
+    with pytest.raises(RuntimeError):
+        analysis_sessions._save(db, s, 0, values, SUMMARY)
+    db.rollback()
+    db.refresh(s)
+    assert not s.closed and db.query(AnalysisRun).count() == 0  # se puede reintentar
+
+    monkeypatch.undo()
+    assert analysis_sessions._save(db, s, 0, values, SUMMARY)
+    assert s.closed
+    run = db.query(AnalysisRun).one()
+    assert (run.source, run.name, run.total) == ("session", "live", 2)
+    # un segundo cierre no pisa nada ni guarda otro run
+    assert not analysis_sessions._save(db, s, 0, values, SUMMARY)
+    assert db.query(AnalysisRun).count() == 1
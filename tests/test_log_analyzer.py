@@ -0,0 +1,213 @@
+# tests/test_log_analyzer.py
+import json
+import random
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services.analysis_sessions import dump_state, load_state
+from app.services.log_analyzer import (
+    COMBINED_RE,
+    SENSITIVE_FILES,
+    SQLI_PATTERNS,
+    LogAnalyzer,
+    UnifiedAnalyzer,
+    _parse_time,
+    analyze_file,
+    analyze_file_range,
+    analyze_log,
+    iter_blocks,
+    iter_lines,
+    merge_analyzers,
+    shard_ranges,
+)
+
+# claves que el analizador original no tenía
+NEW_KEYS = ("sqli_total", "probe_total", "timeline_detail", "verdict_cache", "top_subnets", "templates",
+            "sessions", "top_paths_normalized", "path_rules", "user_agents", "format", "formats", "auth")
+
+IPS = ["10.0.0.%d" % i for i in range(1, 30)] + ["2001:db8::%x" % i for i in range(4)] + ["host.example"]
+PATHS = ["/", "/index.html", "/api/login", "/admin", "/admin/x", "/.env", "/wp-login.php", "/x.bak",
+         "/a?id=1%20union%20select%201", "/q?x=1'%20or%201=1", "/users/%d", "/information_schema",
+         "/phpmyadmin/", "/b.tar.gz", "/ñandú", "/img/%d.png"]
+UAS = ["Mozilla/5.0", "sqlmap/1.5", "curl/8.0", "-", "Nikto", "Googlebot/2.1", "python-requests/2.31"]
+
+
+def _corpus(n: int, seed: int, ascii_only: bool = False) -> bytes:
+    """Log combined en orden de tiempo con líneas raras (vacías, basura, CRLF, tabs, no ASCII)."""
+    rng = random.Random(seed)
+    t = datetime(2025, 9, 16, 23, 50)
+    out = []
+    for _ in range(n):
+        # pasos cortos (sesiones largas que cruzan tramos) y algún hueco que las corta
+        t += timedelta(seconds=2400 if rng.random() < 0.001 else rng.choice([0, 1, 1, 2, 5, 20]))
+        path = rng.choice(PATHS[:-2] + ["/img/%d.png"] if ascii_only else PATHS)
+        if "%d" in path:
+            path %= rng.randint(1, 300)
+        sep = rng.choice([" "] * 20 + ["\t", "  "])
+        line = (f'{rng.choice(IPS)}{sep}- -{sep}[{t:%d/%b/%Y:%H:%M:%S} +0000] '
+                f'"{rng.choice(["GET"] * 8 + ["POST", "get"])} {path}{rng.choice([" HTTP/1.1"] * 5 + [""])}" '
+                f'{rng.choice([200, 200, 200, 301, 404, 401, 403, 429, 500, 503])} {rng.choice(["123", "-"])} '
+                f'"{rng.choice(["-", "http://x/?union select"])}" "{rng.choice(UAS)}"')
+        k = rng.random()
+        if k < 0.01:
+            line = "garbage line " + line[:10]
+        elif k < 0.02:
+            line = "   " + line + "  "
+        elif k < 0.03:
+            line = ""
+        out.append(line + rng.choice(["\n"] * 9 + ["\r\n"]))
+    return "".join(out).encode("utf-8")
+
+
+def _baseline_analyze_log(text: str) -> dict:
+    """Copia congelada de `analyze_log` tal como estaba en app/routers/analysis.py antes del streaming."""
+    total = 0
+    by_status, by_path, by_ip = Counter(), Counter(), Counter()
+    sqli, probes = [], []
+    errors_5xx = rate_429 = 0
+    unauthorized_401, admin_forbidden_403 = Counter(), Counter()
+    timeline = defaultdict(int)
+    for raw in text.splitlines():
+        m = COMBINED_RE.match(raw.strip())
+        if not m:
+            continue
+        total += 1
+        ip, path, status = m.group("ip"), m.group("path"), int(m.group("status"))
+        dt = _parse_time(m.group("time"))
+        if dt:
+            timeline[dt.strftime("%Y-%m-%d %H:%M")] += 1
+        by_status[status] += 1
+        by_path[path] += 1
+        by_ip[ip] += 1
+        if status >= 500:
+            errors_5xx += 1
+        if status == 429:
+            rate_429 += 1
+        if status == 401 and path.endswith("/api/login"):
+            unauthorized_401[ip] += 1
+        if status == 403 and path.startswith("/admin"):
+            admin_forbidden_403[ip] += 1
+        if any(re.search(patt, raw) for patt in SQLI_PATTERNS):
+            sqli.append(raw)
+        if any(sf in path for sf in SENSITIVE_FILES):
+            probes.append(raw)
+    classes = Counter()
+    for s, c in by_status.items():
+        classes[f"{s // 100}xx"] += c
+    return {
+        "total": total,
+        "classes": dict(classes),
+        "by_status": dict(by_status.most_common()),
+        "top_paths": by_path.most_common(10),
+        "top_ips": by_ip.most_common(10),
+        "errors_5xx": errors_5xx,
+        "rate_429": rate_429,
+        "unauth_401": unauthorized_401.most_common(),
+        "admin_403": admin_forbidden_403.most_common(),
+        "sqli_hits": sqli[:20],
+        "probe_hits": probes[:20],
+        "timeline": dict(sorted(timeline.items())),
+    }
+
+
+def _dump(summary: dict, drop=("verdict_cache",)) -> str:
+    # json: tuplas y listas comparan igual, y el orden de los dicts cuenta
+    return json.dumps({k: v for k, v in summary.items() if k not in drop}, sort_keys=False)
+
+
+def _chunks(data: bytes, size: int):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_analyze_log_igual_al_original(seed):
+    text = _corpus(2000, seed).decode("utf-8")
+    assert _dump(analyze_log(text), NEW_KEYS) == _dump(_baseline_analyze_log(text), ())
+
+
+def test_mismo_resumen_con_cualquier_tamaño_de_chunk():
+    data = _corpus(1500, 7)
+    expected = LogAnalyzer()
+    expected.feed_lines(data.decode("utf-8").splitlines())
+    full = UnifiedAnalyzer()
+    full.feed_blocks(iter_blocks([data]))
+    for size in (1, 7, 64, 4096):
+        lines = LogAnalyzer()
+        lines.feed_lines(iter_lines(_chunks(data, size)))
+        assert _dump(lines.summary()) == _dump(expected.summary()), size
+        blocks = UnifiedAnalyzer()
+        blocks.feed_blocks(iter_blocks(_chunks(data, size)))
+        assert _dump(blocks.summary()) == _dump(full.summary()), size
+
+
+@pytest.mark.parametrize("approx", [False, True])
+def test_mismo_resumen_con_cualquier_cantidad_de_tramos(tmp_path, approx):
+    path = tmp_path / "access.log"
+    path.write_bytes(_corpus(3000, 11))
+    full = analyze_file(str(path), approx=approx)
+    for shards in (2, 3, 7, 50):
+        ranges = shard_ranges(str(path), shards)
+        assert ranges[0][0] == 0 and ranges[-1][1] == path.stat().st_size
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        merged = merge_analyzers(analyze_file_range(str(path), a, b, approx) for a, b in ranges).summary()
+        if approx:
+            # los sketches no son exactos: se comparan los conteos que sí lo son
+            for key in ("total", "classes", "by_status", "errors_5xx", "rate_429", "sqli_total", "probe_total",
+                        "timeline"):
+                assert merged[key] == full[key], (shards, key)
+            continue
+        # los templates se parean por similitud y dependen del orden del merge: se compara el total
+        templates, expected = merged.pop("templates"), full["templates"]
+        assert templates["lines"] == expected["lines"]
+        assert _dump(merged) == _dump({k: v for k, v in full.items() if k != "templates"}), shards
+
+
+def test_lote_bytes_igual_a_lote_str():
+    lines = _corpus(2000, 3, ascii_only=True).splitlines()
+    as_bytes, as_str = UnifiedAnalyzer(), UnifiedAnalyzer()
+    as_bytes.feed_blocks([lines])
+    as_str.feed_blocks([[ln.decode("ascii") for ln in lines]])
+    assert _dump(as_bytes.summary()) == _dump(as_str.summary())
+    # y LogAnalyzer solo, con las líneas rechazadas en el mismo orden
+    rej_b, rej_s = [], []
+    http_b, http_s = LogAnalyzer(), LogAnalyzer()
+    http_b._feed_batch(lines, rej_b)
+    http_s._feed_batch([ln.decode("ascii") for ln in lines], rej_s)
+    assert _dump(http_b.summary()) == _dump(http_s.summary())
+    assert [ln.decode("ascii") for ln in rej_b] == rej_s
+
+
+@pytest.mark.parametrize("cls", [LogAnalyzer, UnifiedAnalyzer])
+@pytest.mark.parametrize("approx", [False, True])
+def test_to_state_from_state_y_merge(cls, approx):
+    data = _corpus(2000, 5).decode("utf-8").splitlines()
+    half = len(data) // 2
+
+    first = cls(approx=approx)
+    first.feed_lines(data[:half])
+    restored = cls.from_state(json.loads(json.dumps(first.to_state())))
+    assert _dump(restored.summary()) == _dump(first.summary())
+
+    # el estado restaurado sigue igual que el original
+    first.feed_lines(data[half:])
+    restored.feed_lines(data[half:])
+    assert _dump(restored.summary()) == _dump(first.summary())
+
+    if approx:
+        return
+    left, right = cls(), cls()
+    left.feed_lines(data[:half])
+    right.feed_lines(data[half:])
+    merged = left.merge(right).summary()
+    assert merged["templates"]["lines"] == first.summary()["templates"]["lines"]
+    drop = ("verdict_cache", "templates")
+    assert _dump(merged, drop) == _dump(first.summary(), drop)
+
+
+def test_dump_state_de_sesión():
+    an = UnifiedAnalyzer()
+    an.feed_blocks(iter_blocks([_corpus(500, 2)]))
+    assert _dump(load_state(dump_state(an)).summary()) == _dump(an.summary())
@@ -0,0 +1,40 @@
+# tests/test_log_templates.py
+from app.services.log_templates import TemplateMiner, request_tokens
+
+
+def _word(i: int) -> str:
+    # sin dígitos: los tokens con números se vuelven "<*>"
+    out = ""
+    while True:
+        out += "abcdefghijklmnopqrstuvwxyz"[i % 26]
+        i //= 26
+        if not i:
+            return out
+
+
+def _nodes(node) -> int:
+    return sum(1 + _nodes(child) for child in node.values())
+
+
+def test_evicciones_podan_el_arbol():
+    miner = TemplateMiner(max_clusters=50)
+    for i in range(20000):
+        # paths de largo y primer segmento distintos: cada uno abre su propia hoja
+        path = f"/{_word(i)}" + "/x" * (i % 7) + "?id=1 union select"
+        miner.add(request_tokens("GET", path, 404, "sqlmap/1.7"), path)
+
+    assert len(miner._clusters) == 50
+    assert miner.evicted == 20000 - 50
+    # sólo quedan las hojas y los nodos de los clusters vivos
+    assert set(miner._leaves) == {c.route for c in miner._clusters.values()}
+    assert all(miner._leaves.values())
+    assert _nodes(miner._tree) <= 50 * (miner.depth - 1)
+
+
+def test_el_estado_sigue_igual_despues_de_podar():
+    miner = TemplateMiner(max_clusters=10)
+    for i in range(500):
+        miner.add(request_tokens("GET", f"/{_word(i)}/a?q=1", 403, "curl/8"), f"linea {i}")
+    again = TemplateMiner.from_state(miner.to_state())
+    assert again.summary() == miner.summary()
+    assert _nodes(again._tree) == _nodes(miner._tree)
@@ -0,0 +1,14 @@
+# tests/test_render_html.py
+from app.routers.analysis import _render_html
+from app.services.log_analyzer import analyze_log
+
+
+def test_ips_que_no_son_ip_se_escapan():
+    summary = analyze_log(
+        '<b>x - - [10/Oct/2025:13:55:36 +0000] "GET /api/login HTTP/1.1" 401 12 "-" "curl/8"\n'
+        '<i>y - - [10/Oct/2025:13:55:37 +0000] "GET /admin/panel HTTP/1.1" 403 12 "-" "curl/8"'
+    )
+    page = _render_html(summary)
+    assert "<b>x" not in page and "<i>y" not in page
+    assert page.count("&lt;b&gt;x") == 2  # top IPs y 401
+    assert page.count("&lt;i&gt;y") == 2  # top IPs y 403 /admin
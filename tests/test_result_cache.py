@@ -0,0 +1,30 @@
+# tests/test_result_cache.py
+import os
+
+from app.services.result_cache import ResultCache
+
+
+def _disk_bytes(directory) -> int:
+    return sum(p.stat().st_size for p in directory.iterdir())
+
+
+def test_disco_se_recorre_sólo_al_pasar_el_tope(tmp_path):
+    cache = ResultCache(tmp_path, mem_bytes=0, disk_bytes=1000)
+    scans = []
+    evict = cache._evict_disk
+    cache._evict_disk = lambda: scans.append(1) or evict()
+
+    for i in range(3):
+        cache.put(f"k{i}", "html", b"x" * 300)
+    assert len(scans) == 1  # el primer put sincroniza el contador
+    assert cache._disk_used == 900
+
+    cache.put("k0", "html", b"y" * 300)  # reescribir no suma dos veces
+    assert len(scans) == 1 and cache._disk_used == 900
+
+    os.utime(tmp_path / "k1.html", (0, 0))  # la más vieja
+    cache.put("k3", "html", b"z" * 300)
+    assert len(scans) == 2
+    assert not (tmp_path / "k1.html").exists()
+    assert cache._disk_used == _disk_bytes(tmp_path) == 900
+    assert cache.get("k3", "html") == b"z" * 300
@@ -0,0 +1,85 @@
+# tests/test_sketches.py
+import json
+import random
+from collections import Counter
+
+from app.services.sketches import HyperLogLog, Reservoir, SpaceSaving
+
+
+def _roundtrip(obj):
+    return type(obj).from_state(json.loads(json.dumps(obj.to_state())))
+
+
+def _zipf(n: int, seed: int):
+    rng = random.Random(seed)
+    return [f"/p{int(rng.paretovariate(1.2))}" for _ in range(n)]
+
+
+def test_space_saving_estado_y_merge():
+    a_items, b_items = _zipf(5000, 1), _zipf(5000, 2)
+    a, b = SpaceSaving(50), SpaceSaving(50)
+    for i in range(0, 5000, 500):
+        a.update(a_items[i:i + 500])
+        b.update(b_items[i:i + 500])
+
+    again = _roundtrip(a)
+    assert again.most_common() == a.most_common() and again.errors == a.errors and again.n == a.n
+
+    a.merge(b)
+    truth = Counter(a_items + b_items)
+    assert a.n == 10000 and len(a.counts) <= 50
+    for item, count in a.most_common():
+        # conteo sobreestimado, como mucho en su error
+        assert count - a.error(item) <= truth[item] <= count
+    assert [k for k, _c in a.most_common(3)] == [k for k, _c in truth.most_common(3)]
+
+    # con capacidad de sobra el merge es exacto
+    exact = SpaceSaving(10_000)
+    exact.update(a_items)
+    other = SpaceSaving(10_000)
+    other.update(b_items)
+    exact.merge(other)
+    assert dict(exact.most_common()) == dict(truth)
+
+
+def test_hyperloglog_estado_y_merge():
+    a, b = HyperLogLog(12), HyperLogLog(12)
+    a.update(f"10.0.{i // 256}.{i % 256}" for i in range(20000))
+    b.update(f"10.0.{i // 256}.{i % 256}" for i in range(10000, 40000))
+
+    again = _roundtrip(a)
+    assert again.registers == a.registers and again.count() == a.count()
+
+    union = HyperLogLog(12)
+    union.update(f"10.0.{i // 256}.{i % 256}" for i in range(40000))
+    a.merge(b)
+    assert a.registers == union.registers
+    assert abs(a.count() - 40000) <= 4 * a.relative_error * 40000
+
+
+def test_reservoir_estado_y_merge():
+    a, b = Reservoir(20, seed=1), Reservoir(20, seed=2)
+    for i in range(1000):
+        a.append(f"a{i}")
+    for i in range(300):
+        b.append(f"b{i}")
+
+    again = _roundtrip(a)
+    assert (again.items, again.seen) == (a.items, a.seen)
+    # el rng también se restaura: lo que sigue sale igual
+    for i in range(1000, 1500):
+        a.append(f"a{i}")
+        again.append(f"a{i}")
+    assert again.items == a.items
+
+    pool = set(a.items) | set(b.items)
+    a.merge(b)
+    assert a.seen == 1800 and len(a) == 20
+    assert len(set(a.items)) == 20 and set(a.items) <= pool
+
+    # un lado con menos de `capacity` ítems entra entero
+    small, tiny = Reservoir(20), Reservoir(20)
+    small.append("x")
+    tiny.append("y")
+    small.merge(tiny)
+    assert sorted(small) == ["x", "y"] and small.seen == 2
@@ -0,0 +1,34 @@
+# tests/test_unified_analyzer.py
+from app.services.log_analyzer import UnifiedAnalyzer
+
+XSS_HTTP = ('1.2.3.4 - - [10/Oct/2025:13:55:36 +0000] "GET /search?q=<script>alert(1)</script> HTTP/1.1" '
+            '200 12 "-" "curl/8"')
+LINES = [
+    XSS_HTTP,
+    '1.2.3.4 - - [10/Oct/2025:13:55:37 +0000] "GET /ok HTTP/1.1" 200 12 "-" "curl/8"',
+    "basura con onload=x",
+    "Oct 10 13:55:38 host sshd[1]: Failed password for root from 9.9.9.9 port 22 ssh2",
+]
+
+
+def test_xss_en_lineas_http():
+    an = UnifiedAnalyzer()
+    an.feed_lines(LINES)
+    auth = an.summary()["auth"]
+    assert auth["summary"]["xss"] == 2
+    assert [f["line"] for f in auth["findings"]] == [XSS_HTTP, "basura con onload=x"]
+    assert an.summary()["formats"] == {"combined": 2, "syslog": 1, "other": 1}
+
+
+def test_xss_en_lineas_http_bytes_y_syslog():
+    as_bytes = UnifiedAnalyzer()
+    as_bytes.feed_blocks([[ln.encode("ascii") for ln in LINES]])
+    as_str = UnifiedAnalyzer()
+    as_str.feed_lines(LINES)
+    assert as_bytes.summary() == as_str.summary()
+
+    # formato principal syslog: las líneas HTTP siguen pasando por el chequeo XSS
+    syslog = UnifiedAnalyzer()
+    syslog.feed_lines(LINES[3:] * 3 + LINES)
+    assert syslog.format == "syslog"
+    assert syslog.summary()["auth"]["summary"]["xss"] == 2